@@ -1,11 +1,96 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
     supabase_url: str
     supabase_service_role: str
 
+    # Access token verification (HS256 secret; asymmetric keys come from JWKS)
+    supabase_jwt_secret: Optional[str] = None
+    supabase_jwt_audience: str = "authenticated"
+    auth_cache_size: int = 1024
+    admin_cache_ttl: int = 30
+
+    # Seconds between background reconciles of the in-memory /stats counters
+    stats_reconcile_interval: int = 300
+
+    # /comments/stream: one shared poller per worker, bounded per-client queues,
+    # and a replay buffer of recent comments for Last-Event-ID reconnects
+    comments_poll_interval: float = 2.0
+    comments_queue_size: int = 100
+    comments_replay_size: int = 500
+    comments_keepalive_interval: float = 15.0
+
+    # Public GET response cache; writes on this worker invalidate immediately,
+    # the TTL bounds staleness from writes on other workers
+    response_cache_ttl: float = 60.0
+    response_cache_max_items: int = 512
+    response_cache_max_bytes: int = 32 * 1024 * 1024
+    response_cache_gzip_min_bytes: int = 1024
+
+    # Write-behind for public comment/message inserts: answer 202 at once and
+    # coalesce rows into multi-row inserts every max_delay seconds or max_batch
+    # rows; past max_pending queued rows, "sync" inserts inline, "reject" 503s
+    write_behind_enabled: bool = False
+    write_behind_max_batch: int = 100
+    write_behind_max_delay: float = 0.02
+    write_behind_max_pending: int = 5000
+    write_behind_overflow: str = "sync"
+
+    # Admission control for public write routes ("METHOD /path"): rate and burst
+    # size the per-client token bucket, concurrency caps requests in flight per
+    # route on each worker. "supabase" shares buckets across workers via the
+    # rate_limit_take RPC. rate_limit_forwarded_for keys clients by the last
+    # X-Forwarded-For hop: keep it true behind the gateway/Vercel proxy
+    # (production), where the socket peer is the proxy; set it false only when
+    # clients connect directly, since they could then forge the header
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"
+    rate_limit_forwarded_for: bool = True
+    rate_limit_max_clients: int = 10000
+    rate_limit_routes: Dict[str, Dict[str, float]] = {
+        "POST /auth/login": {"rate": 0.2, "burst": 5, "concurrency": 20},
+        "POST /messages": {"rate": 0.1, "burst": 3, "concurrency": 50},
+        "POST /comments": {"rate": 0.5, "burst": 10, "concurrency": 100},
+    }
+
+    # Per-route latency and Supabase call histograms at /metrics; server_timing
+    # adds a Server-Timing header (app and upstream time) to every response
+    metrics_enabled: bool = True
+    server_timing: bool = True
+
+    # Import each router on the first request for its paths (fast cold starts);
+    # false loads them all at startup instead
+    lazy_routers: bool = True
+
+    # Items accepted per bulk request; ids travel in the URL as an in.(...) filter
+    bulk_max_items: int = 200
+
+    # Rows per page (export) and per upsert batch (import) for /export and /import
+    backup_batch_size: int = 500
+    # Largest accepted /import archive, enforced while the body is received
+    backup_import_max_bytes: int = 1024 * 1024 * 1024
+
+    # Image storage: "data_uri" (legacy base64 column), "local" or "supabase"
+    image_storage: str = "data_uri"
+    image_storage_path: str = "storage/images"
+    image_storage_bucket: str = "images"
+
+    # Largest accepted image upload, enforced while the body is received
+    image_upload_max_bytes: int = 10 * 1024 * 1024
+
+    # Resized/transcoded variants (?w=&h=&fmt=&q=); 0 workers renders in threads
+    image_variant_max_dimension: int = 2048
+    image_variant_workers: int = 2
+
+    # Image cache: in-process LRU plus a disk tier shared by all workers
+    image_cache_memory_bytes: int = 64 * 1024 * 1024
+    image_cache_max_item_bytes: int = 2 * 1024 * 1024
+    image_cache_dir: Optional[str] = None  # defaults to <tmp>/porto-image-cache, "" disables
+    image_cache_disk_bytes: int = 1024 * 1024 * 1024
+
     class Config:
         env_file = ".env"
         case_sensitive = False
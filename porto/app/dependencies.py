@@ -1,10 +1,30 @@
 from fastapi import Header, HTTPException, Depends
-from typing import Optional
-from app.utils import supabase
+from typing import TYPE_CHECKING, Dict, Optional
+import asyncio
+import hashlib
+import time
+import jwt
+from app.config import get_settings
+from app.utils import get_supabase
+from app.utils.auth_tokens import LocalVerificationUnavailable, decode_access_token, unverified_expiry
+from app.utils.cache import TTLCache
 from app.models import User
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient
 
-async def get_current_user(authorization: Optional[str] = Header(None)) -> Optional[User]:
+# Verified token -> User, each entry expiring at the token's own exp
+_user_cache = TTLCache(max_items=get_settings().auth_cache_size, ttl=0)
+
+# user_id -> is admin, shared by require_admin, /auth/me and blog reads
+_admin_cache = TTLCache(max_items=get_settings().auth_cache_size, ttl=get_settings().admin_cache_ttl)
+_admin_lookups: Dict[str, asyncio.Future] = {}
+
+
+async def get_current_user(
+    authorization: Optional[str] = Header(None),
+    db: "AsyncClient" = Depends(get_supabase)
+) -> Optional[User]:
     """Extract user from Authorization header"""
     if not authorization:
         return None
@@ -13,28 +33,90 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> Optio
         return None
 
     token = authorization[7:]  # Remove "Bearer " prefix
+    cache_key = hashlib.sha256(token.encode()).digest()
+
+    user = _user_cache.get(cache_key)
+    if user:
+        return user
 
     try:
-        response = supabase.auth.get_user(token)
-        if response and response.user:
-            return User(id=response.user.id, email=response.user.email)
-    except Exception:
+        claims = await decode_access_token(token)
+        user = User(id=claims["sub"], email=claims.get("email") or "")
+        expires_at = float(claims["exp"])
+    except LocalVerificationUnavailable:
+        # No local key for this token: ask the auth server
+        try:
+            response = await db.auth.get_user(token)
+        except Exception:
+            return None
+        if not response or not response.user:
+            return None
+        user = User(id=response.user.id, email=response.user.email or "")
+        expires_at = unverified_expiry(token) or time.time() + 60
+    except (jwt.InvalidTokenError, KeyError, ValueError):
         return None
 
-    return None
+    _user_cache.set(cache_key, user, expires_at=expires_at)
+    return user
+
+
+async def is_admin_user(user_id: str, db: "AsyncClient") -> bool:
+    """Cached admins-table membership; concurrent misses share one query"""
+    cached = _admin_cache.get(user_id)
+    if cached is not None:
+        return cached
 
+    pending = _admin_lookups.get(user_id)
+    if pending:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _admin_lookups[user_id] = future
+    try:
+        result = await db.table("admins").select("user_id").eq("user_id", user_id).execute()
+        is_admin = bool(result.data)
+        _admin_cache.set(user_id, is_admin)
+        future.set_result(is_admin)
+        return is_admin
+    except BaseException as e:
+        # Waiters see the same failure (or a cancelled lookup) instead of hanging
+        future.set_exception(e if isinstance(e, Exception) else RuntimeError("admin_lookup_cancelled"))
+        future.exception()  # mark retrieved when nobody else is waiting
+        raise
+    finally:
+        del _admin_lookups[user_id]
 
-async def require_admin(user: Optional[User] = Depends(get_current_user)):
+
+def invalidate_admin_cache(user_id: Optional[str] = None):
+    """Forget cached admin membership for one user, or for everyone"""
+    if user_id:
+        _admin_cache.pop(user_id)
+    else:
+        _admin_cache.clear()
+
+
+async def get_is_admin(
+    user: Optional[User] = Depends(get_current_user),
+    db: "AsyncClient" = Depends(get_supabase)
+) -> bool:
+    """Whether the caller is an admin; resolved once per request, free for anonymous callers"""
+    if not user:
+        return False
+    try:
+        return await is_admin_user(user.id, db)
+    except Exception:
+        return False
+
+
+async def require_admin(
+    user: Optional[User] = Depends(get_current_user),
+    is_admin: bool = Depends(get_is_admin)
+):
     """Ensure user is an admin"""
     if not user:
         raise HTTPException(status_code=401, detail="unauthorized")
 
-    # Check if user is admin
-    try:
-        result = supabase.table("admins").select("user_id").eq("user_id", user.id).execute()
-        if not result.data:
-            raise HTTPException(status_code=403, detail="forbidden")
-    except Exception as e:
+    if not is_admin:
         raise HTTPException(status_code=403, detail="forbidden")
 
     return user
@@ -1,9 +1,24 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
-from app.routers import health, auth, projects, images, messages, comments, experiences, blog, stats
+from app.middleware import LazyRouterMiddleware, MetricsMiddleware, RateLimitMiddleware, UploadSizeLimitMiddleware
+from app.routers import load_routers
+
+# Cold starts (serverless) matter: settings, the Supabase client and the
+# routers are all loaded on first use, and middleware read their settings
+# when Starlette builds the stack for the first request
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not get_settings().lazy_routers:
+        load_routers(app.router)
+    yield
+    # Rows acknowledged with 202 must reach the database before exit
+    from app.utils.write_behind import close_all as flush_write_behind
+    await flush_write_behind()
 
-settings = get_settings()
 
 app = FastAPI(
     title="Porto API",
@@ -11,12 +26,21 @@ app = FastAPI(
     version="1.0.0",
     root_path="/porto",
     root_path_in_servers=False,
+    lifespan=lifespan,
     servers=[
         {"url": "https://api.luzyver.dev/porto", "description": "Production"},
         {"url": "http://localhost:8000", "description": "Development (Local)"}
     ]
 )
 
+# Innermost: routes must be registered before the router dispatches.
+# Routers are included without prefix (gateway handles it)
+app.add_middleware(LazyRouterMiddleware, router=app.router)
+
+# Throttle public writes and login before they reach Supabase; added before
+# CORS so 429/503 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -26,13 +50,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers without prefix (gateway handles it)
-app.include_router(health.router)
-app.include_router(auth.router)
-app.include_router(projects.router)
-app.include_router(images.router)
-app.include_router(messages.router)
-app.include_router(comments.router)
-app.include_router(experiences.router)
-app.include_router(blog.router)
-app.include_router(stats.router)
+# Refuse oversized uploads while they stream in, before multipart parsing
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path_prefixes=("/images",),
+)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path_prefixes=("/import",),
+    setting="backup_import_max_bytes",
+    overhead=0,  # raw archive body, not multipart
+)
+
+# Outermost, so timings cover the other middleware and every response gets Server-Timing
+app.add_middleware(MetricsMiddleware)
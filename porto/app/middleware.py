@@ -0,0 +1,177 @@
+from typing import Iterable, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import get_settings
+from app.routers import load_routers, router_for
+from app.utils import metrics
+from app.utils.rate_limit import RateLimiter, get_rate_limiter
+
+# Room for multipart boundaries and form fields around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _route_path(scope: Scope) -> str:
+    """Request path relative to root_path (the gateway prefix)"""
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    return path
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Cap request bodies on upload routes while they arrive.
+
+    A declared Content-Length over the limit is refused before any body is
+    read; chunked or understated bodies are cut off as soon as the running
+    total passes it, so an oversized upload is never fully received,
+    parsed or spooled to disk.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        path_prefixes: Iterable[str],
+        max_bytes: Optional[int] = None,
+        setting: str = "image_upload_max_bytes",
+        overhead: int = MULTIPART_OVERHEAD,
+    ):
+        self.app = app
+        if max_bytes is None:
+            max_bytes = getattr(get_settings(), setting)
+        self.max_bytes = max_bytes + overhead
+        self.path_prefixes = tuple(path_prefixes)
+
+    def _applies(self, scope: Scope) -> bool:
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            return False
+        return _route_path(scope).startswith(self.path_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                response = JSONResponse({"detail": "upload_too_large"}, status_code=413)
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail="upload_too_large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class RateLimitMiddleware:
+    """
+    Refuse requests to rate-limited routes before they reach the app (and
+    Supabase): 429 when the client's token bucket is empty, 503 when the
+    route already has its maximum of requests in flight. Both carry
+    Retry-After.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None, forwarded_for: Optional[bool] = None):
+        self.app = app
+        self.limiter = limiter or get_rate_limiter()
+        self.forwarded_for = get_settings().rate_limit_forwarded_for if forwarded_for is None else forwarded_for
+
+    def _client(self, scope: Scope) -> str:
+        if self.forwarded_for:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    # The last hop was added by our own proxy; earlier ones are client-supplied
+                    return value.decode("latin-1").split(",")[-1].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        route: Optional[str] = None
+        if scope["type"] == "http":
+            route = self.limiter.route_for(scope["method"], _route_path(scope))
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        refused = await self.limiter.admit(route, self._client(scope))
+        if refused:
+            status_code, detail, retry_after = refused
+            response = JSONResponse({"detail": detail}, status_code=status_code, headers={"Retry-After": str(retry_after)})
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(route)
+
+
+class MetricsMiddleware:
+    """
+    Record each request's latency and Supabase calls under its route
+    template (/projects/{project_id}, not the concrete path) and, when
+    server_timing is on, report them in a Server-Timing header:
+    app;dur=<ms>, upstream;dur=<ms summed over calls>;desc="<n> calls".
+    """
+
+    def __init__(self, app: ASGIApp, enabled: Optional[bool] = None, server_timing: Optional[bool] = None):
+        self.app = app
+        settings = get_settings()
+        self.enabled = settings.metrics_enabled if enabled is None else enabled
+        self.server_timing = settings.server_timing if server_timing is None else server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        timing = metrics.start_request()
+        status = 500
+
+        async def timed_send(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", metrics.server_timing(timing))
+                    headers.append("Timing-Allow-Origin", "*")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            # Starlette stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            metrics.observe_request(scope["method"], getattr(route, "path", "unmatched"), status, timing)
+
+
+class LazyRouterMiddleware:
+    """
+    Import each router on the first request for one of its paths instead
+    of at startup, so a cold start only pays for the routers it uses.
+    Paths no router claims (docs, openapi.json, 404s) load them all.
+    """
+
+    def __init__(self, app: ASGIApp, router: APIRouter):
+        self.app = app
+        self.router = router
+        self.complete = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.complete and scope["type"] in ("http", "websocket"):
+            name = router_for(_route_path(scope))
+            self.complete = load_routers(self.router, None if name is None else [name])
+        await self.app(scope, receive, send)
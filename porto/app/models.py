@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import datetime
 
 
@@ -36,6 +36,9 @@ class Image(BaseModel):
     filename: Optional[str] = None
     mime_type: Optional[str] = None
     data_uri: Optional[str] = None
+    storage_key: Optional[str] = None
+    size: Optional[int] = None
+    content_hash: Optional[str] = None
     created_at: Optional[datetime] = None
 
 
@@ -78,6 +81,16 @@ class BlogPost(BaseModel):
     updated_at: Optional[datetime] = None
 
 
+class BulkRequest(BaseModel):
+    items: List[dict]
+    atomic: bool = False
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[Union[int, str]]
+    atomic: bool = False
+
+
 class Stats(BaseModel):
     projects: int = 0
     images: int = 0
@@ -1 +1,42 @@
-# This file makes the routers directory a Python package
+# Routers are imported on demand: each module is loaded (and its routes
+# registered) the first time a request reaches one of its paths
+import importlib
+from typing import Dict, Iterable, Optional, Set, Tuple
+from fastapi import APIRouter
+
+# Module -> the path prefixes it serves; prefixes must not overlap across modules
+ROUTER_PATHS: Dict[str, Tuple[str, ...]] = {
+    "health": ("/health", "/diag", "/metrics"),
+    "auth": ("/auth",),
+    "projects": ("/projects",),
+    "images": ("/images",),
+    "messages": ("/messages",),
+    "comments": ("/comments",),
+    "experiences": ("/experiences",),
+    "blog": ("/blog",),
+    "stats": ("/stats",),
+    "search": ("/search",),
+    "backup": ("/export", "/import"),
+}
+
+_loaded: Set[str] = set()
+
+
+def router_for(path: str) -> Optional[str]:
+    """Module serving path, or None (docs, openapi.json, unknown paths need them all)"""
+    for name, prefixes in ROUTER_PATHS.items():
+        for prefix in prefixes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return name
+    return None
+
+
+def load_routers(target: APIRouter, names: Optional[Iterable[str]] = None) -> bool:
+    """Import and include the named routers (default: all); True once all are loaded"""
+    for name in ROUTER_PATHS if names is None else names:
+        if name in _loaded:
+            continue
+        module = importlib.import_module(f"app.routers.{name}")
+        target.include_router(module.router)
+        _loaded.add(name)
+    return len(_loaded) == len(ROUTER_PATHS)
@@ -1,13 +1,17 @@
+from typing import TYPE_CHECKING
 from fastapi import APIRouter, HTTPException, Depends
 from app.models import LoginRequest, LoginResponse, User
-from app.utils import supabase
-from app.dependencies import get_current_user
+from app.utils import get_supabase, get_auth_client
+from app.dependencies import get_current_user, get_is_admin, invalidate_admin_cache
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/login", response_model=LoginResponse)
-async def login(request: LoginRequest):
+async def login(request: LoginRequest, db: "AsyncClient" = Depends(get_supabase)):
     """Login with email/username and password"""
     email = request.email
     password = request.password
@@ -18,7 +22,7 @@ async def login(request: LoginRequest):
             email = request.identifier
         else:
             # Resolve email via username
-            result = supabase.table("admins").select("email").eq("username", request.identifier).execute()
+            result = await db.table("admins").select("email").eq("username", request.identifier).execute()
             if not result.data:
                 raise HTTPException(status_code=400, detail="invalid_username")
             email = result.data[0]["email"]
@@ -28,11 +32,14 @@ async def login(request: LoginRequest):
 
     # Authenticate with Supabase
     try:
-        auth_response = supabase.auth.sign_in_with_password({"email": email, "password": password})
+        auth_response = await get_auth_client().sign_in_with_password({"email": email, "password": password})
 
         if not auth_response or not auth_response.session:
             raise HTTPException(status_code=400, detail="login_failed")
 
+        # Fresh sign-in: re-read admin membership on the next request
+        invalidate_admin_cache(auth_response.user.id)
+
         return LoginResponse(
             access_token=auth_response.session.access_token,
             refresh_token=auth_response.session.refresh_token,
@@ -43,13 +50,9 @@ async def login(request: LoginRequest):
 
 
 @router.get("/me")
-async def get_me(user: User = Depends(get_current_user)):
+async def get_me(user: User = Depends(get_current_user), is_admin: bool = Depends(get_is_admin)):
     """Get current authenticated user"""
     if not user:
         raise HTTPException(status_code=401, detail="unauthorized")
 
-    # Check if admin
-    result = supabase.table("admins").select("user_id").eq("user_id", user.id).execute()
-    is_admin = len(result.data) > 0
-
     return {"user": user, "isAdmin": is_admin}
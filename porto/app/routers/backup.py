@@ -0,0 +1,79 @@
+from typing import TYPE_CHECKING
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timezone
+import os
+import tarfile
+from starlette.concurrency import run_in_threadpool
+from app.models import User
+from app.config import get_settings
+from app.utils import get_supabase
+from app.utils.stats import stats_engine
+from app.utils.comment_hub import comment_hub
+from app.utils.response_cache import response_cache
+from app.utils.blob_store import spool_chunks
+from app.utils.backup import BackupImporter, export_ndjson, export_tar, import_ndjson, import_tar
+from app.dependencies import require_admin
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+router = APIRouter(tags=["backup"])
+
+
+@router.get("/export")
+async def export_backup(
+    format: str = Query("tar", pattern="^(tar|ndjson)$"),
+    user: User = Depends(require_admin),
+    db: "AsyncClient" = Depends(get_supabase)
+):
+    """
+    Stream every table as a backup (admin only).
+    tar holds one NDJSON member per page plus each image's raw bytes;
+    ndjson is one {"table", "row"} object per line with images base64-encoded.
+    """
+    page_size = get_settings().backup_batch_size
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    if format == "ndjson":
+        body, media_type = export_ndjson(db, page_size), "application/x-ndjson"
+    else:
+        body, media_type = export_tar(db, page_size), "application/x-tar"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="porto-backup-{stamp}.{format}"'},
+    )
+
+
+@router.post("/import")
+async def import_backup(request: Request, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """
+    Restore an /export archive (tar or ndjson, detected from the body) by
+    upserting on id (admin only). The body is spooled to disk first and
+    then read back in batches, so memory use stays flat; archives over
+    backup_import_max_bytes are refused with 413 while they arrive.
+    """
+    path = await spool_chunks(request.stream())
+    try:
+        with open(path, "rb") as archive:
+            importer = BackupImporter(db, get_settings().backup_batch_size)
+            if await run_in_threadpool(tarfile.is_tarfile, archive):
+                await run_in_threadpool(archive.seek, 0)
+                await import_tar(archive, importer)
+            else:
+                await run_in_threadpool(archive.seek, 0)
+                await import_ndjson(archive, importer)
+            summary = await importer.finish()
+    finally:
+        os.unlink(path)
+
+    # Serial ids were written explicitly; move the sequences past them
+    try:
+        await db.rpc("sync_identity_sequences").execute()
+    except Exception:
+        pass
+
+    await stats_engine.reconcile(db)
+    await comment_hub.reload(db)
+    response_cache.clear()
+    return summary
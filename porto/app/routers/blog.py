@@ -1,9 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from typing import TYPE_CHECKING, Dict, List, Optional
+from datetime import datetime, timezone
 import re
-from app.models import BlogPost, User
-from app.utils import supabase
-from app.dependencies import get_current_user, require_admin
+from app.models import BlogPost, BulkDeleteRequest, BulkRequest, User
+from app.utils import get_supabase
+from app.utils.stats import stats_engine
+from app.utils.response_cache import response_cache
+from app.utils.pagination import COUNT_PATTERN, count_method, empty_page, keyset, keyset_page
+from app.utils.search import build_tsquery
+from app.utils.conditional import http_date
+from app.utils.image_store import discard_new_images, extract_inline_images
+from app.utils.bulk import SUCCESS, BulkOutcome, bulk_delete, bulk_insert, bulk_update, unique_ids, update_items, validate_items
+from app.dependencies import get_is_admin, require_admin
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
 
 router = APIRouter(prefix="/blog", tags=["blog"])
 
@@ -17,67 +28,184 @@ def generate_slug(title: str) -> str:
     return slug.strip('-')
 
 
+def invalidate_blog_cache(posts: list, slug_changed: bool = False):
+    """Drop cached listings and the detail pages of the given posts"""
+    if slug_changed:
+        # The old slug is unknown here, so every cached post page goes
+        response_cache.invalidate("blog", "blog_post")
+    else:
+        response_cache.invalidate("blog", *(f"blog_post:{post.get('slug')}" for post in posts))
+
+
+async def extract_post_images(db: "AsyncClient", post_data: dict, created: List[dict]):
+    """Store embedded data URI images as images rows and link them by URL instead"""
+    for field in ("content", "featured_image"):
+        if isinstance(post_data.get(field), str):
+            post_data[field], _ = await extract_inline_images(db, post_data[field], filename=f"blog-{field}", created=created)
+
+
+async def write_post(db: "AsyncClient", write, created: List[dict]):
+    """Run a post write; images extracted for it are discarded if it fails or matches nothing"""
+    try:
+        result = await write.execute()
+    except Exception:
+        await discard_new_images(db, created)
+        raise
+    if not result.data:
+        await discard_new_images(db, created)
+    return result
+
+
+async def discard_failed_items(db: "AsyncClient", created: Dict[int, List[dict]], outcome: BulkOutcome):
+    """Discard images extracted for bulk items that were not written"""
+    rows = []
+    for index, images in created.items():
+        result = outcome.results[index]
+        if not result or result["status"] not in SUCCESS:
+            rows += images
+    await discard_new_images(db, rows)
+
+
 @router.get("")
 async def get_blog_posts(
+    request: Request,
     q: Optional[str] = Query(None),
     tag: Optional[str] = Query(None),
-    limit: int = Query(12, le=200),
+    limit: int = Query(12, ge=1, le=200),
     offset: int = Query(0, ge=0),
-    user: Optional[User] = Depends(get_current_user)
+    cursor: Optional[str] = Query(None),
+    count: str = Query("exact", pattern=COUNT_PATTERN),
+    is_admin: bool = Depends(get_is_admin),
+    db: "AsyncClient" = Depends(get_supabase)
 ):
-    """Get blog posts (public shows published only, admin shows all)"""
-    # Check if user is admin
-    is_admin = False
-    if user:
-        admin_result = supabase.table("admins").select("user_id").eq("user_id", user.id).execute()
-        is_admin = len(admin_result.data) > 0
+    """
+    Get blog posts (public shows published only, admin shows all).
+    Pass cursor (empty for the first page) for keyset paging.
+    """
+    async def load():
+        # Admin gets all fields, public gets limited fields
+        fields = "*" if is_admin else "id,title,slug,excerpt,featured_image,tags,published,created_at,updated_at"
+
+        query = db.table("blog_posts").select(
+            fields,
+            count=count_method(count) if not cursor else None
+        )
 
-    # Admin gets all fields, public gets limited fields
-    fields = "*" if is_admin else "id,title,slug,excerpt,featured_image,tags,published,created_at,updated_at"
+        # Only filter by published if not admin
+        if not is_admin:
+            query = query.eq("published", True)
 
-    query = supabase.table("blog_posts").select(
-        fields,
-        count="exact"
-    ).order("created_at", desc=True)
+        # Indexed full-text match; q without any words matches nothing, as on /search
+        if q:
+            tsquery = build_tsquery(q)
+            if not tsquery:
+                return empty_page(cursor)
+            query = query.filter("search_vector", "fts(english)", tsquery)
 
-    # Only filter by published if not admin
-    if not is_admin:
-        query = query.eq("published", True)
+        if tag:
+            query = query.contains("tags", [tag])
 
-    if q:
-        query = query.or_(f"title.ilike.%{q}%,excerpt.ilike.%{q}%,content.ilike.%{q}%")
+        if cursor is not None:
+            result = await keyset(query, "created_at", cursor, limit).execute()
+            return keyset_page(result.data, "created_at", limit, result.count)
 
-    if tag:
-        query = query.contains("tags", [tag])
+        query = query.order("created_at", desc=True).range(offset, offset + limit - 1)
+        result = await query.execute()
 
-    query = query.range(offset, offset + limit - 1)
-    result = query.execute()
+        return {"items": result.data, "total": result.count}
 
-    return {"items": result.data, "total": result.count}
+    # Admin views include drafts and are never cached
+    if is_admin:
+        return await load()
+    return await response_cache.serve(request, load, tags=("blog",))
 
 
 @router.get("/{slug}")
-async def get_blog_post(slug: str, user: Optional[User] = Depends(get_current_user)):
+async def get_blog_post(request: Request, slug: str, is_admin: bool = Depends(get_is_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Get single blog post by slug (public for published, admin for all)"""
-    # Check if user is admin
-    is_admin = False
-    if user:
-        admin_result = supabase.table("admins").select("user_id").eq("user_id", user.id).execute()
-        is_admin = len(admin_result.data) > 0
+    async def load():
+        query = db.table("blog_posts").select("*").eq("slug", slug)
+        if not is_admin:
+            query = query.eq("published", True)
 
-    query = supabase.table("blog_posts").select("*").eq("slug", slug)
-    if not is_admin:
-        query = query.eq("published", True)
+        result = await query.execute()
+        if not result.data:
+            raise HTTPException(status_code=404, detail="post_not_found")
 
-    result = query.execute()
-    if not result.data:
-        raise HTTPException(status_code=404, detail="post_not_found")
+        return result.data[0]
+
+    if is_admin:
+        return await load()
+    return await response_cache.serve(
+        request,
+        load,
+        tags=("blog_post", f"blog_post:{slug}"),
+        last_modified=lambda post: http_date(post.get("updated_at") or post.get("created_at")),
+    )
 
-    return result.data[0]
+
+def prepare_post_update(update_data: dict, now: Optional[str] = None) -> dict:
+    """Fields set alongside every post update; bulk requests pass one now for all items"""
+    # Drives Last-Modified on /blog/{slug}
+    update_data["updated_at"] = now or datetime.now(timezone.utc).isoformat()
+    # Update slug if title changed and slug not explicitly set
+    if update_data.get("title") and "slug" not in update_data:
+        update_data["slug"] = generate_slug(update_data["title"])
+    return update_data
+
+
+@router.post("/posts/bulk")
+async def bulk_create_blog_posts(body: BulkRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Create many blog posts in one insert (admin only); atomic=true for all-or-nothing"""
+    outcome = BulkOutcome(len(body.items), body.atomic)
+    rows = validate_items(BlogPost, body.items, outcome)
+    created: Dict[int, List[dict]] = {}
+    if not outcome.aborted:
+        for index, post_data in rows:
+            if not post_data.get("slug") and post_data.get("title"):
+                post_data["slug"] = generate_slug(post_data["title"])
+            await extract_post_images(db, post_data, created.setdefault(index, []))
+
+    await bulk_insert(db, "blog_posts", rows, outcome)
+    await discard_failed_items(db, created, outcome)
+    if outcome.rows:
+        stats_engine.adjust("blog_posts", len(outcome.rows))
+        invalidate_blog_cache(outcome.rows)
+    return outcome.response()
+
+
+@router.post("/posts/bulk/update")
+async def bulk_update_blog_posts(body: BulkRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Update many blog posts, each item carrying its id (admin only)"""
+    outcome = BulkOutcome(len(body.items), body.atomic)
+    # One timestamp per request, so items with the same fields still group into one statement
+    now = datetime.now(timezone.utc).isoformat()
+    updates = update_items(body.items, outcome, prepare=lambda changes: prepare_post_update(changes, now))
+    created: Dict[int, List[dict]] = {}
+    if not outcome.aborted:
+        for index, _, update_data in updates:
+            await extract_post_images(db, update_data, created.setdefault(index, []))
+
+    await bulk_update(db, "blog_posts", updates, outcome)
+    await discard_failed_items(db, created, outcome)
+    if outcome.rows:
+        invalidate_blog_cache(outcome.rows, slug_changed=any("slug" in changes for _, _, changes in updates))
+    return outcome.response()
+
+
+@router.post("/posts/bulk/delete")
+async def bulk_delete_blog_posts(body: BulkDeleteRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Delete many blog posts in one statement (admin only)"""
+    outcome = BulkOutcome(len(body.ids), body.atomic)
+    await bulk_delete(db, "blog_posts", unique_ids(body.ids, outcome), outcome)
+    if outcome.rows:
+        stats_engine.adjust("blog_posts", -len(outcome.rows))
+        invalidate_blog_cache(outcome.rows)
+    return outcome.response()
 
 
 @router.post("/posts")
-async def create_blog_post(post: BlogPost, user: User = Depends(require_admin)):
+async def create_blog_post(post: BlogPost, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Create new blog post (admin only)"""
     post_data = post.dict(exclude_none=True)
 
@@ -85,33 +213,44 @@ async def create_blog_post(post: BlogPost, user: User = Depends(require_admin)):
     if not post_data.get("slug") and post_data.get("title"):
         post_data["slug"] = generate_slug(post_data["title"])
 
-    result = supabase.table("blog_posts").insert(post_data).execute()
+    created: List[dict] = []
+    await extract_post_images(db, post_data, created)
+
+    result = await write_post(db, db.table("blog_posts").insert(post_data), created)
     if result.data:
+        stats_engine.adjust("blog_posts", 1)
+        invalidate_blog_cache(result.data)
         return result.data[0]
     raise HTTPException(status_code=500, detail="failed_to_create_blog_post")
 
 
 @router.post("/update")
-async def update_blog_post(data: dict, user: User = Depends(require_admin)):
+async def update_blog_post(data: dict, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Update blog post (admin only)"""
     post_id = data.get("id")
     if not post_id:
         raise HTTPException(status_code=400, detail="id_required")
 
-    update_data = {k: v for k, v in data.items() if k != "id"}
+    # Checked before any inline image is stored for it
+    existing = await db.table("blog_posts").select("id").eq("id", post_id).execute()
+    if not existing.data:
+        raise HTTPException(status_code=404, detail="blog_post_not_found")
 
-    # Update slug if title changed and slug not explicitly set
-    if update_data.get("title") and "slug" not in data:
-        update_data["slug"] = generate_slug(update_data["title"])
+    update_data = prepare_post_update({k: v for k, v in data.items() if k != "id"})
+    created: List[dict] = []
+    await extract_post_images(db, update_data, created)
 
-    result = supabase.table("blog_posts").update(update_data).eq("id", post_id).execute()
+    result = await write_post(db, db.table("blog_posts").update(update_data).eq("id", post_id), created)
     if result.data:
+        invalidate_blog_cache(result.data, slug_changed="slug" in update_data)
         return result.data[0]
     raise HTTPException(status_code=404, detail="blog_post_not_found")
 
 
 @router.delete("/{post_id}")
-async def delete_blog_post(post_id: str, user: User = Depends(require_admin)):
+async def delete_blog_post(post_id: str, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Delete blog post (admin only)"""
-    supabase.table("blog_posts").delete().eq("id", post_id).execute()
+    result = await db.table("blog_posts").delete().eq("id", post_id).execute()
+    stats_engine.adjust("blog_posts", -len(result.data))
+    invalidate_blog_cache(result.data)
     return {"ok": True}
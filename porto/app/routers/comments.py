@@ -1,29 +1,69 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import StreamingResponse
-from app.models import Comment, User
-from app.utils import supabase
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.models import BulkDeleteRequest, Comment, User
+from app.utils import get_supabase
+from app.utils.stats import stats_engine
+from app.utils.bulk import BulkOutcome, bulk_delete, unique_ids
+from app.utils.comment_hub import comment_hub
+from app.utils.write_behind import WriteBehindQueue
+from app.utils.response_cache import response_cache
+from app.utils.pagination import COUNT_PATTERN, count_method, keyset, keyset_page
+from app.config import get_settings
 from app.dependencies import require_admin
+from typing import TYPE_CHECKING, Optional
 import asyncio
 import json
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
 router = APIRouter(prefix="/comments", tags=["comments"])
 
 
 @router.get("")
 async def get_comments(
-    limit: int = Query(50, le=200),
-    offset: int = Query(0, ge=0)
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    count: str = Query("exact", pattern=COUNT_PATTERN),
+    db: "AsyncClient" = Depends(get_supabase)
 ):
-    """Get all comments (public)"""
-    query = supabase.table("comments").select("*", count="exact").order("created_at", desc=True)
-    query = query.range(offset, offset + limit - 1)
-    result = query.execute()
-    return result.data
+    """
+    Get all comments (public).
+    Offset paging returns a plain list; pass cursor (empty for the first
+    page) to get {items, next_cursor, total} with keyset paging instead.
+    """
+    async def load():
+        if cursor is not None:
+            query = db.table("comments").select("*", count=count_method(count) if not cursor else None)
+            result = await keyset(query, "created_at", cursor, limit).execute()
+            return keyset_page(result.data, "created_at", limit, result.count)
+
+        query = db.table("comments").select("*").order("created_at", desc=True)
+        query = query.range(offset, offset + limit - 1)
+        result = await query.execute()
+        return result.data
+
+    return await response_cache.serve(request, load, tags=("comments",))
+
+
+def comments_written(rows: list):
+    stats_engine.adjust("comments", len(rows))
+    comment_hub.publish(rows)
+    response_cache.invalidate("comments")
+
+
+comment_writes = WriteBehindQueue.from_settings("comments", on_flush=comments_written)
 
 
 @router.post("")
-async def create_comment(comment: Comment):
-    """Create a new comment (public)"""
+async def create_comment(comment: Comment, db: "AsyncClient" = Depends(get_supabase)):
+    """
+    Create a new comment (public).
+    With write-behind on, answers 202 and the comment reaches the table,
+    and /comments/stream, with the next batch a few milliseconds later.
+    """
     if not comment.message or not comment.message.strip():
         raise HTTPException(status_code=400, detail="message_required")
 
@@ -31,79 +71,99 @@ async def create_comment(comment: Comment):
     if comment.author:
         insert_data["author"] = comment.author
 
-    result = supabase.table("comments").insert(insert_data).execute()
+    if comment_writes.submit(insert_data):
+        return JSONResponse({"queued": True, **insert_data}, status_code=202)
+
+    result = await db.table("comments").insert(insert_data).execute()
     if result.data:
+        comments_written(result.data)
         return result.data[0]
     raise HTTPException(status_code=500, detail="failed_to_create_comment")
 
 
 @router.delete("/{comment_id}")
-async def delete_comment(comment_id: int, user: User = Depends(require_admin)):
+async def delete_comment(comment_id: int, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Delete a comment (admin only)"""
-    supabase.table("comments").delete().eq("id", comment_id).execute()
+    result = await db.table("comments").delete().eq("id", comment_id).execute()
+    stats_engine.adjust("comments", -len(result.data))
+    for deleted in result.data:
+        comment_hub.remove(deleted["id"])
+    response_cache.invalidate("comments")
     return {"ok": True}
 
 
+@router.post("/bulk/delete")
+async def bulk_delete_comments(body: BulkDeleteRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Delete many comments in one statement (admin only)"""
+    outcome = BulkOutcome(len(body.ids), body.atomic)
+    await bulk_delete(db, "comments", unique_ids(body.ids, outcome), outcome)
+    if outcome.rows:
+        stats_engine.adjust("comments", -len(outcome.rows))
+        for deleted in outcome.rows:
+            comment_hub.remove(deleted["id"])
+        response_cache.invalidate("comments")
+    return outcome.response()
+
+
 @router.post("/reset")
-async def reset_comments(user: User = Depends(require_admin)):
+async def reset_comments(user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Reset all comments (admin only)"""
     try:
-        supabase.rpc("truncate_comments").execute()
+        await db.rpc("truncate_comments").execute()
     except:
-        supabase.table("comments").delete().neq("id", 0).execute()
+        await db.table("comments").delete().neq("id", 0).execute()
         try:
-            supabase.rpc("reset_comments_identity").execute()
+            await db.rpc("reset_comments_identity").execute()
         except:
             pass
+    stats_engine.reset("comments")
+    comment_hub.clear()
+    response_cache.invalidate("comments")
     return {"ok": True}
 
 
 @router.get("/stream")
-async def stream_comments():
+async def stream_comments(last_event_id: Optional[str] = Header(None)):
     """
     Server-Sent Events endpoint for realtime comments.
-    Note: This is a basic polling implementation. For production,
-    consider using Supabase Realtime directly from frontend or websockets.
+    All clients on a worker share one poller (see comment_hub); a client
+    that cannot keep up is disconnected and should reconnect.
+    Each event carries the comment id, so a reconnecting EventSource sends
+    Last-Event-ID and receives the comments it missed before live ones.
     """
-    async def event_generator():
-        # Send initial connection message
-        yield "event: connected\ndata: {}\n\n"
+    keepalive = get_settings().comments_keepalive_interval
+    try:
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume_from = None
 
-        last_id = 0
+    async def event_generator():
+        # Subscribe before replaying so nothing posted in between is lost
+        subscription = comment_hub.subscribe()
         try:
-            # Get initial max ID
-            result = supabase.table("comments").select("id").order("id", desc=True).limit(1).execute()
-            if result.data and len(result.data) > 0:
-                last_id = result.data[0]["id"]
-        except:
-            pass
-
-        # Keep connection alive with heartbeat and check for new comments
-        while True:
-            try:
-                # Send heartbeat
-                yield ": keepalive\n\n"
-
-                # Check for new comments
-                result = supabase.table("comments").select("*").gt("id", last_id).order("id", desc=False).execute()
-
-                if result.data:
-                    for comment in result.data:
-                        # Update last_id
-                        if comment["id"] > last_id:
-                            last_id = comment["id"]
-                        # Send new comment as SSE event
-                        yield f"data: {json.dumps(comment)}\n\n"
-
-                # Wait before next poll (adjust interval as needed)
-                await asyncio.sleep(2)
-
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                # Log error but continue streaming
-                yield f": error: {str(e)}\n\n"
-                await asyncio.sleep(5)
+            # Send initial connection message
+            yield "event: connected\ndata: {}\n\n"
+
+            replayed = set()
+            if resume_from is not None:
+                for comment in await comment_hub.replay(resume_from):
+                    replayed.add(comment["id"])
+                    yield f"id: {comment['id']}\ndata: {json.dumps(comment)}\n\n"
+
+            while True:
+                try:
+                    comment = await asyncio.wait_for(subscription.queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if subscription.dropped:
+                    break
+                if comment["id"] in replayed:
+                    continue
+                yield f"id: {comment['id']}\ndata: {json.dumps(comment)}\n\n"
+        finally:
+            comment_hub.unsubscribe(subscription)
 
     return StreamingResponse(
         event_generator(),
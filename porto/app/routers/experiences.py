@@ -1,49 +1,110 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from app.models import Experience, User
-from app.utils import supabase
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from typing import TYPE_CHECKING, Optional
+from app.models import BulkDeleteRequest, BulkRequest, Experience, User
+from app.utils import get_supabase
+from app.utils.stats import stats_engine
+from app.utils.response_cache import response_cache
+from app.utils.pagination import COUNT_PATTERN, count_method, keyset, keyset_page
+from app.utils.bulk import BulkOutcome, bulk_delete, bulk_insert, bulk_update, unique_ids, update_items, validate_items
 from app.dependencies import require_admin
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
 router = APIRouter(prefix="/experiences", tags=["experiences"])
 
 
 @router.get("")
 async def get_experiences(
-    limit: int = Query(50, le=200),
-    offset: int = Query(0, ge=0)
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    count: str = Query("exact", pattern=COUNT_PATTERN),
+    db: "AsyncClient" = Depends(get_supabase)
 ):
-    """Get all experiences (public)"""
-    query = supabase.table("experiences").select("*", count="exact").order("start_date", desc=True)
-    query = query.range(offset, offset + limit - 1)
-    result = query.execute()
-    return result.data
+    """
+    Get all experiences (public).
+    Offset paging returns a plain list; pass cursor (empty for the first
+    page) to get {items, next_cursor, total} with keyset paging instead.
+    """
+    async def load():
+        if cursor is not None:
+            query = db.table("experiences").select("*", count=count_method(count) if not cursor else None)
+            result = await keyset(query, "start_date", cursor, limit).execute()
+            return keyset_page(result.data, "start_date", limit, result.count)
+
+        query = db.table("experiences").select("*").order("start_date", desc=True)
+        query = query.range(offset, offset + limit - 1)
+        result = await query.execute()
+        return result.data
+
+    return await response_cache.serve(request, load, tags=("experiences",))
 
 
 @router.post("")
-async def create_experience(experience: Experience, user: User = Depends(require_admin)):
+async def create_experience(experience: Experience, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Create a new experience (admin only)"""
-    result = supabase.table("experiences").insert(experience.dict(exclude_none=True)).execute()
+    result = await db.table("experiences").insert(experience.dict(exclude_none=True)).execute()
     if result.data:
+        stats_engine.adjust("experiences", 1)
+        response_cache.invalidate("experiences")
         return result.data[0]
     raise HTTPException(status_code=500, detail="failed_to_create_experience")
 
 
+@router.post("/bulk")
+async def bulk_create_experiences(body: BulkRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Create many experiences in one insert (admin only); atomic=true for all-or-nothing"""
+    outcome = BulkOutcome(len(body.items), body.atomic)
+    await bulk_insert(db, "experiences", validate_items(Experience, body.items, outcome), outcome)
+    if outcome.rows:
+        stats_engine.adjust("experiences", len(outcome.rows))
+        response_cache.invalidate("experiences")
+    return outcome.response()
+
+
+@router.post("/bulk/update")
+async def bulk_update_experiences(body: BulkRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Update many experiences, each item carrying its id (admin only)"""
+    outcome = BulkOutcome(len(body.items), body.atomic)
+    await bulk_update(db, "experiences", update_items(body.items, outcome), outcome)
+    if outcome.rows:
+        response_cache.invalidate("experiences")
+    return outcome.response()
+
+
+@router.post("/bulk/delete")
+async def bulk_delete_experiences(body: BulkDeleteRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Delete many experiences in one statement (admin only)"""
+    outcome = BulkOutcome(len(body.ids), body.atomic)
+    await bulk_delete(db, "experiences", unique_ids(body.ids, outcome), outcome)
+    if outcome.rows:
+        stats_engine.adjust("experiences", -len(outcome.rows))
+        response_cache.invalidate("experiences")
+    return outcome.response()
+
+
 @router.post("/update")
-async def update_experience(data: dict, user: User = Depends(require_admin)):
+async def update_experience(data: dict, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Update an experience (admin only)"""
     experience_id = data.get("id")
     if not experience_id:
         raise HTTPException(status_code=400, detail="id_required")
 
     update_data = {k: v for k, v in data.items() if k != "id"}
-    result = supabase.table("experiences").update(update_data).eq("id", experience_id).execute()
+    result = await db.table("experiences").update(update_data).eq("id", experience_id).execute()
 
     if result.data:
+        response_cache.invalidate("experiences")
         return result.data[0]
     raise HTTPException(status_code=404, detail="experience_not_found")
 
 
 @router.delete("/{experience_id}")
-async def delete_experience(experience_id: str, user: User = Depends(require_admin)):
+async def delete_experience(experience_id: str, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Delete an experience (admin only)"""
-    supabase.table("experiences").delete().eq("id", experience_id).execute()
+    result = await db.table("experiences").delete().eq("id", experience_id).execute()
+    stats_engine.adjust("experiences", -len(result.data))
+    response_cache.invalidate("experiences")
     return {"ok": True}
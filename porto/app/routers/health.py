@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
 import sys
 
 router = APIRouter(tags=["health"])
@@ -23,3 +24,17 @@ async def diag():
             "SUPABASE_SERVICE_ROLE": bool(settings.supabase_service_role),
         }
     }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics for this worker: per-route latency, Supabase calls
+    per request and per-call upstream latency
+    """
+    from app.config import get_settings
+    from app.utils import metrics as app_metrics
+    if not get_settings().metrics_enabled:
+        raise HTTPException(status_code=404, detail="metrics_disabled")
+
+    return PlainTextResponse(app_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
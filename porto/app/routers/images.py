@@ -1,25 +1,62 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File, Response
-from fastapi.responses import StreamingResponse
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, UploadFile, File, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import TYPE_CHECKING, List, Optional, Tuple
 import base64
+import hashlib
+import os
 import re
-from app.models import User
-from app.utils import supabase
+from app.models import BulkDeleteRequest, User
+from app.config import get_settings
+from app.utils import get_supabase
+from app.utils.stats import stats_engine
+from app.utils.blob_store import get_blob_store, parse_data_uri
+from app.utils.image_cache import ORIGINAL, CachedImage, ImageMeta, get_image_cache
+from app.utils.image_variants import FORMATS as VARIANT_FORMATS, VariantParams, render_variant, resolve_format, variant_params
+from app.utils.uploads import UploadStream
+from app.utils.image_store import image_references, image_url, save_image
+from app.utils.bulk import BulkOutcome, bulk_delete, unique_ids
+from app.utils.conditional import http_date, is_not_modified, not_modified, validator_headers
+from app.utils.ranges import bytes_response
 from app.dependencies import require_admin
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
 router = APIRouter(prefix="/images", tags=["images"])
 
+IMAGE_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+def variant_prefix(image_id: str) -> str:
+    """Blob store prefix holding every rendered variant of an image"""
+    return f"variants/{image_id}"
+
+
+async def purge_images(deleted: list):
+    """Drop cached copies, blobs and variants of deleted image rows"""
+    stats_engine.adjust("images", -len(deleted))
+    cache = get_image_cache()
+    store = get_blob_store()
+    for image in deleted:
+        await cache.invalidate(image["id"])
+        if store and image.get("storage_key"):
+            await store.delete(image["storage_key"])
+        if store:
+            await store.delete_prefix(variant_prefix(image["id"]))
+
 
 @router.get("")
 async def get_images(
-    limit: int = Query(24, le=100),
+    limit: int = Query(24, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    user: User = Depends(require_admin)
+    user: User = Depends(require_admin),
+    db: "AsyncClient" = Depends(get_supabase)
 ):
     """Get list of images (admin only)"""
-    query = supabase.table("images").select("id,filename,mime_type,created_at", count="exact").order("created_at", desc=True)
+    query = db.table("images").select("id,filename,mime_type,created_at", count="exact").order("created_at", desc=True)
     query = query.range(offset, offset + limit - 1)
-    result = query.execute()
+    result = await query.execute()
     return {"items": result.data, "total": result.count}
 
 
@@ -29,37 +66,37 @@ async def upload_image(
     data_uri: Optional[str] = None,
     filename: Optional[str] = None,
     mime_type: Optional[str] = None,
-    user: User = Depends(require_admin)
+    user: User = Depends(require_admin),
+    db: "AsyncClient" = Depends(get_supabase)
 ):
     """Upload a new image (admin only)"""
+    max_bytes = get_settings().image_upload_max_bytes
     if file:
-        # Handle file upload
-        file_bytes = await file.read()
+        # Handle file upload; read in chunks from Starlette's spooled temp file
+        upload = UploadStream.from_upload(file, max_bytes)
         filename = file.filename
         mime_type = file.content_type or "application/octet-stream"
-        base64_data = base64.b64encode(file_bytes).decode()
-        data_uri = f"data:{mime_type};base64,{base64_data}"
     elif data_uri:
         # Validate data URI
         if not re.match(r'^data:[^;]+;base64,', data_uri):
             raise HTTPException(status_code=400, detail="invalid_or_missing_data_uri")
+        try:
+            parsed_mime_type, file_bytes = parse_data_uri(data_uri)
+        except Exception:
+            raise HTTPException(status_code=400, detail="invalid_base64_data")
+        mime_type = mime_type or parsed_mime_type
+        upload = UploadStream.from_bytes(file_bytes, max_bytes)
     else:
         raise HTTPException(status_code=400, detail="no_file_or_data_uri_provided")
 
-    insert_data = {"data_uri": data_uri}
-    if filename:
-        insert_data["filename"] = filename
-    if mime_type:
-        insert_data["mime_type"] = mime_type
-
-    result = supabase.table("images").insert(insert_data).execute()
-    if result.data:
-        image_id = result.data[0]["id"]
+    image, created = await save_image(db, upload, mime_type, filename)
+    if image:
         return {
-            "id": image_id,
-            "filename": result.data[0].get("filename"),
-            "mime_type": result.data[0].get("mime_type"),
-            "url": f"/porto/images/{image_id}"
+            "id": image["id"],
+            "filename": image.get("filename"),
+            "mime_type": image.get("mime_type"),
+            "url": image_url(image["id"]),
+            "deduplicated": not created
         }
     raise HTTPException(status_code=500, detail="failed_to_upload_image")
 
@@ -67,43 +104,69 @@ async def upload_image(
 @router.post("/upload-for-editor")
 async def upload_image_for_editor(
     file: UploadFile = File(...),
-    user: User = Depends(require_admin)
+    user: User = Depends(require_admin),
+    db: "AsyncClient" = Depends(get_supabase)
 ):
     """Upload image for CKEditor (admin only)"""
-    file_bytes = await file.read()
-
-    if len(file_bytes) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File too large. Maximum size is 10MB.")
-
+    upload = UploadStream.from_upload(file, get_settings().image_upload_max_bytes)
     filename = file.filename or "editor-upload.jpg"
     mime_type = file.content_type or "image/jpeg"
-    base64_data = base64.b64encode(file_bytes).decode()
-    data_uri = f"data:{mime_type};base64,{base64_data}"
-
-    result = supabase.table("images").insert({
-        "filename": filename,
-        "mime_type": mime_type,
-        "data_uri": data_uri
-    }).execute()
 
-    if result.data:
-        return {"url": f"/porto/images/{result.data[0]['id']}"}
+    image, _ = await save_image(db, upload, mime_type, filename)
+    if image:
+        return {"url": image_url(image["id"])}
     raise HTTPException(status_code=500, detail="Upload failed")
 
 
-@router.get("/{image_id}")
-async def get_image(image_id: str):
-    """Get image by ID (public)"""
-    result = supabase.table("images").select("data_uri,mime_type,filename").eq("id", image_id).execute()
+def image_headers(etag: Optional[str], last_modified: Optional[str]) -> dict:
+    return {**IMAGE_CACHE_HEADERS, **validator_headers(etag, last_modified)}
 
-    if not result.data:
-        raise HTTPException(status_code=404, detail="not_found")
 
-    image = result.data[0]
-    data_uri = image["data_uri"]
+async def cached_image_response(request: Request, cached: CachedImage) -> Optional[Response]:
+    """
+    Serve a cache hit: 304, bytes from memory, or the disk file.
+    Both honour Range/If-Range; files go out through FileResponse (sendfile
+    where the server supports it), so large images never sit in memory.
+    None when the disk copy vanished (trimmed or invalidated) and no bytes
+    are held in memory.
+    """
+    headers = image_headers(cached.etag, cached.last_modified)
+    if is_not_modified(request, cached.etag, cached.last_modified):
+        return not_modified(headers)
+    if cached.path:
+        # Checked just before sending, which leaves only the stat-to-open window
+        # for a trim or invalidate to remove the file
+        try:
+            stat_result = await run_in_threadpool(os.stat, cached.path)
+        except FileNotFoundError:
+            stat_result = None
+        if stat_result:
+            return FileResponse(cached.path, stat_result=stat_result, media_type=cached.content_type, headers=headers)
+    if cached.content is None:
+        return None
+    return bytes_response(request, cached.content, cached.content_type, headers, cached.etag, cached.last_modified)
+
 
-    # Parse data URI
-    match = re.match(r'^data:([^;]+);base64,(.*)$', data_uri)
+@router.get("/cache")
+async def get_image_cache_stats(user: User = Depends(require_admin)):
+    """Image cache hit/miss/eviction counters (admin only)"""
+    return get_image_cache().snapshot()
+
+
+async def load_original(db: "AsyncClient", image_id: str, image: dict) -> Tuple[bytes, str]:
+    """Raw bytes and content type of an image row, from the blob store or the legacy data URI"""
+    if image.get("storage_key"):
+        # Binary storage: serve the raw bytes as stored
+        store = get_blob_store()
+        img_bytes = await store.get(image["storage_key"]) if store else None
+        if img_bytes is None:
+            raise HTTPException(status_code=404, detail="blob_not_found")
+        return img_bytes, image.get("mime_type") or "application/octet-stream"
+
+    # Legacy rows still hold a base64 data URI, fetched only when needed
+    legacy = await db.table("images").select("data_uri").eq("id", image_id).execute()
+    data_uri = legacy.data[0].get("data_uri") if legacy.data else None
+    match = re.match(r'^data:([^;]+);base64,(.*)$', data_uri or "")
     if not match:
         raise HTTPException(status_code=400, detail="corrupt_data_uri")
 
@@ -114,15 +177,144 @@ async def get_image(image_id: str):
         img_bytes = base64.b64decode(base64_data)
     except Exception:
         raise HTTPException(status_code=400, detail="invalid_base64_data")
+    return img_bytes, content_type
+
+
+async def load_variant(db: "AsyncClient", image_id: str, image: dict, params: VariantParams) -> Tuple[bytes, str]:
+    """
+    A resized/transcoded variant: from the blob store if it was rendered
+    before, otherwise rendered from the original and stored for next time.
+    """
+    params = resolve_format(params, image.get("mime_type"))
+    content_type = VARIANT_FORMATS[params.fmt]
+    store = get_blob_store()
+    variant_key = f"{variant_prefix(image_id)}/{params.name}"
+    if store:
+        stored = await store.get(variant_key)
+        if stored is not None:
+            return stored, content_type
 
-    return Response(content=img_bytes, media_type=content_type, headers={
-        "Cache-Control": "public, max-age=31536000, immutable"
-    })
+    cached = await get_image_cache().get(image_id)
+    if cached:
+        original = await cached.read()
+    else:
+        original, _ = await load_original(db, image_id, image)
+
+    variant = await render_variant(image_id, original, params)
+    if store:
+        await store.put(variant_key, variant, content_type)
+    return variant, content_type
+
+
+async def unreferenced_ids(db: "AsyncClient", pairs: List[Tuple[int, object]], outcome: BulkOutcome) -> List[Tuple[int, object]]:
+    """(index, id) pairs no blog post shows; the rest are recorded as in use"""
+    if outcome.aborted or not pairs:
+        return pairs
+    references = await image_references(db, [item_id for _, item_id in pairs])
+    free = []
+    for index, item_id in pairs:
+        posts = references.get(str(item_id))
+        if posts:
+            outcome.set(index, "in_use", id=item_id, error="referenced_by_blog_posts: " + ", ".join(posts))
+        else:
+            free.append((index, item_id))
+    if outcome.atomic and outcome.has_failures:
+        outcome.abort(409, "bulk_items_in_use")
+    return free
+
+
+@router.post("/bulk/delete")
+async def bulk_delete_images(
+    body: BulkDeleteRequest,
+    force: bool = Query(False),
+    user: User = Depends(require_admin),
+    db: "AsyncClient" = Depends(get_supabase)
+):
+    """
+    Delete many images in one statement (admin only). Images a blog post
+    still shows are left alone (status in_use) unless force=true.
+    """
+    outcome = BulkOutcome(len(body.ids), body.atomic)
+    pairs = unique_ids(body.ids, outcome)
+    if not force:
+        pairs = await unreferenced_ids(db, pairs, outcome)
+    await bulk_delete(db, "images", pairs, outcome)
+    await purge_images(outcome.rows)
+    return outcome.response()
+
+
+@router.get("/{image_id}")
+async def get_image(
+    image_id: str,
+    request: Request,
+    w: Optional[int] = Query(None),
+    h: Optional[int] = Query(None),
+    fmt: Optional[str] = Query(None),
+    q: Optional[int] = Query(None),
+    db: "AsyncClient" = Depends(get_supabase)
+):
+    """
+    Get image by ID (public).
+    w/h fit the image within a box (never upscaling), fmt transcodes
+    (webp, avif, jpeg, png) and q sets the quality; each variant is
+    rendered once and cached like the original.
+    The ETag is the content hash, so a revalidating client is answered
+    from the row's metadata without reading the image bytes.
+    """
+    params = variant_params(w, h, fmt, q)
+    variant = params.name if params else ORIGINAL
+    cache = get_image_cache()
+    cached = await cache.get(image_id, variant)
+    response = await cached_image_response(request, cached) if cached else None
+    if response:
+        return response
+
+    result = await db.table("images").select("mime_type,filename,storage_key,content_hash,created_at").eq("id", image_id).execute()
+
+    if not result.data:
+        raise HTTPException(status_code=404, detail="not_found")
+
+    image = result.data[0]
+    content_hash = image.get("content_hash")
+    etag = None
+    if content_hash:
+        etag = f'"{content_hash}-{variant}"' if params else f'"{content_hash}"'
+    last_modified = http_date(image.get("created_at"))
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(image_headers(etag, last_modified))
+
+    store = get_blob_store()
+    if not params and etag and cache.disk_path and store and image.get("storage_key"):
+        # Stored originals go from the blob store into the disk tier and are
+        # served from there, so a miss never holds the whole image in memory
+        chunks = await store.open_stream(image["storage_key"])
+        if chunks is None:
+            raise HTTPException(status_code=404, detail="blob_not_found")
+        content_type = image.get("mime_type") or "application/octet-stream"
+        disk_path = await cache.put_stream(image_id, chunks, content_type, etag=etag, last_modified=last_modified)
+        response = await cached_image_response(request, CachedImage(ImageMeta(content_type, etag, last_modified), path=disk_path))
+        if response:
+            return response
+
+    if params:
+        img_bytes, content_type = await load_variant(db, image_id, image, params)
+    else:
+        img_bytes, content_type = await load_original(db, image_id, image)
+
+    if etag is None:
+        etag = f'"{hashlib.sha256(img_bytes).hexdigest()}"'
+    disk_path = await cache.put(image_id, img_bytes, content_type, variant=variant, etag=etag, last_modified=last_modified)
+    # The bytes stay as a fallback in case the disk copy is trimmed before it is opened
+    return await cached_image_response(request, CachedImage(
+        ImageMeta(content_type, etag, last_modified),
+        content=img_bytes,
+        path=disk_path,
+    ))
 
 
 @router.patch("/{image_id}")
 @router.post("/{image_id}")
-async def update_image(image_id: str, data: dict, user: User = Depends(require_admin)):
+async def update_image(image_id: str, data: dict, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Update image metadata (admin only)"""
     update_data = {}
     if "filename" in data:
@@ -133,14 +325,29 @@ async def update_image(image_id: str, data: dict, user: User = Depends(require_a
     if not update_data:
         raise HTTPException(status_code=400, detail="no_updatable_fields")
 
-    result = supabase.table("images").update(update_data).eq("id", image_id).execute()
+    result = await db.table("images").update(update_data).eq("id", image_id).execute()
+    await get_image_cache().invalidate(image_id)
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=404, detail="image_not_found")
 
 
 @router.delete("/{image_id}")
-async def delete_image(image_id: str, user: User = Depends(require_admin)):
-    """Delete an image (admin only)"""
-    supabase.table("images").delete().eq("id", image_id).execute()
+async def delete_image(
+    image_id: str,
+    force: bool = Query(False),
+    user: User = Depends(require_admin),
+    db: "AsyncClient" = Depends(get_supabase)
+):
+    """
+    Delete an image (admin only). Identical uploads share one row, so an
+    image a blog post still shows is refused with 409 (listing the posts)
+    unless force=true.
+    """
+    if not force:
+        posts = (await image_references(db, [image_id])).get(image_id)
+        if posts:
+            return JSONResponse({"detail": "image_in_use", "posts": posts}, status_code=409)
+    result = await db.table("images").delete().eq("id", image_id).execute()
+    await purge_images(result.data or [])
     return {"ok": True}
@@ -1,21 +1,85 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.models import Message, User
-from app.utils import supabase
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import TYPE_CHECKING, Optional
+import json
+from app.models import BulkDeleteRequest, BulkRequest, Message, User
+from app.utils import get_supabase
+from app.utils.stats import stats_engine
+from app.utils.pagination import COUNT_PATTERN, count_method, keyset, keyset_page
+from app.utils.write_behind import WriteBehindQueue
+from app.utils.bulk import BulkOutcome, bulk_delete, bulk_update, unique_ids, update_items
 from app.dependencies import require_admin
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
 router = APIRouter(prefix="/messages", tags=["messages"])
 
+DEFAULT_PAGE_SIZE = 50
+# Rows fetched per round-trip when streaming an NDJSON export
+EXPORT_PAGE_SIZE = 500
+
 
 @router.get("")
-async def get_messages(user: User = Depends(require_admin)):
-    """Get all messages (admin only)"""
-    result = supabase.table("messages").select("*").order("created_at", desc=True).execute()
-    return result.data
+async def get_messages(
+    read: Optional[bool] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=200),
+    offset: Optional[int] = Query(None, ge=0),
+    cursor: Optional[str] = Query(None),
+    count: str = Query("exact", pattern=COUNT_PATTERN),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    user: User = Depends(require_admin),
+    db: "AsyncClient" = Depends(get_supabase)
+):
+    """
+    Get messages, newest first (admin only); read=false lists the unread ones.
+    Returns {items, next_cursor, total}, at most limit per page; pass
+    next_cursor back as cursor for the following page. offset pages return
+    a plain list instead. format=ndjson streams every matching message, one
+    JSON object per line, a page at a time.
+    """
+    def select(columns: str = "*", count_with: Optional[str] = None):
+        query = db.table("messages").select(columns, count=count_with)
+        if read is True:
+            query = query.eq("read", True)
+        elif read is False:
+            query = query.not_.is_("read", "true")
+        return query
+
+    if format == "ndjson":
+        return StreamingResponse(export_messages(select), media_type="application/x-ndjson")
+
+    if offset is not None and cursor is None:
+        query = select().order("created_at", desc=True).order("id", desc=True)
+        result = await query.range(offset, offset + limit - 1).execute()
+        return result.data
+
+    query = select(count_with=count_method(count) if not cursor else None)
+    result = await keyset(query, "created_at", cursor, limit).execute()
+    return keyset_page(result.data, "created_at", limit, result.count)
+
+
+async def export_messages(select):
+    """NDJSON lines for every row of select(), fetched by keyset so memory stays flat"""
+    cursor = ""
+    while cursor is not None:
+        result = await keyset(select(), "created_at", cursor, EXPORT_PAGE_SIZE).execute()
+        page = keyset_page(result.data, "created_at", EXPORT_PAGE_SIZE)
+        if page["items"]:
+            yield "".join(json.dumps(row, default=str) + "\n" for row in page["items"])
+        cursor = page["next_cursor"]
+
+
+def messages_written(rows: list):
+    stats_engine.adjust("unread", len(rows))
+
+
+message_writes = WriteBehindQueue.from_settings("messages", on_flush=messages_written)
 
 
 @router.post("")
-async def create_message(message: Message):
-    """Create a new contact message (public)"""
+async def create_message(message: Message, db: "AsyncClient" = Depends(get_supabase)):
+    """Create a new contact message (public); 202 when queued by write-behind"""
     insert_data = {
         "name": message.name,
         "message": message.message
@@ -23,48 +87,102 @@ async def create_message(message: Message):
     if message.email:
         insert_data["email"] = message.email
 
-    result = supabase.table("messages").insert(insert_data).execute()
+    if message_writes.submit(insert_data):
+        return JSONResponse({"queued": True, **insert_data}, status_code=202)
+
+    result = await db.table("messages").insert(insert_data).execute()
     if result.data:
+        messages_written(result.data)
         return result.data[0]
     raise HTTPException(status_code=500, detail="failed_to_create_message")
 
 
+# Registered before /{message_id} so POST /reset is not taken as a message id
+@router.post("/reset")
+async def reset_messages(user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Reset all messages (admin only)"""
+    try:
+        # Try RPC first
+        await db.rpc("truncate_messages").execute()
+    except:
+        # Fallback: delete all rows
+        await db.table("messages").delete().neq("id", 0).execute()
+        try:
+            await db.rpc("reset_messages_identity").execute()
+        except:
+            pass
+
+    stats_engine.reset("unread")
+    return {"ok": True}
+
+
+def read_changes(data: dict) -> dict:
+    """The only field an admin may change on a message"""
+    if "read" in data and isinstance(data["read"], bool):
+        return {"read": data["read"]}
+    return {}
+
+
+@router.post("/bulk/update")
+async def bulk_update_messages(body: BulkRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """
+    Mark many messages read/unread (admin only).
+    Items with the same read value go out as one UPDATE ... WHERE id IN (...).
+    """
+    outcome = BulkOutcome(len(body.items), body.atomic)
+    updates = update_items(body.items, outcome, prepare=read_changes)
+    before = {}
+    if updates and not outcome.aborted:
+        # Prior read state, so only rows that actually flip move the unread counter
+        result = await db.table("messages").select("id,read").in_("id", [item_id for _, item_id, _ in updates]).execute()
+        before = {str(row["id"]): bool(row.get("read")) for row in result.data}
+
+    await bulk_update(db, "messages", updates, outcome)
+    delta = 0
+    for row in outcome.rows:
+        was_read = before.get(str(row["id"]))
+        if was_read is not None and was_read != bool(row.get("read")):
+            delta += 1 if was_read else -1
+    stats_engine.adjust("unread", delta)
+    return outcome.response()
+
+
+@router.post("/bulk/delete")
+async def bulk_delete_messages(body: BulkDeleteRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Delete many messages in one statement (admin only)"""
+    outcome = BulkOutcome(len(body.ids), body.atomic)
+    await bulk_delete(db, "messages", unique_ids(body.ids, outcome), outcome)
+    stats_engine.adjust("unread", -sum(1 for m in outcome.rows if not m.get("read")))
+    return outcome.response()
+
+
 @router.patch("/{message_id}")
 @router.post("/{message_id}")
-async def update_message(message_id: int, data: dict, user: User = Depends(require_admin)):
+async def update_message(message_id: int, data: dict, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Update a message (admin only)"""
-    update_data = {}
-    if "read" in data and isinstance(data["read"], bool):
-        update_data["read"] = data["read"]
-
+    update_data = read_changes(data)
     if not update_data:
         raise HTTPException(status_code=400, detail="no_updatable_fields")
 
-    result = supabase.table("messages").update(update_data).eq("id", message_id).execute()
+    # Only a row whose read state actually flips moves the unread counter
+    query = db.table("messages").update(update_data).eq("id", message_id)
+    if update_data["read"]:
+        result = await query.or_("read.is.null,read.eq.false").execute()
+    else:
+        result = await query.eq("read", True).execute()
+    if result.data:
+        stats_engine.adjust("unread", -1 if update_data["read"] else 1)
+        return result.data[0]
+
+    result = await db.table("messages").update(update_data).eq("id", message_id).execute()
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=404, detail="message_not_found")
 
 
 @router.delete("/{message_id}")
-async def delete_message(message_id: int, user: User = Depends(require_admin)):
+async def delete_message(message_id: int, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Delete a message (admin only)"""
-    supabase.table("messages").delete().eq("id", message_id).execute()
-    return {"ok": True}
-
-
-@router.post("/reset")
-async def reset_messages(user: User = Depends(require_admin)):
-    """Reset all messages (admin only)"""
-    try:
-        # Try RPC first
-        supabase.rpc("truncate_messages").execute()
-    except:
-        # Fallback: delete all rows
-        supabase.table("messages").delete().neq("id", 0).execute()
-        try:
-            supabase.rpc("reset_messages_identity").execute()
-        except:
-            pass
-
+    result = await db.table("messages").delete().eq("id", message_id).execute()
+    stats_engine.adjust("unread", -sum(1 for m in result.data if not m.get("read")))
     return {"ok": True}
@@ -1,69 +1,136 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
-from app.models import Project, User
-from app.utils import supabase
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from typing import TYPE_CHECKING, List, Optional
+from app.models import BulkDeleteRequest, BulkRequest, Project, User
+from app.utils import get_supabase
+from app.utils.stats import stats_engine
+from app.utils.response_cache import response_cache
+from app.utils.pagination import COUNT_PATTERN, count_method, empty_page, keyset, keyset_page
+from app.utils.search import build_tsquery
+from app.utils.bulk import BulkOutcome, bulk_delete, bulk_insert, bulk_update, unique_ids, update_items, validate_items
 from app.dependencies import require_admin
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
 router = APIRouter(prefix="/projects", tags=["projects"])
 
 
 @router.get("")
 async def get_projects(
+    request: Request,
     q: Optional[str] = Query(None),
     stack: Optional[str] = Query(None),
-    limit: int = Query(24, le=100),
-    offset: int = Query(0, ge=0)
+    limit: int = Query(24, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    count: str = Query("exact", pattern=COUNT_PATTERN),
+    db: "AsyncClient" = Depends(get_supabase)
 ):
-    """Get list of projects with optional filtering"""
-    query = supabase.table("projects").select("*", count="exact").order("created_at", desc=True)
+    """
+    Get list of projects with optional filtering.
+    Pass cursor (empty for the first page) to page by keyset and get
+    next_cursor back; the total is only computed on the first page.
+    """
+    async def load():
+        query = db.table("projects").select("*", count=count_method(count) if not cursor else None)
+
+        # Indexed full-text match; q without any words matches nothing, as on /search
+        if q:
+            tsquery = build_tsquery(q)
+            if not tsquery:
+                return empty_page(cursor)
+            query = query.filter("search_vector", "fts(english)", tsquery)
+
+        if stack:
+            parts = [s.strip() for s in stack.split(",") if s.strip()]
+            if parts:
+                query = query.contains("stack", parts)
 
-    if q:
-        query = query.or_(f"title.ilike.%{q}%,description.ilike.%{q}%")
+        if cursor is not None:
+            result = await keyset(query, "created_at", cursor, limit).execute()
+            return keyset_page(result.data, "created_at", limit, result.count)
 
-    if stack:
-        parts = [s.strip() for s in stack.split(",") if s.strip()]
-        if parts:
-            query = query.contains("stack", parts)
+        query = query.order("created_at", desc=True).range(offset, offset + limit - 1)
+        result = await query.execute()
 
-    query = query.range(offset, offset + limit - 1)
-    result = query.execute()
+        return {"items": result.data, "total": result.count}
 
-    return {"items": result.data, "total": result.count}
+    return await response_cache.serve(request, load, tags=("projects",))
 
 
 @router.get("/featured")
-async def get_featured_projects():
+async def get_featured_projects(request: Request, db: "AsyncClient" = Depends(get_supabase)):
     """Get featured projects"""
-    result = supabase.table("projects").select("*").eq("featured", True).order("created_at", desc=True).limit(6).execute()
-    return result.data
+    async def load():
+        result = await db.table("projects").select("*").eq("featured", True).order("created_at", desc=True).limit(6).execute()
+        return result.data
+
+    return await response_cache.serve(request, load, tags=("projects",))
 
 
 @router.post("")
-async def create_project(project: Project, user: User = Depends(require_admin)):
+async def create_project(project: Project, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Create a new project (admin only)"""
-    result = supabase.table("projects").insert(project.dict(exclude_none=True)).execute()
+    result = await db.table("projects").insert(project.dict(exclude_none=True)).execute()
     if result.data:
+        stats_engine.adjust("projects", 1)
+        response_cache.invalidate("projects")
         return result.data[0]
     raise HTTPException(status_code=500, detail="failed_to_create_project")
 
 
+@router.post("/bulk")
+async def bulk_create_projects(body: BulkRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Create many projects in one insert (admin only); atomic=true for all-or-nothing"""
+    outcome = BulkOutcome(len(body.items), body.atomic)
+    await bulk_insert(db, "projects", validate_items(Project, body.items, outcome), outcome)
+    if outcome.rows:
+        stats_engine.adjust("projects", len(outcome.rows))
+        response_cache.invalidate("projects")
+    return outcome.response()
+
+
+@router.post("/bulk/update")
+async def bulk_update_projects(body: BulkRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Update many projects, each item carrying its id (admin only)"""
+    outcome = BulkOutcome(len(body.items), body.atomic)
+    await bulk_update(db, "projects", update_items(body.items, outcome), outcome)
+    if outcome.rows:
+        response_cache.invalidate("projects")
+    return outcome.response()
+
+
+@router.post("/bulk/delete")
+async def bulk_delete_projects(body: BulkDeleteRequest, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
+    """Delete many projects in one statement (admin only)"""
+    outcome = BulkOutcome(len(body.ids), body.atomic)
+    await bulk_delete(db, "projects", unique_ids(body.ids, outcome), outcome)
+    if outcome.rows:
+        stats_engine.adjust("projects", -len(outcome.rows))
+        response_cache.invalidate("projects")
+    return outcome.response()
+
+
 @router.post("/update")
-async def update_project(data: dict, user: User = Depends(require_admin)):
+async def update_project(data: dict, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Update an existing project (admin only)"""
     project_id = data.get("id")
     if not project_id:
         raise HTTPException(status_code=400, detail="id_required")
 
     update_data = {k: v for k, v in data.items() if k != "id"}
-    result = supabase.table("projects").update(update_data).eq("id", project_id).execute()
+    result = await db.table("projects").update(update_data).eq("id", project_id).execute()
 
     if result.data:
+        response_cache.invalidate("projects")
         return result.data[0]
     raise HTTPException(status_code=404, detail="project_not_found")
 
 
 @router.delete("/{project_id}")
-async def delete_project(project_id: str, user: User = Depends(require_admin)):
+async def delete_project(project_id: str, user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Delete a project (admin only)"""
-    supabase.table("projects").delete().eq("id", project_id).execute()
+    result = await db.table("projects").delete().eq("id", project_id).execute()
+    stats_engine.adjust("projects", -len(result.data))
+    response_cache.invalidate("projects")
     return {"ok": True}
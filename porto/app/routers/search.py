@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from typing import TYPE_CHECKING, Optional
+from app.utils import get_supabase
+from app.utils.response_cache import response_cache
+from app.utils.search import SEARCH_KINDS, build_tsquery, search_content
+from app.dependencies import get_is_admin
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("")
+async def search(
+    request: Request,
+    q: str = Query(..., max_length=200),
+    kind: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=50),
+    is_admin: bool = Depends(get_is_admin),
+    db: "AsyncClient" = Depends(get_supabase)
+):
+    """Ranked full-text search across projects and blog posts (drafts for admin only)"""
+    kinds = [k.strip() for k in kind.split(",") if k.strip()] if kind else list(SEARCH_KINDS)
+    if any(k not in SEARCH_KINDS for k in kinds):
+        raise HTTPException(status_code=400, detail="invalid_kind")
+
+    async def load():
+        tsquery = build_tsquery(q)
+        if not tsquery:
+            return {"items": []}
+        return {"items": await search_content(db, tsquery, kinds, limit, include_drafts=is_admin)}
+
+    if is_admin:
+        return await load()
+    return await response_cache.serve(request, load, tags=("projects", "blog", "blog_post"))
@@ -1,39 +1,31 @@
+from typing import TYPE_CHECKING
 from fastapi import APIRouter, Depends
 from app.models import Stats, User
-from app.utils import supabase
+from app.utils import get_supabase
+from app.utils.stats import stats_engine
+from app.utils.write_behind import snapshot_all
+from app.utils.rate_limit import get_rate_limiter
 from app.dependencies import require_admin
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
 router = APIRouter(prefix="/stats", tags=["stats"])
 
 
 @router.get("", response_model=Stats)
-async def get_stats(user: User = Depends(require_admin)):
+async def get_stats(user: User = Depends(require_admin), db: "AsyncClient" = Depends(get_supabase)):
     """Get various statistics (admin only)"""
-    stats = Stats()
-
-    # Count projects
-    result = supabase.table("projects").select("id", count="exact").execute()
-    stats.projects = result.count or 0
-
-    # Count images
-    result = supabase.table("images").select("id", count="exact").execute()
-    stats.images = result.count or 0
-
-    # Count unread messages (null or false)
-    result_null = supabase.table("messages").select("id", count="exact").is_("read", "null").execute()
-    result_false = supabase.table("messages").select("id", count="exact").eq("read", False).execute()
-    stats.unread = (result_null.count or 0) + (result_false.count or 0)
+    return await stats_engine.snapshot(db)
 
-    # Count experiences
-    result = supabase.table("experiences").select("id", count="exact").execute()
-    stats.experiences = result.count or 0
 
-    # Count comments
-    result = supabase.table("comments").select("id", count="exact").execute()
-    stats.comments = result.count or 0
+@router.get("/write-behind")
+async def get_write_behind_stats(user: User = Depends(require_admin)):
+    """Write-behind queue depth and flush counters (admin only)"""
+    return snapshot_all()
 
-    # Count blog posts
-    result = supabase.table("blog_posts").select("id", count="exact").execute()
-    stats.blog_posts = result.count or 0
 
-    return stats
+@router.get("/rate-limit")
+async def get_rate_limit_stats(user: User = Depends(require_admin)):
+    """Admission control counters (admin only)"""
+    return get_rate_limiter().snapshot()
@@ -1,3 +1,3 @@
-from .supabase_client import get_supabase, supabase
+from .supabase_client import get_supabase, get_auth_client
 
-__all__ = ["get_supabase", "supabase"]
+__all__ = ["get_supabase", "get_auth_client"]
@@ -0,0 +1,91 @@
+import time
+from typing import Dict, Optional
+import httpx
+import jwt
+from app.config import get_settings
+from app.utils.metrics import metered_http_client
+
+JWKS_TTL = 600
+JWKS_REFRESH_INTERVAL = 60
+
+_jwks: Dict[str, jwt.PyJWK] = {}
+_jwks_fetched_at = 0.0
+
+
+class LocalVerificationUnavailable(Exception):
+    """The token cannot be verified locally (e.g. HS256 without a configured secret)"""
+
+
+async def _refresh_jwks(force: bool = False):
+    """Fetch the project's signing keys, at most once per refresh interval"""
+    global _jwks_fetched_at
+    age = time.time() - _jwks_fetched_at
+    if age < JWKS_TTL and not force:
+        return
+    if force and age < JWKS_REFRESH_INTERVAL:
+        return
+
+    settings = get_settings()
+    url = f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+    _jwks_fetched_at = time.time()
+    try:
+        async with metered_http_client(timeout=5) as client:
+            response = await client.get(url, headers={"apiKey": settings.supabase_service_role})
+            response.raise_for_status()
+            keys = response.json().get("keys", [])
+    except (httpx.HTTPError, ValueError):
+        return
+
+    _jwks.clear()
+    for key in keys:
+        try:
+            _jwks[key["kid"]] = jwt.PyJWK(key)
+        except (KeyError, jwt.PyJWKError):
+            continue
+
+
+async def decode_access_token(token: str) -> dict:
+    """
+    Verify signature, expiry and audience of a Supabase access token.
+    Raises jwt.InvalidTokenError for bad tokens and
+    LocalVerificationUnavailable when no key is available locally.
+    """
+    settings = get_settings()
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    options = {"require": ["exp", "sub"]}
+
+    if algorithm == "HS256":
+        if not settings.supabase_jwt_secret:
+            raise LocalVerificationUnavailable()
+        return jwt.decode(
+            token,
+            settings.supabase_jwt_secret,
+            algorithms=["HS256"],
+            audience=settings.supabase_jwt_audience,
+            options=options,
+        )
+
+    kid = header.get("kid")
+    await _refresh_jwks()
+    if kid not in _jwks:
+        await _refresh_jwks(force=True)
+    key = _jwks.get(kid)
+    if key is None:
+        raise LocalVerificationUnavailable()
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[key.algorithm_name],
+        audience=settings.supabase_jwt_audience,
+        options=options,
+    )
+
+
+def unverified_expiry(token: str) -> Optional[float]:
+    """exp claim of a token that was already validated elsewhere"""
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+        return float(claims["exp"])
+    except (jwt.InvalidTokenError, KeyError, TypeError, ValueError):
+        return None
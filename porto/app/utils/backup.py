@@ -0,0 +1,260 @@
+import base64
+import binascii
+import json
+import tarfile
+import time
+from typing import TYPE_CHECKING, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional
+from postgrest.exceptions import APIError
+from starlette.concurrency import run_in_threadpool
+from app.utils.blob_store import get_blob_store, parse_data_uri
+from app.utils.image_cache import get_image_cache
+from app.utils.image_store import build_image_row
+from app.utils.uploads import UPLOAD_CHUNK_SIZE, UploadStream
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+# Restore order; images last so a partial import still has all the text
+TABLES = ("projects", "experiences", "blog_posts", "comments", "messages", "images")
+# Image rows are exported without their bytes, which travel separately
+IMAGE_COLUMNS = "id,filename,mime_type,storage_key,size,content_hash,created_at"
+# Columns describing where the bytes live on the source; rebuilt on import
+IMAGE_STORAGE_COLUMNS = ("storage_key", "size", "data_uri", "content_hash", "mime_type")
+# Computed by the database; never written back when rows are re-upserted
+GENERATED_COLUMNS = ("search_vector",)
+BLOB_DIR = "images/blobs/"
+ARCHIVE_VERSION = 1
+
+
+def _clean(row: dict) -> dict:
+    return {k: v for k, v in row.items() if k not in GENERATED_COLUMNS}
+
+
+async def table_pages(db: "AsyncClient", table: str, page_size: int) -> AsyncIterator[List[dict]]:
+    """Every row of a table, a keyset page (by id) at a time"""
+    columns = IMAGE_COLUMNS if table == "images" else "*"
+    last_id = None
+    while True:
+        query = db.table(table).select(columns).order("id").limit(page_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = (await query.execute()).data
+        if not rows:
+            return
+        last_id = rows[-1]["id"]
+        yield [_clean(row) for row in rows]
+
+
+async def image_bytes(db: "AsyncClient", row: dict) -> Optional[bytes]:
+    """Raw bytes of an images row from the blob store or its legacy data URI"""
+    if row.get("storage_key"):
+        store = get_blob_store()
+        return await store.get(row["storage_key"]) if store else None
+    result = await db.table("images").select("data_uri").eq("id", row["id"]).execute()
+    try:
+        return parse_data_uri(result.data[0].get("data_uri"))[1] if result.data else None
+    except (ValueError, binascii.Error):
+        return None
+
+
+def _ndjson(rows: List[dict]) -> bytes:
+    return "".join(json.dumps(row, default=str) + "\n" for row in rows).encode()
+
+
+def tar_member(name: str, data: bytes, mtime: float) -> Iterator[bytes]:
+    """A PAX header, the data in chunks and the block padding"""
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(mtime)
+    info.mode = 0o644
+    yield info.tobuf(format=tarfile.PAX_FORMAT, encoding="utf-8")
+    view = memoryview(data)
+    for start in range(0, len(data), UPLOAD_CHUNK_SIZE):
+        yield bytes(view[start:start + UPLOAD_CHUNK_SIZE])
+    if len(data) % tarfile.BLOCKSIZE:
+        yield b"\0" * (tarfile.BLOCKSIZE - len(data) % tarfile.BLOCKSIZE)
+
+
+async def export_tar(db: "AsyncClient", page_size: int) -> AsyncIterator[bytes]:
+    """
+    Tar archive of every table, produced as it is read. Each keyset page
+    becomes one <table>/NNNNNN.ndjson member; each image's bytes follow
+    its page as images/blobs/<id>, so only one page or one image is held
+    in memory at a time.
+    """
+    now = time.time()
+    manifest = {"version": ARCHIVE_VERSION, "created_at": int(now), "tables": list(TABLES)}
+    for chunk in tar_member("manifest.json", json.dumps(manifest).encode(), now):
+        yield chunk
+
+    for table in TABLES:
+        number = 0
+        async for rows in table_pages(db, table, page_size):
+            number += 1
+            for chunk in tar_member(f"{table}/{number:06d}.ndjson", _ndjson(rows), now):
+                yield chunk
+            if table != "images":
+                continue
+            for row in rows:
+                data = await image_bytes(db, row)
+                if data is None:
+                    continue
+                for chunk in tar_member(f"{BLOB_DIR}{row['id']}", data, now):
+                    yield chunk
+
+    # End-of-archive marker: two zero blocks
+    yield b"\0" * (2 * tarfile.BLOCKSIZE)
+
+
+async def export_ndjson(db: "AsyncClient", page_size: int) -> AsyncIterator[bytes]:
+    """One {"table", "row"} object per line; image lines carry base64 "data" """
+    for table in TABLES:
+        async for rows in table_pages(db, table, page_size):
+            if table != "images":
+                yield _ndjson([{"table": table, "row": row} for row in rows])
+                continue
+            for row in rows:
+                line = {"table": table, "row": row}
+                data = await image_bytes(db, row)
+                if data is not None:
+                    line["data"] = base64.b64encode(data).decode("ascii")
+                yield _ndjson([line])
+
+
+async def _read_chunks(file: BinaryIO, rewind: bool = False) -> AsyncIterator[bytes]:
+    if rewind:
+        await run_in_threadpool(file.seek, 0)
+    while True:
+        chunk = await run_in_threadpool(file.read, UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _read_lines(file: BinaryIO) -> AsyncIterator[bytes]:
+    # A bytearray grows in place, so a line spanning many chunks stays linear
+    pending = bytearray()
+    async for chunk in _read_chunks(file):
+        pending += chunk
+        if b"\n" not in chunk:
+            continue
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield bytes(line)
+    if pending.strip():
+        yield bytes(pending)
+
+
+class BackupImporter:
+    """
+    Upserts (on id) rows from an archive in batches of batch_size, so a
+    restore of any size needs one batch of rows, or one image, in memory.
+    """
+
+    def __init__(self, db: "AsyncClient", batch_size: int):
+        self.db = db
+        self.batch_size = batch_size
+        self.pending: Dict[str, List[dict]] = {table: [] for table in TABLES}
+        # Tar image rows wait here until their bytes arrive
+        self.images_waiting: Dict[str, dict] = {}
+        self.imported: Dict[str, int] = {table: 0 for table in TABLES}
+        self.failed = 0
+        self.skipped = 0
+
+    async def add_row(self, table: str, row: dict):
+        if table not in self.pending or not isinstance(row, dict):
+            self.skipped += 1
+            return
+        self.pending[table].append(_clean(row))
+        # Rows carrying a data URI hold the whole image: never batch them up
+        if len(self.pending[table]) >= self.batch_size or "data_uri" in row:
+            await self.flush(table)
+
+    async def add_image(self, row: dict, upload: UploadStream):
+        """Store an image's bytes in the configured backend, then queue its row"""
+        stored = await build_image_row(upload, row.get("mime_type") or "application/octet-stream")
+        kept = {k: v for k, v in row.items() if k not in IMAGE_STORAGE_COLUMNS}
+        await self.add_row("images", {**kept, **stored})
+        if row.get("id"):
+            # The id may now hold different bytes than a cached copy
+            await get_image_cache().invalidate(str(row["id"]))
+
+    async def flush(self, table: str):
+        rows, self.pending[table] = self.pending[table], []
+        if not rows:
+            return
+        try:
+            await self._upsert(table, rows)
+            self.imported[table] += len(rows)
+        except APIError:
+            # One bad row fails the batch; retry row by row to keep the rest
+            for row in rows:
+                try:
+                    await self._upsert(table, [row])
+                    self.imported[table] += 1
+                except APIError:
+                    self.failed += 1
+
+    async def _upsert(self, table: str, rows: List[dict]):
+        await self.db.table(table).upsert(rows, on_conflict="id", default_to_null=False, returning="minimal").execute()
+
+    async def finish(self) -> dict:
+        for table in TABLES:
+            await self.flush(table)
+        # Image rows whose bytes never arrived cannot be restored
+        self.skipped += len(self.images_waiting)
+        self.images_waiting.clear()
+        return {"imported": self.imported, "failed": self.failed, "skipped": self.skipped}
+
+
+async def import_tar(file: BinaryIO, importer: BackupImporter):
+    archive = await run_in_threadpool(tarfile.open, fileobj=file, mode="r:")
+    while True:
+        member = await run_in_threadpool(archive.next)
+        if member is None:
+            break
+        if not member.isfile():
+            continue
+        reader = archive.extractfile(member)
+
+        if member.name.startswith(BLOB_DIR):
+            row = importer.images_waiting.pop(member.name[len(BLOB_DIR):], None)
+            if row is None:
+                importer.skipped += 1
+                continue
+            await importer.add_image(row, UploadStream(lambda: _read_chunks(reader, rewind=True), member.size))
+        elif member.name.endswith(".ndjson"):
+            table = member.name.split("/", 1)[0]
+            async for line in _read_lines(reader):
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    importer.skipped += 1
+                    continue
+                if table == "images" and isinstance(row, dict) and row.get("id"):
+                    importer.images_waiting[str(row["id"])] = row
+                else:
+                    await importer.add_row(table, row)
+
+
+async def import_ndjson(file: BinaryIO, importer: BackupImporter):
+    async for line in _read_lines(file):
+        try:
+            entry = json.loads(line)
+            table, row = entry["table"], entry["row"]
+        except (ValueError, KeyError, TypeError):
+            importer.skipped += 1
+            continue
+        if table != "images":
+            await importer.add_row(table, row)
+            continue
+        try:
+            data = base64.b64decode(entry.get("data") or "", validate=True)
+        except (binascii.Error, ValueError):
+            data = b""
+        if not data:
+            importer.skipped += 1
+            continue
+        await importer.add_image(row, UploadStream.from_bytes(data, len(data)))
@@ -0,0 +1,244 @@
+import base64
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from functools import lru_cache
+from typing import AsyncIterator, Optional, Tuple
+import httpx
+from starlette.concurrency import run_in_threadpool
+from app.config import get_settings
+from app.utils.metrics import UPSTREAM_TIMEOUT, metered_http_client
+from app.utils.supabase_client import get_supabase
+from app.utils.uploads import UPLOAD_CHUNK_SIZE
+
+DATA_URI_PATTERN = re.compile(r'^data:([^;]+);base64,(.*)$', re.DOTALL)
+
+
+def parse_data_uri(data_uri: str) -> Tuple[str, bytes]:
+    """Split a base64 data URI into (mime_type, raw bytes)"""
+    match = DATA_URI_PATTERN.match(data_uri or "")
+    if not match:
+        raise ValueError("corrupt_data_uri")
+    return match.group(1), base64.b64decode(match.group(2))
+
+
+def new_storage_key() -> str:
+    """Random storage key, fanned out into 256 sub-directories"""
+    key = uuid.uuid4().hex
+    return f"{key[:2]}/{key}"
+
+
+async def spool_chunks(chunks: AsyncIterator[bytes], directory: Optional[str] = None) -> str:
+    """Write chunks to a new temp file as they arrive; returns its path"""
+    fd, tmp_path = await run_in_threadpool(tempfile.mkstemp, dir=directory, prefix=".tmp-")
+    f = os.fdopen(fd, "wb")
+    try:
+        async for chunk in chunks:
+            await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        f.close()
+        os.unlink(tmp_path)
+        raise
+    await run_in_threadpool(f.close)
+    return tmp_path
+
+
+def content_storage_key(sha256: str) -> str:
+    """Content-addressed storage key: identical bytes always map to one blob"""
+    return f"sha256/{sha256[:2]}/{sha256}"
+
+
+class BlobStore:
+    """Raw image bytes storage, addressed by storage key"""
+
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        raise NotImplementedError
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes], content_type: str) -> None:
+        """Store a blob from chunks without holding it all in memory"""
+        await self.put(key, b"".join([chunk async for chunk in chunks]), content_type)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def open_stream(self, key: str) -> Optional[AsyncIterator[bytes]]:
+        """The blob as chunks, or None if missing; the iterator must be consumed"""
+        data = await self.get(key)
+        if data is None:
+            return None
+
+        async def chunks():
+            yield data
+
+        return chunks()
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def delete_prefix(self, prefix: str) -> None:
+        """Remove every blob under a key prefix (e.g. all variants of an image)"""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs stored as plain files under a root directory"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError("invalid_storage_key")
+        return path
+
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        await run_in_threadpool(self._write, key, data)
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes], content_type: str) -> None:
+        path = self._path(key)
+        await run_in_threadpool(os.makedirs, os.path.dirname(path), exist_ok=True)
+        # Spool next to the target so the final rename is atomic
+        tmp_path = await spool_chunks(chunks, os.path.dirname(path))
+        try:
+            await run_in_threadpool(os.replace, tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await run_in_threadpool(self._read, key)
+
+    async def open_stream(self, key: str) -> Optional[AsyncIterator[bytes]]:
+        try:
+            f = await run_in_threadpool(open, self._path(key), "rb")
+        except FileNotFoundError:
+            return None
+
+        async def chunks():
+            try:
+                while True:
+                    chunk = await run_in_threadpool(f.read, UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+            finally:
+                f.close()
+
+        return chunks()
+
+    async def delete(self, key: str) -> None:
+        await run_in_threadpool(self._unlink, key)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        await run_in_threadpool(shutil.rmtree, self._path(prefix), True)
+
+    def _write(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _unlink(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class SupabaseBlobStore(BlobStore):
+    """Blobs stored in a Supabase Storage bucket"""
+
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+
+    async def _bucket(self):
+        return (await get_supabase()).storage.from_(self.bucket)
+
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        bucket = await self._bucket()
+        await bucket.upload(key, data, {"content-type": content_type, "upsert": "true"})
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes], content_type: str) -> None:
+        # Spooled to disk, then streamed from the open file by the upload request
+        tmp_path = await spool_chunks(chunks)
+        try:
+            bucket = await self._bucket()
+            with open(tmp_path, "rb") as f:
+                await bucket.upload(key, f, {"content-type": content_type, "upsert": "true"})
+        finally:
+            os.unlink(tmp_path)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        bucket = await self._bucket()
+        try:
+            return await bucket.download(key)
+        except Exception:
+            return None
+
+    async def open_stream(self, key: str) -> Optional[AsyncIterator[bytes]]:
+        # storage3 only downloads whole bodies; fetch the object endpoint directly
+        settings = get_settings()
+        client = _storage_http_client()
+        request = client.build_request(
+            "GET",
+            f"{settings.supabase_url.rstrip('/')}/storage/v1/object/{self.bucket}/{key}",
+            headers={"apikey": settings.supabase_service_role, "Authorization": f"Bearer {settings.supabase_service_role}"},
+        )
+        response = await client.send(request, stream=True)
+        if response.status_code != 200:
+            await response.aclose()
+            return None
+
+        async def chunks():
+            try:
+                async for chunk in response.aiter_bytes(UPLOAD_CHUNK_SIZE):
+                    yield chunk
+            finally:
+                await response.aclose()
+
+        return chunks()
+
+    async def delete(self, key: str) -> None:
+        bucket = await self._bucket()
+        await bucket.remove([key])
+
+    async def delete_prefix(self, prefix: str) -> None:
+        bucket = await self._bucket()
+        entries = await bucket.list(prefix)
+        if entries:
+            await bucket.remove([f"{prefix}/{entry['name']}" for entry in entries])
+
+
+@lru_cache()
+def _storage_http_client() -> httpx.AsyncClient:
+    if get_settings().metrics_enabled:
+        return metered_http_client()
+    return httpx.AsyncClient(timeout=UPSTREAM_TIMEOUT, follow_redirects=True)
+
+
+@lru_cache()
+def get_blob_store() -> Optional[BlobStore]:
+    """Configured blob store, or None when images are kept as data URIs"""
+    settings = get_settings()
+    if settings.image_storage == "local":
+        return LocalBlobStore(settings.image_storage_path)
+    if settings.image_storage == "supabase":
+        return SupabaseBlobStore(settings.image_storage_bucket)
+    return None
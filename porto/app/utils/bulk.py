@@ -0,0 +1,258 @@
+import asyncio
+import json
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple, Type
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from postgrest.exceptions import APIError
+from pydantic import BaseModel, ValidationError
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+SUCCESS = ("created", "updated", "deleted")
+# Row-by-row inserts in flight at once when a multi-row INSERT is rejected
+INSERT_FALLBACK_CONCURRENCY = 8
+
+UpdateItem = Tuple[int, str, dict]
+
+
+class BulkOutcome:
+    """
+    Per-item results of a bulk request, in request order.
+
+    Atomic requests are checked up front and written with a single
+    statement, so a refused request (abort) has written nothing.
+    """
+
+    def __init__(self, size: int, atomic: bool):
+        if not size:
+            raise HTTPException(status_code=400, detail="no_items")
+        if size > get_settings().bulk_max_items:
+            raise HTTPException(status_code=400, detail="too_many_items")
+        self.atomic = atomic
+        self.results: List[Optional[dict]] = [None] * size
+        self.rows: List[dict] = []
+        self.status_code = 200
+        self.detail: Optional[str] = None
+        self.error: Optional[str] = None
+
+    @property
+    def aborted(self) -> bool:
+        return self.detail is not None
+
+    @property
+    def has_failures(self) -> bool:
+        return any(result and result["status"] not in SUCCESS for result in self.results)
+
+    def set(self, index: int, status: str, id=None, data: Optional[dict] = None, error: Optional[str] = None):
+        result = {"index": index, "status": status}
+        if id is not None:
+            result["id"] = id
+        if data is not None:
+            self.rows.append(data)
+            if status != "deleted":
+                result["data"] = data
+        if error:
+            result["error"] = error
+        self.results[index] = result
+
+    def abort(self, status_code: int, detail: str, error: Optional[str] = None):
+        """Refuse an atomic request; items without a failure of their own are marked skipped"""
+        self.status_code, self.detail, self.error = status_code, detail, error
+        self.rows = []
+        for index, result in enumerate(self.results):
+            if result is None:
+                self.results[index] = {"index": index, "status": "skipped"}
+            elif result["status"] in SUCCESS:
+                self.results[index] = {"index": index, "status": "skipped", "id": result.get("id")}
+
+    def response(self):
+        succeeded = sum(1 for result in self.results if result and result["status"] in SUCCESS)
+        body = {"results": self.results, "succeeded": succeeded, "failed": len(self.results) - succeeded}
+        if not self.aborted:
+            return body
+        extra = {"detail": self.detail}
+        if self.error:
+            extra["error"] = self.error
+        return JSONResponse({**extra, **body}, status_code=self.status_code)
+
+
+def _validation_message(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+def validate_items(model: Type[BaseModel], items: Sequence[dict], outcome: BulkOutcome) -> List[Tuple[int, dict]]:
+    """Rows ready to insert; invalid items are recorded (and abort an atomic request)"""
+    rows = []
+    for index, item in enumerate(items):
+        try:
+            rows.append((index, model.model_validate(item).model_dump(mode="json", exclude_none=True)))
+        except ValidationError as e:
+            outcome.set(index, "invalid", error=_validation_message(e))
+    if outcome.atomic and outcome.has_failures:
+        outcome.abort(422, "bulk_validation_failed")
+    return rows
+
+
+def update_items(items: Sequence[dict], outcome: BulkOutcome, prepare: Optional[Callable[[dict], dict]] = None) -> List[UpdateItem]:
+    """(index, id, changes) for each update; prepare may filter or extend the changes"""
+    updates, seen = [], set()
+    for index, item in enumerate(items):
+        item_id = item.get("id") if isinstance(item, dict) else None
+        if item_id is None:
+            outcome.set(index, "invalid", error="id_required")
+            continue
+        if str(item_id) in seen:
+            outcome.set(index, "invalid", id=item_id, error="duplicate_id")
+            continue
+        seen.add(str(item_id))
+        changes = {k: v for k, v in item.items() if k != "id"}
+        if prepare:
+            changes = prepare(changes)
+        if not changes:
+            outcome.set(index, "invalid", id=item_id, error="no_updatable_fields")
+            continue
+        updates.append((index, item_id, changes))
+    if outcome.atomic and outcome.has_failures:
+        outcome.abort(422, "bulk_validation_failed")
+    return updates
+
+
+def unique_ids(ids: Sequence, outcome: BulkOutcome) -> List[Tuple[int, object]]:
+    """(index, id) pairs with repeated ids recorded as invalid"""
+    pairs, seen = [], set()
+    for index, item_id in enumerate(ids):
+        if str(item_id) in seen:
+            outcome.set(index, "invalid", id=item_id, error="duplicate_id")
+            continue
+        seen.add(str(item_id))
+        pairs.append((index, item_id))
+    if outcome.atomic and outcome.has_failures:
+        outcome.abort(422, "bulk_validation_failed")
+    return pairs
+
+
+async def _existing(db: "AsyncClient", table: str, ids: list, columns: str = "id") -> Dict[str, dict]:
+    result = await db.table(table).select(columns).in_("id", ids).execute()
+    return {str(row["id"]): row for row in result.data}
+
+
+async def _require_all(db: "AsyncClient", table: str, pairs: Sequence[Tuple], outcome: BulkOutcome, columns: str = "id") -> Dict[str, dict]:
+    """Atomic requests touch every listed row or none: refuse if any is missing"""
+    existing = await _existing(db, table, [pair[1] for pair in pairs], columns)
+    for pair in pairs:
+        if str(pair[1]) not in existing:
+            outcome.set(pair[0], "not_found", id=pair[1])
+    if outcome.has_failures:
+        outcome.abort(404, "bulk_items_not_found")
+    return existing
+
+
+async def bulk_insert(db: "AsyncClient", table: str, rows: List[Tuple[int, dict]], outcome: BulkOutcome):
+    """One multi-row INSERT; missing keys take column defaults"""
+    if outcome.aborted or not rows:
+        return
+    try:
+        result = await db.table(table).insert([row for _, row in rows], default_to_null=False).execute()
+    except APIError as e:
+        if outcome.atomic:
+            outcome.abort(409, "bulk_insert_failed", e.message)
+            return
+        # One bad row fails the whole statement; insert one by one to find it
+        limit = asyncio.Semaphore(INSERT_FALLBACK_CONCURRENCY)
+        await asyncio.gather(*(_insert_one(db, table, index, row, outcome, limit) for index, row in rows))
+        return
+    for (index, _), row in zip(rows, result.data):
+        outcome.set(index, "created", id=row.get("id"), data=row)
+
+
+async def _insert_one(db: "AsyncClient", table: str, index: int, row: dict, outcome: BulkOutcome, limit: asyncio.Semaphore):
+    try:
+        async with limit:
+            result = await db.table(table).insert(row).execute()
+    except APIError as e:
+        outcome.set(index, "failed", error=e.message)
+        return
+    if result.data:
+        outcome.set(index, "created", id=result.data[0].get("id"), data=result.data[0])
+    else:
+        outcome.set(index, "failed", error="not_created")
+
+
+async def bulk_update(db: "AsyncClient", table: str, updates: List[UpdateItem], outcome: BulkOutcome):
+    """
+    Items carrying the same changes share one UPDATE ... WHERE id IN (...),
+    so marking many rows alike is a single statement. An atomic request
+    with differing changes runs every UPDATE in one bulk_update_rows call
+    (sql/009), which only writes the named columns.
+    """
+    if outcome.aborted or not updates:
+        return
+
+    groups: Dict[str, List[UpdateItem]] = {}
+    for update in updates:
+        groups.setdefault(json.dumps(update[2], sort_keys=True, default=str), []).append(update)
+
+    if outcome.atomic:
+        await _require_all(db, table, updates, outcome)
+        if outcome.aborted:
+            return
+        try:
+            if len(groups) == 1:
+                ids = [item_id for _, item_id, _ in updates]
+                rows = (await db.table(table).update(updates[0][2]).in_("id", ids).execute()).data
+            else:
+                items = [{"id": item_id, "changes": changes} for _, item_id, changes in updates]
+                rows = (await db.rpc("bulk_update_rows", {"target_table": table, "items": items}).execute()).data
+        except APIError as e:
+            outcome.abort(409, "bulk_update_failed", e.message)
+            return
+        _record(outcome, updates, rows, "updated")
+        return
+
+    await asyncio.gather(*(_update_group(db, table, group, outcome) for group in groups.values()))
+
+
+async def _update_group(db: "AsyncClient", table: str, group: List[UpdateItem], outcome: BulkOutcome):
+    try:
+        result = await db.table(table).update(group[0][2]).in_("id", [item_id for _, item_id, _ in group]).execute()
+    except APIError as e:
+        for index, item_id, _ in group:
+            outcome.set(index, "failed", id=item_id, error=e.message)
+        return
+    _record(outcome, group, result.data, "updated")
+
+
+async def bulk_delete(db: "AsyncClient", table: str, pairs: List[Tuple[int, object]], outcome: BulkOutcome):
+    """One DELETE ... WHERE id IN (...)"""
+    if outcome.aborted or not pairs:
+        return
+    if outcome.atomic:
+        await _require_all(db, table, pairs, outcome)
+        if outcome.aborted:
+            return
+    try:
+        result = await db.table(table).delete().in_("id", [item_id for _, item_id in pairs]).execute()
+    except APIError as e:
+        if outcome.atomic:
+            outcome.abort(409, "bulk_delete_failed", e.message)
+            return
+        for index, item_id in pairs:
+            outcome.set(index, "failed", id=item_id, error=e.message)
+        return
+    _record(outcome, pairs, result.data, "deleted")
+
+
+def _record(outcome: BulkOutcome, items: Sequence[Tuple], rows: List[dict], status: str):
+    """Match returned rows to request items by id; the rest were not found"""
+    by_id = {str(row["id"]): row for row in rows}
+    for item in items:
+        index, item_id = item[0], item[1]
+        row = by_id.get(str(item_id))
+        if row is None:
+            outcome.set(index, "not_found", id=item_id)
+        else:
+            outcome.set(index, status, id=row["id"], data=row)
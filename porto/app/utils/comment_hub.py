@@ -0,0 +1,154 @@
+import asyncio
+import bisect
+from typing import Dict, List, Optional, Set
+from app.config import get_settings
+from app.utils.supabase_client import get_supabase
+
+
+class Subscription:
+    """One SSE client: a bounded queue, closed by the hub if it falls behind"""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class CommentHub:
+    """
+    Fans new comments out to every /comments/stream client on this worker.
+
+    A single background poller queries the comments table while at least
+    one client is connected, so database load does not grow with viewers.
+    Slow clients whose queue fills up are dropped instead of stalling
+    everyone else.
+
+    The most recent comments are kept in a ring buffer ordered by id, so a
+    reconnecting client (Last-Event-ID) is replayed from memory. Every
+    comment with an id above `floor` is guaranteed to be in the buffer.
+    """
+
+    def __init__(self, poll_interval: float, queue_size: int, replay_size: int):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.replay_size = replay_size
+        self.subscribers: Set[Subscription] = set()
+        self.last_id: Optional[int] = None
+        self.floor: Optional[int] = None
+        self.dropped = 0
+        self._ids: List[int] = []
+        self._buffer: Dict[int, dict] = {}
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self.subscribers.add(subscription)
+        if not self._task or self._task.done():
+            self._ready.clear()
+            self._task = asyncio.create_task(self._poll())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def publish(self, comments: List[dict]):
+        """Deliver comments to all subscribers, once per comment id"""
+        if not self._ready.is_set():
+            # Nobody is listening; the buffer is rebuilt when the poller restarts
+            return
+        for comment in sorted(comments, key=lambda c: c["id"]):
+            if comment["id"] in self._buffer or comment["id"] <= self.floor:
+                continue
+            self._remember(comment)
+
+            for subscription in list(self.subscribers):
+                try:
+                    subscription.queue.put_nowait(comment)
+                except asyncio.QueueFull:
+                    subscription.dropped = True
+                    self.subscribers.discard(subscription)
+                    self.dropped += 1
+
+    def remove(self, comment_id: int):
+        """Forget a deleted comment so it is not replayed"""
+        if self._buffer.pop(comment_id, None) is not None:
+            self._ids.remove(comment_id)
+
+    def clear(self):
+        """All comments were deleted"""
+        self._ids.clear()
+        self._buffer.clear()
+
+    async def reload(self, db):
+        """The table was rewritten (/import): reseed so restored rows are not pushed as new"""
+        if self._ready.is_set():
+            await self._load_recent(db)
+        else:
+            # Rebuilt from the table when the poller next starts
+            self.clear()
+
+    async def replay(self, last_event_id: int) -> List[dict]:
+        """Comments after last_event_id: from the buffer, or a ranged query for larger gaps"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            pass
+
+        if self._ready.is_set() and last_event_id >= self.floor:
+            start = bisect.bisect_right(self._ids, last_event_id)
+            return [self._buffer[i] for i in self._ids[start:]]
+
+        db = await get_supabase()
+        result = await db.table("comments").select("*").gt("id", last_event_id).order("id", desc=False).limit(1000).execute()
+        return result.data
+
+    def _remember(self, comment: dict):
+        bisect.insort(self._ids, comment["id"])
+        self._buffer[comment["id"]] = comment
+        while len(self._ids) > self.replay_size:
+            evicted = self._ids.pop(0)
+            del self._buffer[evicted]
+            self.floor = max(self.floor, evicted)
+
+    async def _load_recent(self, db):
+        """Seed the ring buffer with the newest comments"""
+        result = await db.table("comments").select("*").order("id", desc=True).limit(self.replay_size).execute()
+        rows = list(reversed(result.data))
+        self._ids = [row["id"] for row in rows]
+        self._buffer = {row["id"]: row for row in rows}
+        # Fewer rows than the buffer holds means the buffer has the whole table
+        self.floor = rows[0]["id"] - 1 if len(rows) == self.replay_size else 0
+        self.last_id = rows[-1]["id"] if rows else 0
+
+    async def _poll(self):
+        db = await get_supabase()
+        while self.subscribers and not self._ready.is_set():
+            try:
+                await self._load_recent(db)
+                self._ready.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await asyncio.sleep(5)
+
+        try:
+            while self.subscribers:
+                try:
+                    result = await db.table("comments").select("*").gt("id", self.last_id).order("id", desc=False).execute()
+                    if result.data:
+                        self.last_id = max(self.last_id, result.data[-1]["id"])
+                        self.publish(result.data)
+                    await asyncio.sleep(self.poll_interval)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    await asyncio.sleep(5)
+        finally:
+            self._ready.clear()
+
+
+comment_hub = CommentHub(
+    poll_interval=get_settings().comments_poll_interval,
+    queue_size=get_settings().comments_queue_size,
+    replay_size=get_settings().comments_replay_size,
+)
@@ -0,0 +1,285 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import AsyncIterator, Dict, NamedTuple, Optional, Set, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.config import get_settings
+from app.utils.blob_store import spool_chunks
+
+ORIGINAL = "original"
+# How long a memory hit is trusted before checking that no other worker
+# has invalidated the shared disk copy
+MEMORY_RECHECK_SECONDS = 5.0
+
+
+class ImageMeta(NamedTuple):
+    """What is needed to answer a request besides the bytes"""
+    content_type: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class CachedImage:
+    """A cache hit: either bytes from memory or a file path from disk"""
+
+    def __init__(self, meta: ImageMeta, content: Optional[bytes] = None, path: Optional[str] = None):
+        self.content_type = meta.content_type
+        self.etag = meta.etag
+        self.last_modified = meta.last_modified
+        self.content = content
+        self.path = path
+
+    async def read(self) -> bytes:
+        """The bytes, loading them from the disk copy if needed"""
+        if self.content is not None:
+            return self.content
+        return await run_in_threadpool(_read_file, self.path)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class ImageCache:
+    """
+    Two-tier cache of decoded image bytes.
+
+    Memory tier: per-process LRU bounded by total bytes.
+    Disk tier: files under a shared directory, so every worker on the host
+    benefits from a single fetch; hits are served straight from the file.
+    Memory bookkeeping runs on the event loop, disk I/O in the thread pool.
+    """
+
+    def __init__(self, memory_bytes: int, max_item_bytes: int, disk_path: Optional[str], disk_bytes: int):
+        self.memory_bytes = memory_bytes
+        self.max_item_bytes = max_item_bytes
+        self.disk_path = os.path.abspath(disk_path) if disk_path else None
+        self.disk_bytes = disk_bytes
+        # key -> (bytes, meta, monotonic time the disk copy was last seen)
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[bytes, ImageMeta, float]]" = OrderedDict()
+        self._memory_index: Dict[str, Set[Tuple[str, str]]] = {}
+        self._memory_used = 0
+        self._writes_since_trim = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    # Disk layout: <root>/<h[:2]>/<h>/<variant> plus a <variant>.type sidecar
+    # holding the content type, ETag and Last-Modified, one per line, where h
+    # is the SHA-256 of the image id: any id maps to its own directory
+
+    def _image_dir(self, image_id: str) -> str:
+        digest = hashlib.sha256(image_id.encode()).hexdigest()
+        return os.path.join(self.disk_path, digest[:2], digest)
+
+    def _disk_file(self, image_id: str, variant: str) -> str:
+        return os.path.join(self._image_dir(image_id), variant)
+
+    async def get(self, image_id: str, variant: str = ORIGINAL) -> Optional[CachedImage]:
+        key = (image_id, variant)
+        entry = self._memory.get(key)
+        path = self._disk_file(image_id, variant) if self.disk_path else None
+
+        if entry is not None:
+            data, meta, checked = entry
+            # Another worker may have invalidated the shared disk copy; look at
+            # most every MEMORY_RECHECK_SECONDS, not on every hit
+            now = time.monotonic()
+            if path and now - checked > MEMORY_RECHECK_SECONDS:
+                if not await run_in_threadpool(os.path.exists, path):
+                    self._drop_memory(key)
+                    entry = None
+                elif key in self._memory:
+                    self._memory[key] = (data, meta, now)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return CachedImage(meta, content=data)
+
+        if path:
+            found = await run_in_threadpool(self._read_disk, path)
+            if found is not None:
+                meta, content = found
+                self.stats["disk_hits"] += 1
+                if content is not None:
+                    self._put_memory(key, content, meta)
+                return CachedImage(meta, path=path)
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(
+        self,
+        image_id: str,
+        data: bytes,
+        content_type: str,
+        variant: str = ORIGINAL,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Optional[str]:
+        """Store bytes in both tiers; returns the disk copy's path, if one was written"""
+        meta = ImageMeta(content_type, etag, last_modified)
+        if len(data) <= self.max_item_bytes:
+            self._put_memory((image_id, variant), data, meta)
+        if not self.disk_path:
+            return None
+        try:
+            await run_in_threadpool(self._put_disk, image_id, variant, data, meta)
+        except OSError:
+            return None
+        await self._disk_written()
+        return self._disk_file(image_id, variant)
+
+    async def put_stream(
+        self,
+        image_id: str,
+        chunks: AsyncIterator[bytes],
+        content_type: str,
+        variant: str = ORIGINAL,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> str:
+        """
+        Write chunks straight into the disk tier (which must be enabled) and
+        return the file's path, so an image of any size is cached without
+        being held in memory. Small files reach memory on their next hit.
+        """
+        path = self._disk_file(image_id, variant)
+        directory = os.path.dirname(path)
+        await run_in_threadpool(os.makedirs, directory, exist_ok=True)
+        tmp_path = await spool_chunks(chunks, directory)
+        try:
+            await run_in_threadpool(os.replace, tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        meta = ImageMeta(content_type, etag, last_modified)
+        await run_in_threadpool(self._write_atomic, directory, path + ".type", self._sidecar(meta))
+        await self._disk_written()
+        return path
+
+    async def _disk_written(self):
+        self._writes_since_trim += 1
+        if self._writes_since_trim >= 50:
+            self._writes_since_trim = 0
+            self.stats["evictions"] += await run_in_threadpool(self._trim_disk)
+
+    async def invalidate(self, image_id: str):
+        """Drop the original and every derived variant of an image"""
+        for key in list(self._memory_index.get(image_id, ())):
+            self._drop_memory(key)
+        if self.disk_path:
+            await run_in_threadpool(shutil.rmtree, self._image_dir(image_id), True)
+        self.stats["invalidations"] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "memory_items": len(self._memory),
+            "memory_bytes": self._memory_used,
+            "memory_limit_bytes": self.memory_bytes,
+            "disk_path": self.disk_path,
+        }
+
+    def _put_memory(self, key: Tuple[str, str], data: bytes, meta: ImageMeta):
+        self._drop_memory(key)
+        self._memory[key] = (data, meta, time.monotonic())
+        self._memory_index.setdefault(key[0], set()).add(key)
+        self._memory_used += len(data)
+        while self._memory_used > self.memory_bytes and self._memory:
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self.stats["evictions"] += 1
+
+    def _drop_memory(self, key: Tuple[str, str]):
+        entry = self._memory.pop(key, None)
+        if entry is None:
+            return
+        self._memory_used -= len(entry[0])
+        keys = self._memory_index.get(key[0])
+        if keys:
+            keys.discard(key)
+            if not keys:
+                del self._memory_index[key[0]]
+
+    def _read_disk(self, path: str) -> Optional[Tuple[ImageMeta, Optional[bytes]]]:
+        """Metadata and, for small files, the bytes to promote into memory"""
+        try:
+            size = os.path.getsize(path)
+            with open(path + ".type") as f:
+                lines = f.read().splitlines() + ["", "", ""]
+            meta = ImageMeta(lines[0].strip() or "application/octet-stream", lines[1] or None, lines[2] or None)
+            if size > self.max_item_bytes:
+                return meta, None
+            with open(path, "rb") as f:
+                return meta, f.read()
+        except OSError:
+            return None
+
+    def _put_disk(self, image_id: str, variant: str, data: bytes, meta: ImageMeta):
+        path = self._disk_file(image_id, variant)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Data first, then the sidecar, each renamed into place: readers never
+        # see a partial file, and a sidecar always has its data file
+        self._write_atomic(directory, path, data)
+        self._write_atomic(directory, path + ".type", self._sidecar(meta))
+
+    @staticmethod
+    def _sidecar(meta: ImageMeta) -> bytes:
+        return "\n".join(value or "" for value in meta).encode()
+
+    @staticmethod
+    def _write_atomic(directory: str, path: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _trim_disk(self) -> int:
+        """Remove least recently written files until the disk tier fits its budget"""
+        files, total, evicted = [], 0, 0
+        for root, _, names in os.walk(self.disk_path):
+            for name in names:
+                if name.endswith(".type") or name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_bytes:
+                break
+            for victim in (path, path + ".type"):
+                try:
+                    os.unlink(victim)
+                except OSError:
+                    pass
+            total -= size
+            evicted += 1
+        return evicted
+
+
+@lru_cache()
+def get_image_cache() -> ImageCache:
+    settings = get_settings()
+    disk_path = settings.image_cache_dir
+    if disk_path is None:
+        disk_path = os.path.join(tempfile.gettempdir(), "porto-image-cache")
+    return ImageCache(
+        memory_bytes=settings.image_cache_memory_bytes,
+        max_item_bytes=settings.image_cache_max_item_bytes,
+        disk_path=disk_path or None,
+        disk_bytes=settings.image_cache_disk_bytes,
+    )
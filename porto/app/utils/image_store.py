@@ -0,0 +1,149 @@
+import base64
+import binascii
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+from app.config import get_settings
+from app.utils.stats import stats_engine
+from app.utils.blob_store import content_storage_key, get_blob_store
+from app.utils.uploads import UploadStream, encode_data_uri
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+# Base64 image data URIs embedded in HTML/markdown (src="...", url(...), a bare field)
+INLINE_IMAGE_PATTERN = re.compile(r"data:(image/[\w.+-]+);base64,([A-Za-z0-9+/]+={0,2})")
+
+
+def image_url(image_id: str) -> str:
+    return f"/porto/images/{image_id}"
+
+
+async def build_image_row(upload: UploadStream, mime_type: str, filename: Optional[str] = None) -> dict:
+    """Build an images row, streaming the bytes into the blob store when one is configured"""
+    content_hash = await upload.digest()
+    row = {"mime_type": mime_type, "content_hash": content_hash}
+    if filename:
+        row["filename"] = filename
+
+    store = get_blob_store()
+    if store:
+        storage_key = content_storage_key(content_hash)
+        await store.put_stream(storage_key, upload, mime_type)
+        row["storage_key"] = storage_key
+        row["size"] = upload.size
+    else:
+        row["data_uri"] = await encode_data_uri(upload, mime_type)
+    return row
+
+
+async def image_references(db: "AsyncClient", image_ids: List[str]) -> Dict[str, List[str]]:
+    """Image id -> slugs of the blog posts that still show it (sql/010)"""
+    result = await db.rpc("image_references", {"image_ids": [str(image_id) for image_id in image_ids]}).execute()
+    references: Dict[str, List[str]] = {}
+    for row in result.data or []:
+        references.setdefault(row["image_id"], []).append(row["slug"] or row["post_id"])
+    return references
+
+
+async def discard_new_images(db: "AsyncClient", rows: List[dict]):
+    """
+    Remove images rows inserted for a write that then failed, with their
+    blobs. Rows another post has started using since are kept.
+    """
+    if not rows:
+        return
+    references = await image_references(db, [row["id"] for row in rows])
+    unused = [row["id"] for row in rows if str(row["id"]) not in references]
+    if not unused:
+        return
+    result = await db.table("images").delete().in_("id", unused).execute()
+    stats_engine.adjust("images", -len(result.data))
+    store = get_blob_store()
+    for row in result.data:
+        if store and row.get("storage_key"):
+            await store.delete(row["storage_key"])
+
+
+async def find_image_by_hash(db: "AsyncClient", content_hash: str) -> Optional[dict]:
+    result = await db.table("images").select("id,filename,mime_type").eq("content_hash", content_hash).limit(1).execute()
+    return result.data[0] if result.data else None
+
+
+async def save_image(db: "AsyncClient", upload: UploadStream, mime_type: str, filename: Optional[str]) -> Tuple[Optional[dict], bool]:
+    """
+    Insert an images row for the upload, or return the existing row that
+    already holds the same bytes. Returns (row, created).
+    A returned row may also be used by other uploads and posts; deletes
+    check image_references first.
+    """
+    existing = await find_image_by_hash(db, await upload.digest())
+    if existing:
+        return existing, False
+
+    row = await build_image_row(upload, mime_type, filename)
+    try:
+        result = await db.table("images").insert(row).execute()
+    except APIError as e:
+        # Lost a race with an identical upload; the blob key is shared, so keep it
+        if e.code != "23505":
+            raise
+        existing = await find_image_by_hash(db, row["content_hash"])
+        if not existing:
+            raise
+        return existing, False
+
+    if not result.data:
+        return None, False
+    stats_engine.adjust("images", 1)
+    return result.data[0], True
+
+
+async def extract_inline_images(
+    db: "AsyncClient",
+    text: Optional[str],
+    filename: str = "inline-image",
+    created: Optional[List[dict]] = None,
+) -> Tuple[Optional[str], int]:
+    """
+    Move base64 data URI images out of text into the images table and
+    replace each with its /porto/images/{id} URL. Identical images share
+    one row. URIs that do not decode, or decode to more than
+    image_upload_max_bytes, are left inline as they were.
+    Rows this call inserted are appended to created, so a caller whose
+    write fails can discard them. Returns (text, number of data URIs replaced).
+    """
+    if not text or "data:image/" not in text:
+        return text, 0
+
+    max_bytes = get_settings().image_upload_max_bytes
+    urls = {}
+    for match in INLINE_IMAGE_PATTERN.finditer(text):
+        data_uri = match.group(0)
+        if data_uri in urls:
+            continue
+        try:
+            data = base64.b64decode(match.group(2), validate=True)
+        except (binascii.Error, ValueError):
+            continue
+        if len(data) > max_bytes:
+            continue
+        image, was_created = await save_image(db, UploadStream.from_bytes(data, max_bytes), match.group(1), filename)
+        if not image:
+            raise HTTPException(status_code=500, detail="failed_to_extract_inline_image")
+        if was_created and created is not None:
+            created.append(image)
+        urls[data_uri] = image_url(image["id"])
+
+    replaced = 0
+
+    def replace(match):
+        nonlocal replaced
+        url = urls.get(match.group(0))
+        if url is None:
+            return match.group(0)
+        replaced += 1
+        return url
+
+    return INLINE_IMAGE_PATTERN.sub(replace, text), replaced
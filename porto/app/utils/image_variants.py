@@ -0,0 +1,147 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, NamedTuple, Optional, Tuple
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.config import get_settings
+
+try:
+    import PIL  # noqa: F401  (optional dependency: variants are disabled without it)
+except ImportError:
+    PIL = None
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"webp": "image/webp", "avif": "image/avif", "jpeg": "image/jpeg", "png": "image/png"}
+FORMAT_BY_TYPE = {content_type: fmt for fmt, content_type in FORMATS.items()}
+DEFAULT_QUALITY = 80
+
+_executor: Optional[Executor] = None
+_pool_unavailable = False
+_renders: Dict[Tuple[str, str], asyncio.Future] = {}
+
+
+class VariantParams(NamedTuple):
+    width: Optional[int]
+    height: Optional[int]
+    fmt: Optional[str]
+    quality: int
+
+    @property
+    def name(self) -> str:
+        """Stable cache/storage name, e.g. w320-h0-webp-q80"""
+        return f"w{self.width or 0}-h{self.height or 0}-{self.fmt or 'orig'}-q{self.quality}"
+
+
+def variant_params(w: Optional[int], h: Optional[int], fmt: Optional[str], q: Optional[int]) -> Optional[VariantParams]:
+    """Validated variant parameters, or None when the original is requested"""
+    if w is None and h is None and fmt is None and q is None:
+        return None
+    if fmt is not None and fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail="invalid_image_format")
+    limit = get_settings().image_variant_max_dimension
+    if (w is not None and not 0 < w <= limit) or (h is not None and not 0 < h <= limit):
+        raise HTTPException(status_code=400, detail="invalid_image_dimensions")
+    if q is not None and not 1 <= q <= 100:
+        raise HTTPException(status_code=400, detail="invalid_image_quality")
+    return VariantParams(w, h, fmt, q or DEFAULT_QUALITY)
+
+
+def resolve_format(params: VariantParams, source_type: Optional[str]) -> VariantParams:
+    """Pin the output format: keep the source's when it is one we encode, else PNG"""
+    if params.fmt:
+        return params
+    return params._replace(fmt=FORMAT_BY_TYPE.get(source_type or "", "png"))
+
+
+def transform_image(data: bytes, params: VariantParams) -> bytes:
+    """Resize and transcode to params.fmt; runs in a worker process"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if params.width or params.height:
+            # Fit within the box keeping the aspect ratio; never upscale
+            image.thumbnail((params.width or image.width, params.height or image.height), Image.Resampling.LANCZOS)
+        if params.fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        out = io.BytesIO()
+        options = {"optimize": True} if params.fmt == "png" else {"quality": params.quality}
+        image.save(out, format=params.fmt.upper(), **options)
+        return out.getvalue()
+
+
+def _get_executor() -> Optional[Executor]:
+    global _executor, _pool_unavailable
+    if _executor is None and not _pool_unavailable and get_settings().image_variant_workers > 0:
+        try:
+            # Spawned, not forked: forked workers would inherit the server's
+            # listening socket and event loop state
+            _executor = ProcessPoolExecutor(
+                max_workers=get_settings().image_variant_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        except (OSError, NotImplementedError):
+            # No multiprocessing primitives (e.g. some serverless runtimes): use threads
+            _pool_unavailable = True
+    return _executor
+
+
+async def _render(data: bytes, params: VariantParams) -> bytes:
+    global _executor
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        executor = _get_executor()
+        if executor is None:
+            return await run_in_threadpool(transform_image, data, params)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, transform_image, data, params)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge image); start a fresh pool next time
+            _executor = None
+            raise
+    except (UnidentifiedImageError, Image.DecompressionBombError, ValueError):
+        raise HTTPException(status_code=415, detail="unsupported_image")
+    except Exception:
+        # The image may be fine: a crashed or shut down pool, an I/O error
+        logger.exception("rendering %s failed", params.name)
+        raise HTTPException(status_code=503, detail="image_render_failed")
+
+
+async def render_variant(image_id: str, data: bytes, params: VariantParams) -> bytes:
+    """Render a variant; concurrent requests for the same one share a single render"""
+    if PIL is None:
+        raise HTTPException(status_code=501, detail="image_variants_unavailable")
+
+    key = (image_id, params.name)
+    pending = _renders.get(key)
+    if pending is not None:
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # The request doing the render went away; render for ourselves
+            if not pending.cancelled():
+                raise
+            return await _render(data, params)
+
+    pending = asyncio.get_running_loop().create_future()
+    _renders[key] = pending
+    try:
+        result = await _render(data, params)
+        pending.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        pending.cancel()
+        raise
+    except Exception as e:
+        pending.set_exception(e)
+        pending.exception()
+        raise
+    finally:
+        _renders.pop(key, None)
@@ -0,0 +1,207 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+import httpx
+
+# Upper bounds in seconds; +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+# Matches the timeout supabase-py gives its own PostgREST client
+UPSTREAM_TIMEOUT = 120
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text format"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts, +Inf included, sum)
+        self.series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, labels: Labels, value: float):
+        counts, total = self.series.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+        total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_labels = _label_text(self.labels, labels, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, labels)} {_number(total[0])}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, labels)} {cumulative}")
+        return lines
+
+
+http_requests = Counter("porto_http_requests_total", "Requests handled, by route template and status", ("method", "route", "status"))
+http_duration = Histogram("porto_http_request_duration_seconds", "Time until the response finished, by route template", ("method", "route"))
+upstream_calls = Histogram(
+    "porto_http_upstream_calls", "Supabase calls made while serving one request", ("method", "route"), CALL_COUNT_BUCKETS
+)
+upstream_duration = Histogram(
+    "porto_upstream_request_duration_seconds", "Duration of each Supabase call, by service", ("service", "method")
+)
+upstream_errors = Counter("porto_upstream_errors_total", "Supabase calls that failed or answered 5xx", ("service",))
+
+REGISTRY = (http_requests, http_duration, upstream_calls, upstream_duration, upstream_errors)
+
+
+class RequestTiming:
+    """Upstream calls made on behalf of the request being served"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls = 0
+        self.upstream_seconds = 0.0
+        self.finished = False
+
+    def record(self, seconds: float):
+        # Tasks spawned by a request (queues, pollers) inherit its context after it ends
+        if not self.finished:
+            self.calls += 1
+            self.upstream_seconds += seconds
+
+
+_current: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def start_request() -> RequestTiming:
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+
+def _service(url: httpx.URL) -> str:
+    """rest, storage, auth, functions... from /<service>/v1/..."""
+    parts = url.path.strip("/").split("/", 1)
+    return parts[0] or "other"
+
+
+class _TimedStream(httpx.AsyncByteStream):
+    """Response body that reports the call's duration once it is read (or abandoned)"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, done):
+        self.stream = stream
+        self.done = done
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            self.done()
+
+
+class MeteredTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport timing every call from request to the end of the body,
+    into the upstream histograms and the current request's RequestTiming.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.transport = transport or httpx.AsyncHTTPTransport(http2=True)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        timing = _current.get()
+        labels = (_service(request.url), request.method)
+        started = time.perf_counter()
+
+        def done(failed: bool = False):
+            seconds = time.perf_counter() - started
+            upstream_duration.observe(labels, seconds)
+            if failed:
+                upstream_errors.inc(labels[:1])
+            if timing:
+                timing.record(seconds)
+
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception:
+            done(failed=True)
+            raise
+        failed = response.status_code >= 500
+        response.stream = _TimedStream(response.stream, lambda: done(failed))
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def metered_http_client(**kwargs) -> httpx.AsyncClient:
+    """An httpx client whose calls count as upstream time"""
+    kwargs.setdefault("timeout", UPSTREAM_TIMEOUT)
+    kwargs.setdefault("follow_redirects", True)
+    return httpx.AsyncClient(transport=MeteredTransport(), **kwargs)
+
+
+def server_timing(timing: RequestTiming) -> str:
+    """Server-Timing value: total app time and the upstream calls within it"""
+    app_ms = (time.perf_counter() - timing.started) * 1000
+    calls = "call" if timing.calls == 1 else "calls"
+    return (
+        f"app;dur={app_ms:.1f}, "
+        f'upstream;dur={timing.upstream_seconds * 1000:.1f};desc="{timing.calls} {calls}"'
+    )
+
+
+def observe_request(method: str, route: str, status: int, timing: RequestTiming):
+    timing.finished = True
+    http_requests.inc((method, route, str(status)))
+    http_duration.observe((method, route), time.perf_counter() - timing.started)
+    upstream_calls.observe((method, route), timing.calls)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
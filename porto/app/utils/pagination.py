@@ -0,0 +1,61 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException
+
+# count=... query parameter: how (and whether) list endpoints compute totals
+COUNT_PATTERN = "^(exact|estimated|none)$"
+
+
+def count_method(count: str) -> Optional[str]:
+    """PostgREST count method for a count=... parameter; None skips counting"""
+    return None if count == "none" else count
+
+
+def encode_cursor(row: dict, column: str) -> str:
+    """Opaque token for the position just after row"""
+    raw = json.dumps([row.get(column), row.get("id")], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+    if value is None or row_id is None:
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+    return value, row_id
+
+
+def _quote(value: Any) -> str:
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def keyset(query, column: str, cursor: Optional[str], limit: int):
+    """
+    Order newest first by (column, id) and continue after cursor.
+    Fetches one extra row so keyset_page can tell whether a next page exists.
+    """
+    if cursor:
+        value, row_id = decode_cursor(cursor)
+        value, row_id = _quote(value), _quote(row_id)
+        query = query.or_(f"{column}.lt.{value},and({column}.eq.{value},id.lt.{row_id})")
+    return query.order(column, desc=True).order("id", desc=True).limit(limit + 1)
+
+
+def keyset_page(rows: List[dict], column: str, limit: int, total: Optional[int] = None) -> dict:
+    """Response body for a cursor page"""
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1], column) if items and len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor, "total": total}
+
+
+def empty_page(cursor: Optional[str]) -> dict:
+    """A list response with no rows, shaped for keyset (cursor given) or offset paging"""
+    if cursor is not None:
+        return {"items": [], "next_cursor": None, "total": 0}
+    return {"items": [], "total": 0}
@@ -0,0 +1,142 @@
+import secrets
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from app.utils.conditional import etag_matches
+
+STREAM_CHUNK_SIZE = 64 * 1024
+# More ranges than this (after merging) are answered with the whole body
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> List[Tuple[int, int]]:
+    """
+    Inclusive (start, end) byte ranges from a Range header, sorted and merged.
+    An absent or malformed header yields [] (serve the whole body, per RFC 9110);
+    a well-formed header with no satisfiable range raises RangeNotSatisfiable.
+    """
+    if not header or not header.startswith("bytes="):
+        return []
+    ranges = []
+    for spec in header[len("bytes="):].split(","):
+        start_text, sep, end_text = spec.strip().partition("-")
+        if not sep:
+            return []
+        try:
+            if start_text:
+                start = int(start_text)
+                end = int(end_text) if end_text else size - 1
+                if end_text and end < start:
+                    return []
+            else:
+                suffix = int(end_text)
+                if suffix == 0:
+                    continue
+                start, end = max(size - suffix, 0), size - 1
+        except ValueError:
+            return []
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        if start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged if len(merged) <= MAX_RANGES else []
+
+
+def _if_range_allows(request: Request, etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """A Range is only honoured when If-Range (if sent) still matches the representation"""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return etag is not None and not if_range.startswith("W/") and etag_matches(if_range, etag)
+    return last_modified is not None and if_range == last_modified
+
+
+def _requested_ranges(request: Request, size: int, etag: Optional[str], last_modified: Optional[str]) -> List[Tuple[int, int]]:
+    """Ranges to serve ([] = whole body); raises RangeNotSatisfiable"""
+    if not _if_range_allows(request, etag, last_modified):
+        return []
+    return parse_range(request.headers.get("range"), size)
+
+
+def _not_satisfiable(headers: Dict[str, str], size: int) -> Response:
+    return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+
+def _multipart_response(
+    ranges: List[Tuple[int, int]],
+    size: int,
+    media_type: str,
+    headers: Dict[str, str],
+    read: Callable[[int, int], AsyncIterator[bytes]],
+) -> StreamingResponse:
+    """multipart/byteranges body; read(start, end) yields an inclusive range"""
+    boundary = secrets.token_hex(16)
+    part_headers = [
+        f"--{boundary}\r\nContent-Type: {media_type}\r\nContent-Range: bytes {start}-{end}/{size}\r\n\r\n".encode()
+        for start, end in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode()
+    headers = {**headers, "Content-Length": str(
+        sum(len(h) + end - start + 1 for h, (start, end) in zip(part_headers, ranges))
+        + 2 * (len(ranges) - 1) + len(closing)
+    )}
+
+    async def parts():
+        for index, (head, (start, end)) in enumerate(zip(part_headers, ranges)):
+            yield (b"\r\n" if index else b"") + head
+            async for chunk in read(start, end):
+                yield chunk
+        yield closing
+
+    return StreamingResponse(
+        parts(),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers=headers,
+    )
+
+
+def bytes_response(
+    request: Request,
+    content: bytes,
+    media_type: str,
+    headers: Dict[str, str],
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Response:
+    """In-memory body with single and multipart byte range support"""
+    headers = {**headers, "Accept-Ranges": "bytes"}
+    size = len(content)
+    try:
+        ranges = _requested_ranges(request, size, etag, last_modified)
+    except RangeNotSatisfiable:
+        return _not_satisfiable(headers, size)
+
+    if not ranges:
+        return Response(content=content, media_type=media_type, headers=headers)
+
+    view = memoryview(content)
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return Response(content=bytes(view[start:end + 1]), status_code=206, media_type=media_type, headers=headers)
+
+    async def read(start: int, end: int) -> AsyncIterator[bytes]:
+        for offset in range(start, end + 1, STREAM_CHUNK_SIZE):
+            yield bytes(view[offset:min(offset + STREAM_CHUNK_SIZE, end + 1)])
+
+    return _multipart_response(ranges, size, media_type, headers, read)
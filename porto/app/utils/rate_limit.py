@@ -0,0 +1,128 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+from app.config import get_settings
+from app.utils.supabase_client import get_supabase
+
+logger = logging.getLogger(__name__)
+
+
+class RouteLimit(NamedTuple):
+    rate: float          # tokens refilled per second, per client
+    burst: float         # bucket size: requests a client may make back to back
+    concurrency: int     # requests in flight on this worker, all clients together (0 = no cap)
+
+
+class MemoryBuckets:
+    """Token buckets in process memory, least recently used clients evicted first"""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        """(allowed, seconds until a token is available)"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_items:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+class SupabaseBuckets:
+    """
+    Buckets shared by every worker through the rate_limit_take RPC; the
+    in-memory buckets take over while the RPC is failing.
+    """
+
+    def __init__(self, fallback: MemoryBuckets):
+        self.fallback = fallback
+
+    async def take(self, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        try:
+            db = await get_supabase()
+            result = await db.rpc("rate_limit_take", {"bucket_key": key, "rate": rate, "burst": burst}).execute()
+            data = result.data[0] if isinstance(result.data, list) else result.data
+            return bool(data["allowed"]), float(data.get("retry_after") or 0)
+        except Exception as e:
+            logger.warning("rate_limit_take failed, limiting locally: %s", e)
+            return await self.fallback.take(key, rate, burst)
+
+
+class RateLimiter:
+    """
+    Admission control for the routes in `routes` ("METHOD /path" keys):
+    a token bucket per client and route (429 when empty) and a cap on
+    requests in flight per route (503 when full).
+    """
+
+    def __init__(self, routes: Dict[str, RouteLimit], buckets, enabled: bool = True):
+        self.routes = routes
+        self.buckets = buckets
+        self.enabled = enabled
+        self.in_flight: Dict[str, int] = {route: 0 for route in routes}
+        self.stats = {"allowed": 0, "rate_limited": 0, "shed": 0}
+
+    @classmethod
+    def from_settings(cls) -> "RateLimiter":
+        settings = get_settings()
+        routes = {}
+        for route, limit in settings.rate_limit_routes.items():
+            routes[route] = RouteLimit(float(limit["rate"]), float(limit["burst"]), int(limit.get("concurrency", 0)))
+            if routes[route].rate <= 0 or routes[route].burst < 1:
+                raise ValueError(f"rate_limit_routes[{route!r}] needs rate > 0 and burst >= 1")
+        memory = MemoryBuckets(settings.rate_limit_max_clients)
+        buckets = SupabaseBuckets(memory) if settings.rate_limit_backend == "supabase" else memory
+        return cls(routes, buckets, settings.rate_limit_enabled)
+
+    def route_for(self, method: str, path: str) -> Optional[str]:
+        route = f"{method} {path.rstrip('/') or '/'}"
+        return route if self.enabled and route in self.routes else None
+
+    async def admit(self, route: str, client: str) -> Optional[Tuple[int, str, int]]:
+        """None to proceed (a slot is then held until release), else (status, detail, retry_after)"""
+        limit = self.routes[route]
+        if limit.concurrency and self.in_flight[route] >= limit.concurrency:
+            self.stats["shed"] += 1
+            return 503, "server_busy", 1
+
+        # Hold the slot while the bucket is consulted (the shared backend awaits)
+        self.in_flight[route] += 1
+        try:
+            allowed, retry_after = await self.buckets.take(f"{route}|{client}", limit.rate, limit.burst)
+        except BaseException:
+            # Failed or cancelled: the caller never gets to release
+            self.in_flight[route] -= 1
+            raise
+        if not allowed:
+            self.in_flight[route] -= 1
+            self.stats["rate_limited"] += 1
+            return 429, "rate_limited", max(1, math.ceil(retry_after))
+
+        self.stats["allowed"] += 1
+        return None
+
+    def release(self, route: str):
+        self.in_flight[route] -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.buckets).__name__,
+            "in_flight": dict(self.in_flight),
+            **self.stats,
+        }
+
+
+@lru_cache()
+def get_rate_limiter() -> RateLimiter:
+    return RateLimiter.from_settings()
@@ -0,0 +1,211 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from app.config import get_settings
+from app.utils.conditional import is_not_modified, not_modified, validator_headers
+
+
+class CachedBody:
+    """A serialized JSON response, plus its gzip encoding when worth sending"""
+
+    def __init__(self, body: bytes, gzip_body: Optional[bytes], expires_at: float, tags: Tuple[str, ...],
+                 last_modified: Optional[str] = None):
+        self.body = body
+        self.gzip_body = gzip_body
+        self.expires_at = expires_at
+        self.tags = tags
+        self.last_modified = last_modified
+        # Strong validators; each encoding of the body gets its own
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body or b"")
+
+
+class ResponseCache:
+    """
+    Read-through cache for public JSON endpoints.
+
+    Entries are keyed by route path plus the route's own query parameters
+    (sorted, unknown ones ignored) and hold the already-serialized body, so
+    a hit skips both the database and JSON encoding. Write handlers drop
+    entries by tag; concurrent misses for one key share a single load.
+    Every body carries an ETag, so revalidating clients get a 304 from
+    memory without the body being sent.
+    """
+
+    def __init__(self, ttl: float, max_items: int, max_bytes: int, gzip_min_bytes: int):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.gzip_min_bytes = gzip_min_bytes
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._loads: Dict[str, asyncio.Future] = {}
+        self._used = 0
+        self._generation = 0
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0, "invalidations": 0}
+
+    def key(self, request: Request) -> str:
+        route = request.scope.get("route")
+        dependant = getattr(route, "dependant", None)
+        known = {param.alias for param in dependant.query_params} if dependant else None
+        params = sorted(
+            (name, value) for name, value in request.query_params.multi_items()
+            if known is None or name in known
+        )
+        query = "&".join(f"{name}={value}" for name, value in params)
+        return f"{request.scope['path']}?{query}"
+
+    async def serve(
+        self,
+        request: Request,
+        load: Callable[[], Awaitable[Any]],
+        tags: Iterable[str],
+        last_modified: Optional[Callable[[Any], Optional[str]]] = None,
+    ) -> Response:
+        """
+        Return the cached response for this request, calling load() on a miss.
+        last_modified maps the loaded content to a Last-Modified value; only
+        pass it where deletions cannot make the content older (single rows).
+        """
+        key = self.key(request)
+        entry = self._get(key)
+        status = "HIT"
+        if entry is None:
+            status = "MISS"
+            pending = self._loads.get(key)
+            if pending is not None:
+                try:
+                    entry = await asyncio.shield(pending)
+                except asyncio.CancelledError:
+                    # The leading request went away mid-load; load for ourselves
+                    if not pending.cancelled():
+                        raise
+                    entry = await self._load(key, load, tuple(tags), last_modified)
+            else:
+                pending = asyncio.get_running_loop().create_future()
+                self._loads[key] = pending
+                try:
+                    entry = await self._load(key, load, tuple(tags), last_modified)
+                    pending.set_result(entry)
+                except asyncio.CancelledError:
+                    pending.cancel()
+                    raise
+                except Exception as e:
+                    pending.set_exception(e)
+                    # Mark retrieved so a failure nobody waited for is not logged
+                    pending.exception()
+                    raise
+                finally:
+                    self._loads.pop(key, None)
+        return self._response(request, entry, status)
+
+    def invalidate(self, *tags: str):
+        """Drop every entry carrying any of the tags"""
+        self._generation += 1
+        for tag in tags:
+            for key in self._tags.pop(tag, set()):
+                if self._drop(key):
+                    self.stats["invalidations"] += 1
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._tags.clear()
+        self._used = 0
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "entries": len(self._entries), "bytes": self._used}
+
+    async def _load(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Any]],
+        tags: Tuple[str, ...],
+        last_modified: Optional[Callable[[Any], Optional[str]]],
+    ) -> CachedBody:
+        generation = self._generation
+        self.stats["misses"] += 1
+        content = await load()
+        body = json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= self.gzip_min_bytes else None
+        entry = CachedBody(body, gzip_body, time.time() + self.ttl, tags, last_modified(content) if last_modified else None)
+        # A write landed while loading: serve this result once but do not keep it
+        if generation == self._generation:
+            self._put(key, entry)
+        return entry
+
+    def _get(self, key: str) -> Optional[CachedBody]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def _put(self, key: str, entry: CachedBody):
+        if entry.size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = entry
+        self._used += entry.size
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while self._entries and (len(self._entries) > self.max_items or self._used > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.stats["evictions"] += 1
+
+    def _drop(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._used -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    def _response(self, request: Request, entry: CachedBody, status: str) -> Response:
+        use_gzip = entry.gzip_body is not None and "gzip" in request.headers.get("accept-encoding", "")
+        etag = entry.gzip_etag if use_gzip else entry.etag
+        headers = {"Vary": "Accept-Encoding", "X-Cache": status, **validator_headers(etag, entry.last_modified)}
+
+        # A validator for either encoding means the client already has this content
+        if is_not_modified(request, entry.etag, entry.last_modified) or is_not_modified(request, entry.gzip_etag):
+            self.stats["not_modified"] += 1
+            return not_modified(headers)
+
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=entry.gzip_body, media_type="application/json", headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache(
+    ttl=get_settings().response_cache_ttl,
+    max_items=get_settings().response_cache_max_items,
+    max_bytes=get_settings().response_cache_max_bytes,
+    gzip_min_bytes=get_settings().response_cache_gzip_min_bytes,
+)
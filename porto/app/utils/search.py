@@ -0,0 +1,71 @@
+import re
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+SEARCH_KINDS = ("projects", "blog")
+MAX_TERMS = 8
+SNIPPET_CHARS = 200
+
+_TERM = re.compile(r"[^\W_]+")
+
+
+def build_tsquery(text: str) -> Optional[str]:
+    """
+    Turn free text into a to_tsquery expression: every word must match,
+    each as a prefix so partially typed words still find results.
+    Only letters and digits survive, so user input cannot inject operators.
+    """
+    terms = _TERM.findall(text.lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def _snippet(text: Optional[str]) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= SNIPPET_CHARS else text[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+
+
+async def search_content(db: "AsyncClient", tsquery: str, kinds: List[str], limit: int, include_drafts: bool = False) -> List[dict]:
+    """Ranked matches with highlighted snippets from the search_content RPC"""
+    try:
+        result = await db.rpc("search_content", {
+            "query": tsquery,
+            "kinds": kinds,
+            "max_results": limit,
+            "include_drafts": include_drafts,
+        }).execute()
+        return result.data or []
+    except Exception:
+        return await _search_tables(db, tsquery, kinds, limit, include_drafts)
+
+
+async def _search_tables(db: "AsyncClient", tsquery: str, kinds: List[str], limit: int, include_drafts: bool) -> List[dict]:
+    """Fallback when the RPC is not installed: indexed fts filters, newest first, plain snippets"""
+    items = []
+    if "projects" in kinds:
+        result = await db.table("projects").select("id,title,description,created_at") \
+            .filter("search_vector", "fts(english)", tsquery) \
+            .order("created_at", desc=True).limit(limit).execute()
+        items += [
+            {"kind": "projects", "id": str(p["id"]), "title": p["title"], "slug": None,
+             "snippet": _snippet(p.get("description")), "rank": None, "created_at": p.get("created_at")}
+            for p in result.data
+        ]
+    if "blog" in kinds:
+        query = db.table("blog_posts").select("id,title,slug,excerpt,created_at") \
+            .filter("search_vector", "fts(english)", tsquery)
+        if not include_drafts:
+            query = query.eq("published", True)
+        result = await query.order("created_at", desc=True).limit(limit).execute()
+        items += [
+            {"kind": "blog", "id": str(b["id"]), "title": b["title"], "slug": b.get("slug"),
+             "snippet": _snippet(b.get("excerpt")), "rank": None, "created_at": b.get("created_at")}
+            for b in result.data
+        ]
+    items.sort(key=lambda item: item["created_at"] or "", reverse=True)
+    for item in items:
+        del item["created_at"]
+    return items[:limit]
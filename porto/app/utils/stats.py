@@ -0,0 +1,71 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+from app.config import get_settings
+from app.models import Stats
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+COUNTERS = tuple(Stats.model_fields)
+
+
+class StatsEngine:
+    """
+    Dashboard counters kept in memory.
+
+    Write paths adjust the counters as they happen; a periodic reconcile
+    against the database (one aggregated RPC) corrects drift from writes
+    made by other workers.
+    """
+
+    def __init__(self, reconcile_interval: float):
+        self.reconcile_interval = reconcile_interval
+        self.counts: Dict[str, int] = {}
+        self.reconciled_at = 0.0
+        self._refresh: Optional[asyncio.Task] = None
+
+    def adjust(self, name: str, delta: int):
+        """Apply a change; ignored until the first reconcile has loaded the counters"""
+        if name in self.counts and delta:
+            self.counts[name] = max(0, self.counts[name] + delta)
+
+    def reset(self, name: str):
+        if name in self.counts:
+            self.counts[name] = 0
+
+    async def reconcile(self, db: "AsyncClient"):
+        """Reload every counter from the database"""
+        try:
+            result = await db.rpc("portfolio_stats").execute()
+            data = result.data[0] if isinstance(result.data, list) else result.data
+            counts = {name: int(data.get(name) or 0) for name in COUNTERS}
+        except Exception:
+            counts = await self._count_tables(db)
+        self.counts = counts
+        self.reconciled_at = time.time()
+
+    async def _count_tables(self, db: "AsyncClient") -> Dict[str, int]:
+        """Fallback when the portfolio_stats RPC is not installed: concurrent head counts"""
+        queries = {
+            "projects": db.table("projects").select("id", count="exact", head=True),
+            "images": db.table("images").select("id", count="exact", head=True),
+            "unread": db.table("messages").select("id", count="exact", head=True).or_("read.is.null,read.eq.false"),
+            "experiences": db.table("experiences").select("id", count="exact", head=True),
+            "comments": db.table("comments").select("id", count="exact", head=True),
+            "blog_posts": db.table("blog_posts").select("id", count="exact", head=True),
+        }
+        results = await asyncio.gather(*(q.execute() for q in queries.values()))
+        return {name: result.count or 0 for name, result in zip(queries, results)}
+
+    async def snapshot(self, db: "AsyncClient") -> Stats:
+        """Current counters; stale values are refreshed in the background"""
+        if not self.counts:
+            await self.reconcile(db)
+        elif time.time() - self.reconciled_at > self.reconcile_interval:
+            if not self._refresh or self._refresh.done():
+                self._refresh = asyncio.create_task(self.reconcile(db))
+        return Stats(**self.counts)
+
+
+stats_engine = StatsEngine(get_settings().stats_reconcile_interval)
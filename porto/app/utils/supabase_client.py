@@ -1,14 +1,54 @@
-from supabase import create_client, Client
+import asyncio
+from typing import TYPE_CHECKING, Optional
 from app.config import get_settings
+from app.utils.metrics import metered_http_client
 
-settings = get_settings()
+# supabase (with postgrest, storage3, realtime and auth) is slow to import;
+# it is loaded with the first client instead of at startup
+if TYPE_CHECKING:
+    from supabase import AsyncClient, ASupabaseAuthClient
 
-supabase: Client = create_client(
-    settings.supabase_url,
-    settings.supabase_service_role
-)
+_client: Optional["AsyncClient"] = None
+_auth_client: Optional["ASupabaseAuthClient"] = None
+_client_lock = asyncio.Lock()
 
 
-def get_supabase() -> Client:
-    """Dependency to get Supabase client"""
-    return supabase
+async def get_supabase() -> "AsyncClient":
+    """Dependency to get the shared async Supabase client"""
+    global _client
+    if _client is None:
+        async with _client_lock:
+            if _client is None:
+                from supabase import AsyncClientOptions, acreate_client
+                settings = get_settings()
+                # One metered HTTP client for PostgREST and Storage, so every call shows up in /metrics
+                http_client = metered_http_client(http2=True) if settings.metrics_enabled else None
+                _client = await acreate_client(
+                    settings.supabase_url,
+                    settings.supabase_service_role,
+                    options=AsyncClientOptions(auto_refresh_token=False, persist_session=False, httpx_client=http_client),
+                )
+    return _client
+
+
+def get_auth_client() -> "ASupabaseAuthClient":
+    """
+    Separate auth client for password sign-ins.
+    Signing in on the shared client would swap its service-role
+    Authorization header for the user's token.
+    """
+    global _auth_client
+    if _auth_client is None:
+        from supabase import ASupabaseAuthClient
+        settings = get_settings()
+        _auth_client = ASupabaseAuthClient(
+            url=f"{settings.supabase_url.rstrip('/')}/auth/v1",
+            headers={
+                "apiKey": settings.supabase_service_role,
+                "Authorization": f"Bearer {settings.supabase_service_role}",
+            },
+            auto_refresh_token=False,
+            persist_session=False,
+            http_client=metered_http_client() if settings.metrics_enabled else None,
+        )
+    return _auth_client
@@ -0,0 +1,83 @@
+import base64
+import hashlib
+from typing import AsyncIterator, Callable, Optional
+from fastapi import HTTPException, UploadFile
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadStream:
+    """
+    Chunks of an upload passing through a running size check and SHA-256.
+
+    Can be iterated more than once (the source is rewound each time), so
+    the digest can be taken before deciding whether to store the bytes.
+    """
+
+    def __init__(self, open_chunks: Callable[[], AsyncIterator[bytes]], max_bytes: int):
+        self._open_chunks = open_chunks
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._sha256: Optional[str] = None
+
+    @classmethod
+    def from_upload(cls, file: UploadFile, max_bytes: int) -> "UploadStream":
+        return cls(lambda: _read_chunks(file), max_bytes)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, max_bytes: int) -> "UploadStream":
+        return cls(lambda: _slice_chunks(data), max_bytes)
+
+    @property
+    def sha256(self) -> Optional[str]:
+        """Hex digest, known once the stream has been read to the end"""
+        return self._sha256
+
+    async def digest(self) -> str:
+        """Read the whole upload once to size and hash it"""
+        if self._sha256 is None:
+            async for _ in self:
+                pass
+        return self._sha256
+
+    async def __aiter__(self):
+        size = 0
+        hasher = hashlib.sha256() if self._sha256 is None else None
+        async for chunk in self._open_chunks():
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise HTTPException(status_code=413, detail="upload_too_large")
+            if hasher:
+                hasher.update(chunk)
+            yield chunk
+        self.size = size
+        if hasher:
+            self._sha256 = hasher.hexdigest()
+
+
+async def _read_chunks(file: UploadFile):
+    await file.seek(0)
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _slice_chunks(data: bytes):
+    view = memoryview(data)
+    for start in range(0, len(data), UPLOAD_CHUNK_SIZE):
+        yield bytes(view[start:start + UPLOAD_CHUNK_SIZE])
+
+
+async def encode_data_uri(chunks: AsyncIterator[bytes], mime_type: str) -> str:
+    """Base64 data URI built chunk by chunk (chunks are re-aligned to 3 bytes)"""
+    parts = [f"data:{mime_type};base64,"]
+    remainder = b""
+    async for chunk in chunks:
+        chunk = remainder + chunk
+        cut = len(chunk) - len(chunk) % 3
+        parts.append(base64.b64encode(chunk[:cut]).decode("ascii"))
+        remainder = chunk[cut:]
+    parts.append(base64.b64encode(remainder).decode("ascii"))
+    return "".join(parts)
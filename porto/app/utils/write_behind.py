@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Deque, List, Optional
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+from app.config import get_settings
+from app.utils.supabase_client import get_supabase
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("sync", "reject")
+# Failed round-trips (network errors, timeouts) are retried this many times before rows are dropped
+FLUSH_ATTEMPTS = 3
+
+_queues: List["WriteBehindQueue"] = []
+
+
+class WriteBehindQueue:
+    """
+    Coalesces single-row inserts into one table into multi-row inserts.
+
+    submit() queues a row and returns at once; a background flusher
+    writes whatever is queued every max_delay seconds, or as soon as
+    max_batch rows are waiting. on_flush receives the inserted rows (with
+    their ids) after each batch.
+
+    When max_pending rows are already waiting, the overflow policy decides:
+    "sync" makes the caller insert on the request path as if the queue were
+    off, "reject" answers 503. close() drains everything still queued.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        enabled: bool,
+        max_batch: int,
+        max_delay: float,
+        max_pending: int,
+        overflow: str,
+        on_flush: Optional[Callable[[List[dict]], None]] = None,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"write-behind overflow must be one of {OVERFLOW_POLICIES}")
+        self.table = table
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self.on_flush = on_flush
+        self.stats = {"queued": 0, "flushed": 0, "batches": 0, "failed": 0, "overflowed": 0}
+        self._pending: Deque[dict] = deque()
+        self._has_rows = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+        _queues.append(self)
+
+    @classmethod
+    def from_settings(cls, table: str, on_flush: Optional[Callable[[List[dict]], None]] = None) -> "WriteBehindQueue":
+        settings = get_settings()
+        return cls(
+            table,
+            enabled=settings.write_behind_enabled,
+            max_batch=settings.write_behind_max_batch,
+            max_delay=settings.write_behind_max_delay,
+            max_pending=settings.write_behind_max_pending,
+            overflow=settings.write_behind_overflow,
+            on_flush=on_flush,
+        )
+
+    @property
+    def active(self) -> bool:
+        return self.enabled and not self._closed
+
+    def submit(self, row: dict) -> bool:
+        """
+        Queue a row for the next batch. False means the caller must insert
+        it itself (queue off, shutting down, or full under the "sync" policy).
+        """
+        if not self.active:
+            return False
+        if len(self._pending) >= self.max_pending:
+            self.stats["overflowed"] += 1
+            if self.overflow == "reject":
+                raise HTTPException(status_code=503, detail="write_queue_full", headers={"Retry-After": "1"})
+            return False
+
+        self._pending.append(row)
+        self.stats["queued"] += 1
+        self._has_rows.set()
+        if len(self._pending) >= self.max_batch:
+            self._batch_full.set()
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return True
+
+    async def _run(self):
+        while self._pending or not self._closed:
+            if not self._pending:
+                self._has_rows.clear()
+                await self._has_rows.wait()
+                continue
+            if len(self._pending) < self.max_batch and not self._closed:
+                # Give the burst max_delay to grow into a bigger batch
+                self._batch_full.clear()
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[dict]):
+        db = await get_supabase()
+        for attempt in range(FLUSH_ATTEMPTS):
+            try:
+                result = await db.table(self.table).insert(batch, default_to_null=False).execute()
+                self._flushed(result.data)
+                return
+            except APIError:
+                # A bad row fails the whole statement: insert one by one to keep the rest
+                for row in batch:
+                    try:
+                        result = await db.table(self.table).insert(row).execute()
+                        self._flushed(result.data)
+                    except Exception as row_error:
+                        self.stats["failed"] += 1
+                        logger.warning("write-behind dropped a %s row: %s", self.table, row_error)
+                return
+            except Exception as e:
+                logger.warning("write-behind insert into %s failed (attempt %d): %s", self.table, attempt + 1, e)
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        self.stats["failed"] += len(batch)
+        logger.error("write-behind dropped %d %s rows after %d attempts", len(batch), self.table, FLUSH_ATTEMPTS)
+
+    def _flushed(self, rows: List[dict]):
+        if not rows:
+            return
+        self.stats["flushed"] += len(rows)
+        self.stats["batches"] += 1
+        if self.on_flush:
+            self.on_flush(rows)
+
+    async def close(self):
+        """Stop queueing (later submits insert synchronously) and write out everything pending"""
+        self._closed = True
+        self._has_rows.set()
+        self._batch_full.set()
+        if self._task and not self._task.done():
+            await self._task
+        elif self._pending:
+            await self._run()
+
+    def snapshot(self) -> dict:
+        return {"table": self.table, "enabled": self.enabled, "pending": len(self._pending), **self.stats}
+
+
+async def close_all():
+    """Flush every write-behind queue; run on shutdown"""
+    await asyncio.gather(*(queue.close() for queue in _queues))
+
+
+def snapshot_all() -> List[dict]:
+    return [queue.snapshot() for queue in _queues]
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Load-test every router against the local Supabase stand-in and report
+p50/p95/p99 latency and requests per second per endpoint.
+
+Starts bench/standin.py and the API (uvicorn app.main:app), seeds data
+through the API, then drives each endpoint with --concurrency clients.
+Results are written as JSON; pass an earlier file as --baseline to see
+what got slower.
+
+Usage: python bench/benchmark.py [--requests 500] [--concurrency 16]
+       [--latency-ms 2] [--only blog] [--output bench/results/run.json]
+       [--baseline bench/results/previous.json] [--fail-on-regression]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+
+ADMIN = {"identifier": "admin", "password": "password"}
+# 1x1 PNG
+PNG = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg==")
+SERVER_TIMING_UPSTREAM = re.compile(r'upstream;dur=([\d.]+);desc="(\d+) call')
+
+
+class Scenario(NamedTuple):
+    method: str
+    path: str                  # may reference seeded ids: {slug}, {image_id}
+    admin: bool = False
+    body: Optional[dict] = None
+    share: float = 1.0         # fraction of --requests to send (heavy endpoints)
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+
+# Reads first, then writes, so the writes do not grow the lists being read
+SCENARIOS = [
+    Scenario("GET", "/health"),
+    Scenario("GET", "/metrics"),
+    Scenario("GET", "/projects"),
+    Scenario("GET", "/projects?q=rocket"),
+    Scenario("GET", "/projects/featured"),
+    Scenario("GET", "/experiences"),
+    Scenario("GET", "/blog"),
+    Scenario("GET", "/blog/{slug}"),
+    Scenario("GET", "/search?q=rocket"),
+    Scenario("GET", "/comments"),
+    Scenario("GET", "/images/{image_id}"),
+    Scenario("GET", "/images", admin=True),
+    Scenario("GET", "/messages", admin=True),
+    Scenario("GET", "/stats", admin=True),
+    Scenario("GET", "/auth/me", admin=True),
+    Scenario("GET", "/export", admin=True, share=0.1),
+    Scenario("POST", "/auth/login", body=ADMIN, share=0.2),
+    Scenario("POST", "/comments", body={"author": "bench", "message": "load test comment"}),
+    Scenario("POST", "/messages", body={"name": "bench", "email": "bench@example.com", "message": "load test"}),
+    Scenario("POST", "/projects", admin=True, body={"title": "Bench project", "description": "created under load"}, share=0.2),
+]
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(scenario: Scenario, latencies: List[float], statuses: Dict[str, int], upstream: List[tuple], wall: float) -> dict:
+    ordered = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    calls = sorted(count for count, _ in upstream)
+    upstream_ms = sorted(ms for _, ms in upstream)
+    return {
+        "method": scenario.method,
+        "path": scenario.path,
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        # From Server-Timing: Supabase calls and time spent in them per request (median)
+        "upstream_calls": percentile(calls, 0.5) if calls else None,
+        "upstream_ms": round(percentile(upstream_ms, 0.5), 2) if upstream_ms else None,
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, path: str, headers: dict, total: int,
+                       concurrency: int, warmup: int) -> dict:
+    async def send():
+        return await client.request(scenario.method, path, json=scenario.body, headers=headers)
+
+    for _ in range(warmup):
+        await send()
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    upstream: List[tuple] = []
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await send()
+                await response.aread()
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                response, status = None, type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            match = response is not None and SERVER_TIMING_UPSTREAM.search(response.headers.get("server-timing", ""))
+            if match:
+                upstream.append((int(match.group(2)), float(match.group(1))))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(scenario, latencies, statuses, upstream, time.perf_counter() - started)
+
+
+async def seed(client: httpx.AsyncClient) -> dict:
+    """Create a small portfolio through the API; returns the ids scenarios refer to"""
+    response = await client.post("/auth/login", json=ADMIN)
+    response.raise_for_status()
+    admin = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for i in range(20):
+        project = {"title": f"Project {i} rocket", "description": f"Benchmark project {i}", "stack": ["python"], "featured": i < 4}
+        (await client.post("/projects", json=project, headers=admin)).raise_for_status()
+    for i in range(8):
+        experience = {"title": f"Role {i}", "company": "ACME", "description": "work", "start_date": f"20{10 + i}-01-01"}
+        (await client.post("/experiences", json=experience, headers=admin)).raise_for_status()
+    slug = None
+    for i in range(20):
+        post = {"title": f"Post {i} rocket", "excerpt": "excerpt", "content": "<p>" + "body text " * 200 + "</p>", "published": True}
+        response = await client.post("/blog/posts", json=post, headers=admin)
+        response.raise_for_status()
+        slug = slug or response.json()["slug"]
+    for i in range(20):
+        await client.post("/comments", json={"author": "seed", "message": f"comment {i}"})
+        await client.post("/messages", json={"name": "seed", "email": "seed@example.com", "message": f"message {i}"})
+    response = await client.post("/images", files={"file": ("bench.png", PNG, "image/png")}, headers=admin)
+    response.raise_for_status()
+    return {"admin": admin, "slug": slug, "image_id": response.json()["id"]}
+
+
+def _wait_for(url: str, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{url} exited with {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise SystemExit(f"{url} did not come up in {timeout:.0f}s")
+
+
+def start_services(args) -> List[subprocess.Popen]:
+    standin_url = f"http://127.0.0.1:{args.standin_port}"
+    standin = subprocess.Popen(
+        [sys.executable, str(BENCH_DIR / "standin.py"), "--port", str(args.standin_port), "--latency-ms", str(args.latency_ms)],
+    )
+    _wait_for(f"{standin_url}/_standin/stats", standin)
+
+    env = {
+        **os.environ,
+        "SUPABASE_URL": standin_url,
+        "SUPABASE_SERVICE_ROLE": "service-key",
+        "SUPABASE_JWT_SECRET": "stand-in-jwt-secret",
+        # The write scenarios would otherwise measure the limiter's 429s
+        "RATE_LIMIT_ENABLED": "false",
+        "IMAGE_CACHE_DIR": tempfile.mkdtemp(prefix="porto-bench-cache-"),
+    }
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.api_port), "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    _wait_for(f"http://127.0.0.1:{args.api_port}/health", api)
+    return [api, standin]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results: Dict[str, dict]):
+    print(f"{'endpoint':<28} {'req':>6} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'calls':>6}")
+    for name, result in results.items():
+        calls = "-" if result["upstream_calls"] is None else f"{result['upstream_calls']:g}"
+        print(
+            f"{name:<28} {result['requests']:>6} {result['errors']:>5} {result['rps']:>8.1f} "
+            f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {calls:>6}"
+        )
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Endpoints whose p95 grew by more than threshold (and 1 ms) or whose RPS fell by more than it"""
+    regressions = []
+    print(f"\n{'endpoint':<28} {'p95 before':>10} {'p95 now':>10} {'rps before':>10} {'rps now':>10}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        slower = result["p95_ms"] > before["p95_ms"] * (1 + threshold) and result["p95_ms"] - before["p95_ms"] > 1
+        fewer = result["rps"] < before["rps"] * (1 - threshold)
+        flag = "  REGRESSION" if slower or fewer else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<28} {before['p95_ms']:>10.2f} {result['p95_ms']:>10.2f} {before['rps']:>10.1f} {result['rps']:>10.1f}{flag}")
+    return regressions
+
+
+async def benchmark(args) -> dict:
+    base_url = args.api_url or f"http://127.0.0.1:{args.api_port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        context = await seed(client)
+        results = {}
+        for scenario in SCENARIOS:
+            if args.only and not re.search(args.only, scenario.name):
+                continue
+            path = scenario.path.format(**context)
+            headers = context["admin"] if scenario.admin else {}
+            total = max(args.concurrency, int(args.requests * scenario.share))
+            results[scenario.name] = await run_scenario(client, scenario, path, headers, total, args.concurrency, args.warmup)
+            print(f"  {scenario.name}: {results[scenario.name]['p95_ms']:.2f} ms p95", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API against the local Supabase stand-in")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint (heavy endpoints send a share)")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per endpoint")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="delay the stand-in adds to every upstream call")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--only", help="regex; run only endpoints whose name matches")
+    parser.add_argument("--api-url", help="benchmark an API that is already running (it gets seeded with data)")
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--standin-port", type=int, default=54329)
+    parser.add_argument("--output", help="JSON results file (default bench/results/<commit>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 when --baseline shows a regression")
+    args = parser.parse_args()
+
+    processes = [] if args.api_url else start_services(args)
+    try:
+        results = asyncio.run(benchmark(args))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "latency_ms": None if args.api_url else args.latency_ms,
+            "target": args.api_url or "stand-in",
+        },
+        "endpoints": results,
+    }
+    output = Path(args.output) if args.output else BENCH_DIR / "results" / f"{commit or 'run'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    print_table(results)
+    print(f"\nresults written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["endpoints"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} endpoint(s) regressed: {', '.join(regressions)}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Supabase services used by the Porto API.
+
+Implements the PostgREST, GoTrue and Storage subset the routers rely on,
+backed by in-memory tables, with configurable per-request latency.
+
+Usage: python bench/standin.py [--port 54321] [--latency-ms 5]
+Then run the API with SUPABASE_URL=http://127.0.0.1:54321,
+SUPABASE_SERVICE_ROLE=service-key and SUPABASE_JWT_SECRET=stand-in-jwt-secret.
+Sign in as admin@example.com / password. Not a faithful PostgREST: only
+the operators and headers the routers send are understood.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+JWT_SECRET = os.getenv("STANDIN_JWT_SECRET", "stand-in-jwt-secret")
+ADMIN_EMAIL = os.getenv("STANDIN_ADMIN_EMAIL", "admin@example.com")
+ADMIN_PASSWORD = os.getenv("STANDIN_ADMIN_PASSWORD", "password")
+ADMIN_ID = "00000000-0000-4000-8000-000000000001"
+
+SERIAL_TABLES = {"comments", "messages"}
+UNIQUE_COLUMNS = {"images": ["content_hash"], "blog_posts": ["slug"]}
+TIMESTAMPED_TABLES = {"projects", "blog_posts", "images", "experiences", "comments", "messages"}
+
+app = FastAPI(title="Porto stand-in", docs_url=None, redoc_url=None)
+app.state.latency = float(os.getenv("STANDIN_LATENCY_MS", "0")) / 1000
+app.state.requests = 0
+
+tables: Dict[str, List[dict]] = {}
+sequences: Dict[str, int] = {}
+buckets: Dict[str, Dict[str, bytes]] = {}
+rate_buckets: Dict[str, tuple] = {}
+users = {
+    ADMIN_EMAIL: {"id": ADMIN_ID, "email": ADMIN_EMAIL, "password": ADMIN_PASSWORD},
+}
+rpc_functions = {}
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def reset(seed: bool = True):
+    """Clear every table and optionally seed the admin user"""
+    tables.clear()
+    sequences.clear()
+    buckets.clear()
+    rate_buckets.clear()
+    if seed:
+        tables["admins"] = [{"user_id": ADMIN_ID, "email": ADMIN_EMAIL, "username": "admin"}]
+
+
+reset()
+
+
+# JWT helpers (HS256, same claims GoTrue issues)
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def issue_token(user: dict, ttl: int = 3600) -> str:
+    header = {"alg": "HS256", "typ": "JWT"}
+    issued = int(time.time())
+    claims = {
+        "sub": user["id"],
+        "email": user["email"],
+        "aud": "authenticated",
+        "role": "authenticated",
+        "iat": issued,
+        "exp": issued + ttl,
+    }
+    signing_input = f"{_b64url(json.dumps(header).encode())}.{_b64url(json.dumps(claims).encode())}"
+    signature = hmac.new(JWT_SECRET.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{_b64url(signature)}"
+
+
+def verify_token(token: str) -> Optional[dict]:
+    try:
+        header, payload, signature = token.split(".")
+        expected = hmac.new(JWT_SECRET.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature)):
+            return None
+        claims = json.loads(_b64url_decode(payload))
+        if claims.get("exp", 0) < time.time():
+            return None
+        return claims
+    except Exception:
+        return None
+
+
+# PostgREST filter evaluation
+
+def split_top_level(value: str) -> List[str]:
+    """Split on commas that are not nested in parentheses, braces or quotes"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in value:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char in "({":
+            depth += 1
+        elif not quoted and char in ")}":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def coerce(raw: str, sample: Any) -> Any:
+    raw = raw.strip('"')
+    if isinstance(sample, bool):
+        return raw == "true"
+    if isinstance(sample, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    if isinstance(sample, float):
+        return float(raw)
+    return raw
+
+
+def tsquery_terms(query: str) -> List[str]:
+    return [t for t in re.split(r"[\s&|!()']+", query.lower()) if t]
+
+
+def matches_text(value: Any, query: str) -> bool:
+    text = (value or "").lower() if isinstance(value, str) else ""
+    words = re.findall(r"\w+", text)
+    for term in tsquery_terms(query):
+        if term.endswith(":*"):
+            if not any(w.startswith(term[:-2]) for w in words):
+                return False
+        elif term not in words:
+            return False
+    return True
+
+
+def like_to_regex(pattern: str) -> str:
+    return "^" + re.escape(pattern).replace("%", ".*").replace("\\*", ".*").replace("_", ".") + "$"
+
+
+def evaluate(row: dict, column: str, expression: str) -> bool:
+    negate = False
+    if expression.startswith("not."):
+        negate = True
+        expression = expression[4:]
+    op, _, raw = expression.partition(".")
+    if op.startswith(("fts", "plfts", "phfts", "wfts")) and "(" in op:
+        op = op.split("(")[0]
+    value = row.get(column)
+    if column == "search_vector":
+        value = " ".join(str(v) for k, v in row.items() if isinstance(v, str) and k in ("title", "description", "excerpt", "content"))
+
+    if op == "eq":
+        result = value is not None and value == coerce(raw, value)
+    elif op == "neq":
+        result = value is not None and value != coerce(raw, value)
+    elif op in ("gt", "gte", "lt", "lte"):
+        if value is None:
+            result = False
+        else:
+            other = coerce(raw, value)
+            result = {
+                "gt": value > other, "gte": value >= other,
+                "lt": value < other, "lte": value <= other,
+            }[op]
+    elif op == "is":
+        result = {"null": value is None, "true": value is True, "false": value is False}[raw]
+    elif op == "in":
+        items = [coerce(v, value) for v in split_top_level(raw.strip("()"))]
+        result = value in items
+    elif op in ("cs", "cd"):
+        items = [v.strip('"') for v in split_top_level(raw.strip("{}"))] if raw.startswith("{") else json.loads(raw)
+        current = value or []
+        result = all(i in current for i in items) if op == "cs" else all(i in items for i in current)
+    elif op in ("like", "ilike"):
+        flags = re.IGNORECASE if op == "ilike" else 0
+        result = value is not None and re.match(like_to_regex(raw), str(value), flags | re.DOTALL) is not None
+    elif op in ("fts", "plfts", "phfts", "wfts"):
+        result = matches_text(value, raw)
+    else:
+        raise ValueError(f"unsupported operator {op}")
+    return not result if negate else result
+
+
+def evaluate_logic(row: dict, op: str, body: str) -> bool:
+    results = []
+    for part in split_top_level(body):
+        part = part.strip()
+        nested = re.match(r"^(not\.)?(and|or)\((.*)\)$", part, re.DOTALL)
+        if nested:
+            value = evaluate_logic(row, nested.group(2), nested.group(3))
+            results.append(not value if nested.group(1) else value)
+        else:
+            column, _, expression = part.partition(".")
+            results.append(evaluate(row, column, expression))
+    return all(results) if op == "and" else any(results)
+
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "columns", "on_conflict"}
+
+
+def filter_rows(rows: List[dict], params) -> List[dict]:
+    result = rows
+    for key, value in params.multi_items():
+        if key in RESERVED_PARAMS:
+            continue
+        if key in ("or", "and", "not.or", "not.and"):
+            negate = key.startswith("not.")
+            op = key.split(".")[-1]
+            result = [r for r in result if evaluate_logic(r, op, value.strip()[1:-1]) != negate]
+        else:
+            result = [r for r in result if evaluate(r, key, value)]
+    return result
+
+
+def order_rows(rows: List[dict], order: Optional[str]) -> List[dict]:
+    if not order:
+        return rows
+    for clause in reversed(order.split(",")):
+        parts = clause.split(".")
+        column = parts[0]
+        desc = len(parts) > 1 and parts[1] == "desc"
+        present = [r for r in rows if r.get(column) is not None]
+        missing = [r for r in rows if r.get(column) is None]
+        present.sort(key=lambda r: r[column], reverse=desc)
+        rows = (missing + present) if desc else (present + missing)
+    return rows
+
+
+def project(rows: List[dict], select: Optional[str]) -> List[dict]:
+    if not select or select == "*":
+        return [dict(r) for r in rows]
+    columns = [c.strip().strip('"') for c in split_top_level(select)]
+    return [{c: r.get(c) for c in columns} for r in rows]
+
+
+def prefer(request: Request) -> Dict[str, str]:
+    values = {}
+    for item in request.headers.get("prefer", "").split(","):
+        if "=" in item:
+            key, _, value = item.strip().partition("=")
+            values[key] = value
+    return values
+
+
+def respond(request: Request, rows: List[dict], status: int = 200, total: Optional[int] = None, offset: int = 0):
+    headers = {}
+    if total is not None:
+        end = offset + len(rows) - 1
+        headers["Content-Range"] = f"{offset}-{end}/{total}" if rows else f"*/{total}"
+    if request.headers.get("accept", "").startswith("application/vnd.pgrst.object+json"):
+        if len(rows) != 1:
+            return JSONResponse({"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned"}, status_code=406)
+        return JSONResponse(rows[0], status_code=status, headers=headers)
+    return JSONResponse(rows, status_code=status, headers=headers)
+
+
+def error(code: str, message: str, status: int = 400):
+    return JSONResponse({"code": code, "message": message, "details": None, "hint": None}, status_code=status)
+
+
+def new_row(table: str, data: dict) -> dict:
+    row = dict(data)
+    if "id" not in row or row["id"] is None:
+        if table in SERIAL_TABLES:
+            sequences[table] = sequences.get(table, 0) + 1
+            row["id"] = sequences[table]
+        elif table != "admins":
+            row["id"] = str(uuid.uuid4())
+    elif table in SERIAL_TABLES and isinstance(row["id"], int):
+        sequences[table] = max(sequences.get(table, 0), row["id"])
+    if table in TIMESTAMPED_TABLES:
+        row.setdefault("created_at", now_iso())
+    if table == "messages":
+        row.setdefault("read", False)
+    return row
+
+
+def unique_violation(table: str, row: dict, ignore: Optional[dict] = None) -> Optional[str]:
+    for column in UNIQUE_COLUMNS.get(table, []):
+        if row.get(column) is None:
+            continue
+        for other in tables.get(table, []):
+            if other is not ignore and other is not row and other.get(column) == row[column]:
+                return column
+    return None
+
+
+@app.middleware("http")
+async def simulate_latency(request: Request, call_next):
+    app.state.requests += 1
+    if app.state.latency:
+        await asyncio.sleep(app.state.latency)
+    return await call_next(request)
+
+
+@app.get("/rest/v1/{table}")
+@app.head("/rest/v1/{table}")
+async def rest_select(table: str, request: Request):
+    params = request.query_params
+    try:
+        rows = filter_rows(tables.get(table, []), params)
+    except (ValueError, KeyError) as e:
+        return error("PGRST100", str(e))
+    rows = order_rows(rows, params.get("order"))
+    total = len(rows) if prefer(request).get("count") else None
+    offset = int(params.get("offset", 0))
+    if "limit" in params:
+        rows = rows[offset:offset + int(params["limit"])]
+    else:
+        rows = rows[offset:]
+    return respond(request, project(rows, params.get("select")), total=total, offset=offset)
+
+
+@app.post("/rest/v1/{table}")
+async def rest_insert(table: str, request: Request):
+    payload = await request.json()
+    items = payload if isinstance(payload, list) else [payload]
+    options = prefer(request)
+    conflict_column = request.query_params.get("on_conflict", "id")
+    upsert = options.get("resolution") in ("merge-duplicates", "ignore-duplicates")
+    store = tables.setdefault(table, [])
+    staged, result = [], []
+    for item in items:
+        existing = None
+        if upsert and item.get(conflict_column) is not None:
+            existing = next((r for r in store if r.get(conflict_column) == item[conflict_column]), None)
+        if existing is not None:
+            if options["resolution"] == "merge-duplicates":
+                staged.append(("update", existing, item))
+            continue
+        row = new_row(table, item)
+        column = unique_violation(table, row) or next(
+            (c for c in UNIQUE_COLUMNS.get(table, []) if row.get(c) is not None and any(s[1].get(c) == row[c] for s in staged if s[0] == "insert")),
+            None,
+        )
+        if column:
+            return error("23505", f'duplicate key value violates unique constraint "{table}_{column}_key"', 409)
+        staged.append(("insert", row, None))
+    for action, row, changes in staged:
+        if action == "insert":
+            store.append(row)
+        else:
+            row.update(changes)
+        result.append(row)
+    if options.get("return") == "minimal":
+        return Response(status_code=201)
+    return respond(request, project(result, request.query_params.get("select")), status=201)
+
+
+@app.patch("/rest/v1/{table}")
+async def rest_update(table: str, request: Request):
+    changes = await request.json()
+    rows = filter_rows(tables.get(table, []), request.query_params)
+    for row in rows:
+        candidate = {**row, **changes}
+        column = unique_violation(table, candidate, ignore=row)
+        if column:
+            return error("23505", f'duplicate key value violates unique constraint "{table}_{column}_key"', 409)
+    for row in rows:
+        row.update(changes)
+    return respond(request, project(rows, request.query_params.get("select")))
+
+
+@app.delete("/rest/v1/{table}")
+async def rest_delete(table: str, request: Request):
+    rows = filter_rows(tables.get(table, []), request.query_params)
+    doomed = {id(r) for r in rows}
+    tables[table] = [r for r in tables.get(table, []) if id(r) not in doomed]
+    return respond(request, project(rows, request.query_params.get("select")))
+
+
+def rpc(name: str):
+    def register(func):
+        rpc_functions[name] = func
+        return func
+    return register
+
+
+@rpc("truncate_comments")
+def _truncate_comments(args):
+    tables["comments"] = []
+    sequences["comments"] = 0
+
+
+@rpc("truncate_messages")
+def _truncate_messages(args):
+    tables["messages"] = []
+    sequences["messages"] = 0
+
+
+@rpc("rate_limit_take")
+def _rate_limit_take(args):
+    now = time.time()
+    tokens, updated = rate_buckets.get(args["bucket_key"], (args["burst"], now))
+    tokens = min(args["burst"], tokens + (now - updated) * args["rate"])
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    rate_buckets[args["bucket_key"]] = (tokens, now)
+    return {"allowed": allowed, "retry_after": 0 if allowed else (1 - tokens) / args["rate"]}
+
+
+@rpc("bulk_update_rows")
+def _bulk_update_rows(args):
+    table = args["target_table"]
+    by_id = {str(row["id"]): row for row in tables.get(table, [])}
+    originals, updated = [], []
+    for item in args["items"]:
+        row = by_id.get(str(item["id"]))
+        column = unique_violation(table, {**row, **item["changes"]}, ignore=row) if row else None
+        if row is None or column:
+            # One transaction: undo the rows already changed
+            for row, original in originals:
+                row.clear()
+                row.update(original)
+            if column:
+                return error("23505", f'duplicate key value violates unique constraint "{table}_{column}_key"', 409)
+            return error("P0002", f"bulk_update_rows: {table} {item['id']} not found")
+        originals.append((row, dict(row)))
+        row.update(item["changes"])
+        updated.append(row)
+    return updated
+
+
+@rpc("image_references")
+def _image_references(args):
+    return [
+        {"image_id": image_id, "post_id": str(post["id"]), "slug": post.get("slug")}
+        for image_id in args["image_ids"]
+        for post in tables.get("blog_posts", [])
+        if f"/porto/images/{image_id}" in (post.get("content") or "") + " " + (post.get("featured_image") or "")
+    ]
+
+
+@rpc("portfolio_stats")
+def _portfolio_stats(args):
+    counts = {name: len(tables.get(name, [])) for name in ("projects", "images", "experiences", "comments", "blog_posts")}
+    counts["unread"] = sum(1 for m in tables.get("messages", []) if m.get("read") is not True)
+    return counts
+
+
+@rpc("search_content")
+def _search_content(args):
+    hits = []
+    for kind, table, body in (("projects", "projects", "description"), ("blog", "blog_posts", "content")):
+        if kind not in args.get("kinds", ["projects", "blog"]):
+            continue
+        for row in tables.get(table, []):
+            if kind == "blog" and not args.get("include_drafts") and not row.get("published"):
+                continue
+            if evaluate(row, "search_vector", "fts." + args["query"]):
+                text = " ".join(str(row.get(c) or "") for c in ("title", "description", "excerpt", "content"))
+                rank = sum(text.lower().count(t.rstrip(":*")) for t in tsquery_terms(args["query"]))
+                hits.append({"kind": kind, "id": str(row["id"]), "title": row.get("title"), "slug": row.get("slug"),
+                             "snippet": " ".join(re.sub(r"<[^>]*>", " ", row.get(body) or "").split())[:100], "rank": float(rank)})
+    hits.sort(key=lambda h: h["rank"], reverse=True)
+    return hits[:args.get("max_results", 20)]
+
+
+@app.api_route("/rest/v1/rpc/{name}", methods=["GET", "POST"])
+async def rest_rpc(name: str, request: Request):
+    func = rpc_functions.get(name)
+    if not func:
+        return error("PGRST202", f"Could not find the function public.{name}", 404)
+    args = await request.json() if request.method == "POST" and await request.body() else dict(request.query_params)
+    result = func(args)
+    if isinstance(result, Response):
+        return result
+    if isinstance(result, list):
+        rows = filter_rows(result, request.query_params) if request.method == "POST" else result
+        return respond(request, rows)
+    return JSONResponse(result)
+
+
+# GoTrue subset
+
+def user_payload(user: dict) -> dict:
+    return {"id": user["id"], "aud": "authenticated", "role": "authenticated", "email": user["email"],
+            "app_metadata": {}, "user_metadata": {}, "created_at": now_iso()}
+
+
+@app.post("/auth/v1/token")
+async def auth_token(request: Request):
+    body = await request.json()
+    user = users.get(body.get("email"))
+    if not user or user["password"] != body.get("password"):
+        return JSONResponse({"code": 400, "error_code": "invalid_credentials", "msg": "Invalid login credentials"}, status_code=400)
+    return {
+        "access_token": issue_token(user),
+        "refresh_token": uuid.uuid4().hex,
+        "token_type": "bearer",
+        "expires_in": 3600,
+        "expires_at": int(time.time()) + 3600,
+        "user": user_payload(user),
+    }
+
+
+@app.get("/auth/v1/user")
+async def auth_user(request: Request):
+    token = request.headers.get("authorization", "")[7:]
+    claims = verify_token(token)
+    if not claims:
+        return JSONResponse({"code": 401, "error_code": "bad_jwt", "msg": "invalid JWT"}, status_code=401)
+    user = users.get(claims["email"])
+    return user_payload(user)
+
+
+@app.get("/auth/v1/.well-known/jwks.json")
+async def auth_jwks():
+    return {"keys": []}
+
+
+# Storage subset
+
+@app.post("/storage/v1/object/list/{bucket}")
+async def storage_list(bucket: str, request: Request):
+    body = await request.json()
+    prefix = body.get("prefix", "").rstrip("/") + "/"
+    names = sorted({key[len(prefix):].split("/")[0] for key in buckets.get(bucket, {}) if key.startswith(prefix)})
+    return [{"name": name, "id": None} for name in names][: body.get("limit", 100)]
+
+
+@app.post("/storage/v1/object/{bucket}/{path:path}")
+@app.put("/storage/v1/object/{bucket}/{path:path}")
+async def storage_upload(bucket: str, path: str, request: Request):
+    form = await request.form()
+    upload = form["file"]
+    buckets.setdefault(bucket, {})[path] = await upload.read()
+    return {"Key": f"{bucket}/{path}", "Id": str(uuid.uuid4())}
+
+
+@app.get("/storage/v1/object/{bucket}/{path:path}")
+async def storage_download(bucket: str, path: str):
+    data = buckets.get(bucket, {}).get(path)
+    if data is None:
+        return JSONResponse({"statusCode": "404", "error": "not_found", "message": "Object not found"}, status_code=400)
+    return Response(content=data, media_type="application/octet-stream")
+
+
+@app.delete("/storage/v1/object/{bucket}")
+async def storage_remove(bucket: str, request: Request):
+    body = await request.json()
+    removed = []
+    for path in body.get("prefixes", []):
+        if buckets.get(bucket, {}).pop(path, None) is not None:
+            removed.append({"name": path})
+    return removed
+
+
+@app.get("/_standin/stats")
+async def standin_stats():
+    return {"requests": app.state.requests, "tables": {k: len(v) for k, v in tables.items()}}
+
+
+@app.post("/_standin/reset")
+async def standin_reset():
+    reset()
+    app.state.requests = 0
+    return {"ok": True}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=None)
+    args = parser.parse_args()
+    if args.latency_ms is not None:
+        app.state.latency = args.latency_ms / 1000
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Hash existing images, merge rows holding identical bytes into the oldest
+one and point blog posts at the surviving id.
+Usage: python scripts/dedupe_images.py [--batch 50] [--dry-run]
+"""
+import argparse
+import asyncio
+import hashlib
+import re
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import get_supabase
+from app.utils.blob_store import get_blob_store, parse_data_uri
+from app.utils.image_cache import get_image_cache
+
+IMAGE_URL_PATTERN = re.compile(r"/porto/images/([0-9a-fA-F-]{36})")
+
+
+async def image_bytes(row: dict, store):
+    if row.get("storage_key"):
+        return await store.get(row["storage_key"]) if store else None
+    try:
+        return parse_data_uri(row.get("data_uri"))[1]
+    except Exception:
+        return None
+
+
+async def hash_images(db, batch: int) -> dict:
+    """content hash -> rows with that content, oldest first"""
+    store = get_blob_store()
+    groups, last_id = {}, None
+    while True:
+        query = db.table("images").select("id,content_hash,storage_key,created_at").order("id").limit(batch)
+        if last_id:
+            query = query.gt("id", last_id)
+        rows = (await query.execute()).data
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+
+        for row in rows:
+            content_hash = row.get("content_hash")
+            if not content_hash:
+                # Only legacy rows need their data URI fetched
+                if not row.get("storage_key"):
+                    full = await db.table("images").select("data_uri").eq("id", row["id"]).execute()
+                    row["data_uri"] = full.data[0].get("data_uri") if full.data else None
+                data = await image_bytes(row, store)
+                if data is None:
+                    print(f"skip {row['id']}: bytes not readable")
+                    continue
+                content_hash = hashlib.sha256(data).hexdigest()
+            groups.setdefault(content_hash, []).append(row)
+
+    for rows in groups.values():
+        rows.sort(key=lambda r: (r.get("created_at") or "", r["id"]))
+    return groups
+
+
+async def rewrite_posts(db, replacements: dict, batch: int, dry_run: bool) -> int:
+    """Point /porto/images/{duplicate} references in blog posts at the kept image"""
+    def rewrite(text):
+        if not text:
+            return text
+        return IMAGE_URL_PATTERN.sub(lambda m: f"/porto/images/{replacements.get(m.group(1), m.group(1))}", text)
+
+    updated, last_id = 0, None
+    while True:
+        query = db.table("blog_posts").select("id,content,featured_image").order("id").limit(batch)
+        if last_id:
+            query = query.gt("id", last_id)
+        posts = (await query.execute()).data
+        if not posts:
+            break
+        last_id = posts[-1]["id"]
+
+        for post in posts:
+            changes = {}
+            for field in ("content", "featured_image"):
+                new_value = rewrite(post.get(field))
+                if new_value != post.get(field):
+                    changes[field] = new_value
+            if not changes:
+                continue
+            updated += 1
+            if dry_run:
+                print(f"would rewrite blog post {post['id']} ({', '.join(changes)})")
+            else:
+                await db.table("blog_posts").update(changes).eq("id", post["id"]).execute()
+                print(f"rewrote blog post {post['id']} ({', '.join(changes)})")
+    return updated
+
+
+async def dedupe(batch: int, dry_run: bool):
+    db = await get_supabase()
+    store = get_blob_store()
+    cache = get_image_cache()
+    groups = await hash_images(db, batch)
+
+    replacements = {}
+    for rows in groups.values():
+        for duplicate in rows[1:]:
+            replacements[duplicate["id"]] = rows[0]["id"]
+
+    # References first, so no post ever points at a deleted image
+    posts = await rewrite_posts(db, replacements, batch, dry_run)
+
+    removed = 0
+    for content_hash, rows in groups.items():
+        keep, duplicates = rows[0], rows[1:]
+        for duplicate in duplicates:
+            removed += 1
+            if dry_run:
+                print(f"would merge {duplicate['id']} into {keep['id']}")
+                continue
+            await db.table("images").delete().eq("id", duplicate["id"]).execute()
+            if store and duplicate.get("storage_key") and duplicate["storage_key"] != keep.get("storage_key"):
+                await store.delete(duplicate["storage_key"])
+            await cache.invalidate(duplicate["id"])
+            print(f"merged {duplicate['id']} into {keep['id']}")
+
+        if not dry_run and keep.get("content_hash") != content_hash:
+            await db.table("images").update({"content_hash": content_hash}).eq("id", keep["id"]).execute()
+
+    print(f"done: {len(groups)} distinct images, {removed} duplicates merged, {posts} posts rewritten")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge images with identical content")
+    parser.add_argument("--batch", type=int, default=50, help="rows fetched per round-trip")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(dedupe(args.batch, args.dry_run))
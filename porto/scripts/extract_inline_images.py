@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Move base64 images embedded in blog posts (content and featured_image)
+into the images table and replace them with /porto/images/{id} URLs.
+Usage: python scripts/extract_inline_images.py [--batch 10] [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import get_supabase
+from app.utils.image_store import INLINE_IMAGE_PATTERN, extract_inline_images
+
+FIELDS = ("content", "featured_image")
+
+
+async def extract(batch: int, dry_run: bool):
+    db = await get_supabase()
+
+    posts_updated, images_moved, last_id = 0, 0, None
+    while True:
+        # Posts with inline images are large; keep batches small
+        query = db.table("blog_posts").select("id,slug,content,featured_image").order("id").limit(batch)
+        if last_id:
+            query = query.gt("id", last_id)
+        posts = (await query.execute()).data
+        if not posts:
+            break
+        last_id = posts[-1]["id"]
+
+        for post in posts:
+            if dry_run:
+                found = sum(len(INLINE_IMAGE_PATTERN.findall(post.get(field) or "")) for field in FIELDS)
+                if found:
+                    posts_updated += 1
+                    images_moved += found
+                    print(f"would extract {found} images from blog post {post['id']} ({post.get('slug')})")
+                continue
+
+            changes, moved = {}, 0
+            for field in FIELDS:
+                try:
+                    new_value, count = await extract_inline_images(db, post.get(field), filename=f"blog-{field}")
+                except Exception as e:
+                    print(f"skip {post['id']} {field}: {getattr(e, 'detail', e)}")
+                    continue
+                if count:
+                    changes[field] = new_value
+                    moved += count
+            if not changes:
+                continue
+
+            await db.table("blog_posts").update(changes).eq("id", post["id"]).execute()
+            posts_updated += 1
+            images_moved += moved
+            print(f"extracted {moved} images from blog post {post['id']} ({post.get('slug')})")
+
+    print(f"done: {images_moved} inline images moved out of {posts_updated} posts")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract inline data URI images from blog posts")
+    parser.add_argument("--batch", type=int, default=10, help="posts fetched per round-trip")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(extract(args.batch, args.dry_run))
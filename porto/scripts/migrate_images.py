@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+One-shot migration of data_uri image rows into the configured blob store
+Usage: IMAGE_STORAGE=supabase python scripts/migrate_images.py [--batch 20] [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import get_supabase
+from app.utils.blob_store import get_blob_store, new_storage_key, parse_data_uri
+
+
+async def migrate(batch: int, dry_run: bool):
+    db = await get_supabase()
+    store = get_blob_store()
+    if not store:
+        sys.exit("IMAGE_STORAGE must be 'local' or 'supabase' to migrate images")
+
+    migrated, failed, last_id = 0, 0, None
+    while True:
+        # Keyset over id so failed rows are skipped instead of re-fetched
+        query = db.table("images").select("id,data_uri,mime_type").is_("storage_key", "null").order("id").limit(batch)
+        if last_id:
+            query = query.gt("id", last_id)
+        rows = (await query.execute()).data
+        if not rows:
+            break
+
+        for row in rows:
+            last_id = row["id"]
+            if not row.get("data_uri"):
+                continue
+            try:
+                mime_type, data = parse_data_uri(row["data_uri"])
+            except Exception:
+                print(f"skip {row['id']}: corrupt data URI")
+                failed += 1
+                continue
+
+            if dry_run:
+                print(f"would migrate {row['id']} ({len(data)} bytes)")
+                continue
+
+            storage_key = new_storage_key()
+            await store.put(storage_key, data, row.get("mime_type") or mime_type)
+            await db.table("images").update({
+                "storage_key": storage_key,
+                "size": len(data),
+                "mime_type": row.get("mime_type") or mime_type,
+                "data_uri": None,
+            }).eq("id", row["id"]).execute()
+            migrated += 1
+            print(f"migrated {row['id']} -> {storage_key} ({len(data)} bytes)")
+
+    print(f"done: {migrated} migrated, {failed} failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move data_uri images into the blob store")
+    parser.add_argument("--batch", type=int, default=20, help="rows fetched per round-trip")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch, args.dry_run))
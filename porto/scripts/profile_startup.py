@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Profile a cold start: import time of app.main broken down by package and
+by app module (python -X importtime), and the latency of the first
+request(s) served by a fresh interpreter.
+Each run is a new process, so nothing is warm; the median over --runs is
+reported. --eager loads every router up front, as before lazy loading,
+for comparison. Requests that reach Supabase need SUPABASE_URL to point
+at a live project or at bench/standin.py.
+Usage: python scripts/profile_startup.py [--runs 5] [--request /health] [--eager] [--top 15]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Runs in the fresh interpreter: time the import, then each request in turn
+COLD_START = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+if {eager}:
+    from app.routers import load_routers
+    load_routers(app.main.app.router)
+loaded = time.perf_counter()
+
+async def first_requests():
+    import httpx
+    timings = []
+    transport = httpx.ASGITransport(app=app.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://porto") as client:
+        for path in {paths!r}:
+            request_started = time.perf_counter()
+            response = await client.get(path)
+            timings.append([path, response.status_code, (time.perf_counter() - request_started) * 1000])
+    return timings
+
+timings = asyncio.run(first_requests())
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "preload_ms": (loaded - imported) * 1000,
+    "requests": timings,
+    "modules": len(sys.modules),
+}}))
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    # Settings only need to validate; nothing is contacted unless a request needs it
+    env.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+    env.setdefault("SUPABASE_SERVICE_ROLE", "service-key")
+    return env
+
+
+def import_breakdown() -> list:
+    """(self us, cumulative us, depth, module) for every module app.main imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            rows.append((int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2, match.group(4)))
+    return rows
+
+
+def cold_start(paths: list, eager: bool) -> dict:
+    code = COLD_START.format(eager=eager, paths=paths)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def report_imports(rows: list, top: int):
+    by_package = defaultdict(int)
+    for self_us, _, _, module in rows:
+        by_package[module.split(".")[0]] += self_us
+    total = sum(by_package.values())
+    print(f"import app.main: {total / 1000:.1f} ms self time over {len(rows)} modules\n")
+
+    print(f"{'package':<28} {'ms':>8} {'share':>6}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<28} {self_us / 1000:>8.1f} {self_us / total:>6.0%}")
+
+    print(f"\n{'app module (cumulative)':<28} {'ms':>8}")
+    for _, cumulative_us, _, module in sorted((row for row in rows if row[3].startswith("app.")), key=lambda row: -row[1])[:top]:
+        print(f"{module:<28} {cumulative_us / 1000:>8.1f}")
+
+
+def report_cold_starts(runs: list):
+    print(f"\ncold start, median of {len(runs)} fresh processes")
+    print(f"{'import app.main':<28} {statistics.median(run['import_ms'] for run in runs):>8.1f} ms")
+    if any(run["preload_ms"] > 1 for run in runs):
+        print(f"{'load all routers':<28} {statistics.median(run['preload_ms'] for run in runs):>8.1f} ms")
+    for index, (path, status, _) in enumerate(runs[0]["requests"]):
+        label = f"{'first' if index == 0 else 'then'} GET {path}"
+        median = statistics.median(run["requests"][index][2] for run in runs)
+        print(f"{label:<28} {median:>8.1f} ms  ({status})")
+    total = statistics.median(run["import_ms"] + run["preload_ms"] + run["requests"][0][2] for run in runs)
+    print(f"{'import to first response':<28} {total:>8.1f} ms")
+    print(f"{'modules loaded':<28} {statistics.median(run['modules'] for run in runs):>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile cold-start import time and first-request latency")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes to time")
+    parser.add_argument("--request", action="append", dest="paths", help="path to request after import (repeatable, default /health)")
+    parser.add_argument("--eager", action="store_true", help="load every router before the first request")
+    parser.add_argument("--top", type=int, default=15, help="rows per table")
+    args = parser.parse_args()
+
+    report_imports(import_breakdown(), args.top)
+    report_cold_starts([cold_start(args.paths or ["/health"], args.eager) for _ in range(args.runs)])
@@ -0,0 +1,6 @@
+-- Binary image storage: rows reference a blob by storage_key instead of
+-- embedding a base64 data URI. Legacy rows keep data_uri until migrated
+-- with scripts/migrate_images.py.
+alter table images add column if not exists storage_key text;
+alter table images add column if not exists size bigint;
+alter table images alter column data_uri drop not null;
@@ -0,0 +1,16 @@
+-- All dashboard counters in a single round-trip, used by the stats engine
+-- to reconcile its in-memory counters.
+create or replace function portfolio_stats()
+returns json
+language sql
+stable
+as $$
+  select json_build_object(
+    'projects', (select count(*) from projects),
+    'images', (select count(*) from images),
+    'unread', (select count(*) from messages where read is not true),
+    'experiences', (select count(*) from experiences),
+    'comments', (select count(*) from comments),
+    'blog_posts', (select count(*) from blog_posts)
+  );
+$$;
@@ -0,0 +1,6 @@
+-- Composite indexes matching the keyset order (sort column, id) used by
+-- cursor paging, so each page is an index range scan regardless of depth.
+create index if not exists projects_created_at_id_idx on projects (created_at desc, id desc);
+create index if not exists blog_posts_created_at_id_idx on blog_posts (created_at desc, id desc);
+create index if not exists comments_created_at_id_idx on comments (created_at desc, id desc);
+create index if not exists experiences_start_date_id_idx on experiences (start_date desc, id desc);
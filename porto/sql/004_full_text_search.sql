@@ -0,0 +1,53 @@
+-- Full-text search: weighted tsvector columns kept up to date by Postgres,
+-- GIN indexes for the fts filters on /projects and /blog, and a ranked
+-- search_content() with highlighted snippets for /search.
+alter table projects add column if not exists search_vector tsvector
+  generated always as (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B')
+  ) stored;
+
+alter table blog_posts add column if not exists search_vector tsvector
+  generated always as (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(excerpt, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(content, '')), 'C')
+  ) stored;
+
+create index if not exists projects_search_vector_idx on projects using gin (search_vector);
+create index if not exists blog_posts_search_vector_idx on blog_posts using gin (search_vector);
+
+-- query is a to_tsquery expression as built by app/utils/search.py.
+-- Snippets are only computed for the returned page, not every match.
+create or replace function search_content(
+  query text,
+  kinds text[] default array['projects', 'blog'],
+  max_results int default 20,
+  include_drafts boolean default false
+)
+returns table (kind text, id text, title text, slug text, snippet text, rank real)
+language sql
+stable
+as $$
+  with q as (select to_tsquery('english', query) as tsq),
+  hits as (
+    select 'projects'::text as kind, p.id::text as id, p.title, null::text as slug,
+           p.description as body, ts_rank(p.search_vector, q.tsq) as rank
+    from projects p, q
+    where 'projects' = any(kinds) and p.search_vector @@ q.tsq
+    union all
+    select 'blog'::text, b.id::text, b.title, b.slug,
+           coalesce(b.excerpt, '') || ' ' || coalesce(b.content, ''), ts_rank(b.search_vector, q.tsq)
+    from blog_posts b, q
+    where 'blog' = any(kinds) and b.search_vector @@ q.tsq
+      and (include_drafts or b.published)
+    order by rank desc
+    limit max_results
+  )
+  select h.kind, h.id, h.title, h.slug,
+         ts_headline('english', h.body, q.tsq,
+                     'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2'),
+         h.rank
+  from hits h, q
+  order by h.rank desc;
+$$;
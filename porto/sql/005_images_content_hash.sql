@@ -0,0 +1,4 @@
+-- Content-addressed images: SHA-256 of the bytes, one row per distinct
+-- content. Existing rows stay null until scripts/dedupe_images.py runs.
+alter table images add column if not exists content_hash text;
+create unique index if not exists images_content_hash_key on images (content_hash);
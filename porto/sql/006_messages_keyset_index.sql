@@ -0,0 +1,4 @@
+-- Keyset order (created_at, id) for paging and streaming the messages inbox,
+-- plus a partial index so read=false pages skip everything already read.
+create index if not exists messages_created_at_id_idx on messages (created_at desc, id desc);
+create index if not exists messages_unread_created_at_id_idx on messages (created_at desc, id desc) where read is not true;
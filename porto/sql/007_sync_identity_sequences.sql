@@ -0,0 +1,9 @@
+-- Called after /import, which writes serial ids explicitly: move the id
+-- sequences of messages and comments past the highest restored id.
+create or replace function sync_identity_sequences()
+returns void
+language sql
+as $$
+  select setval(pg_get_serial_sequence('messages', 'id'), coalesce((select max(id) from messages), 0) + 1, false);
+  select setval(pg_get_serial_sequence('comments', 'id'), coalesce((select max(id) from comments), 0) + 1, false);
+$$;
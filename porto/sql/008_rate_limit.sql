@@ -0,0 +1,43 @@
+-- Token buckets shared by every API worker (RATE_LIMIT_BACKEND=supabase).
+-- Unlogged: losing the buckets on a crash only resets the limits.
+create unlogged table if not exists rate_limit_buckets (
+  key text primary key,
+  tokens double precision not null,
+  updated_at timestamptz not null default clock_timestamp()
+);
+
+create or replace function rate_limit_take(bucket_key text, rate double precision, burst double precision)
+returns json
+language plpgsql
+as $$
+declare
+  now_ts timestamptz := clock_timestamp();
+  current_tokens double precision;
+  last_update timestamptz;
+begin
+  insert into rate_limit_buckets (key, tokens, updated_at)
+  values (bucket_key, burst, now_ts)
+  on conflict (key) do nothing;
+
+  select tokens, updated_at into current_tokens, last_update
+  from rate_limit_buckets where key = bucket_key
+  for update;
+
+  current_tokens := least(burst, current_tokens + extract(epoch from now_ts - last_update) * rate);
+  if current_tokens >= 1 then
+    update rate_limit_buckets set tokens = current_tokens - 1, updated_at = now_ts where key = bucket_key;
+    return json_build_object('allowed', true, 'retry_after', 0);
+  end if;
+
+  update rate_limit_buckets set tokens = current_tokens, updated_at = now_ts where key = bucket_key;
+  return json_build_object('allowed', false, 'retry_after', (1 - current_tokens) / rate);
+end;
+$$;
+
+-- Buckets idle for a day are full again anyway; run from pg_cron or by hand
+create or replace function rate_limit_prune()
+returns void
+language sql
+as $$
+  delete from rate_limit_buckets where updated_at < now() - interval '1 day';
+$$;
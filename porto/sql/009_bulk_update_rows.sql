@@ -0,0 +1,36 @@
+-- Atomic bulk updates whose items carry different changes: every row is
+-- updated in this one transaction, column by column, so fields the request
+-- does not name keep whatever concurrent writers left there. Any missing
+-- row or failed update rolls the whole batch back.
+-- items: [{"id": ..., "changes": {"column": value, ...}}, ...]
+create or replace function bulk_update_rows(target_table text, items jsonb)
+returns setof jsonb
+language plpgsql
+as $$
+declare
+  item jsonb;
+  assignments text;
+  updated integer;
+begin
+  if target_table not in ('projects', 'messages', 'experiences', 'blog_posts') then
+    raise exception 'bulk_update_rows: table % is not bulk-updatable', target_table;
+  end if;
+
+  for item in select value from jsonb_array_elements(items) loop
+    select string_agg(format('%I = r.%I', key, key), ', ')
+    into assignments
+    from jsonb_object_keys(item -> 'changes') as key;
+
+    return query execute format(
+      'update %I t set %s from jsonb_populate_record(null::%I, $1) r where t.id = r.id returning to_jsonb(t.*)',
+      target_table, assignments, target_table
+    ) using (item -> 'changes') || jsonb_build_object('id', item -> 'id');
+
+    get diagnostics updated = row_count;
+    if updated = 0 then
+      raise exception 'bulk_update_rows: % % not found', target_table, item ->> 'id'
+        using errcode = 'P0002';
+    end if;
+  end loop;
+end;
+$$;
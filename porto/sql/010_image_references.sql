@@ -0,0 +1,15 @@
+-- Uploads of identical bytes share one images row (content_hash), so an id
+-- may be used by posts other than the one being edited. Lists the blog
+-- posts whose content or featured image still points at each id, so
+-- deletes can refuse to break them.
+create or replace function image_references(image_ids text[])
+returns table (image_id text, post_id text, slug text)
+language sql
+stable
+as $$
+  select i.id, p.id::text, p.slug
+  from unnest(image_ids) as i(id)
+  join blog_posts p
+    on strpos(coalesce(p.content, ''), '/porto/images/' || i.id) > 0
+    or strpos(coalesce(p.featured_image, ''), '/porto/images/' || i.id) > 0;
+$$;
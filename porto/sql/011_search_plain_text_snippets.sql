@@ -0,0 +1,37 @@
+-- search_content() from 004 ran ts_headline on raw blog HTML, so snippets
+-- mixed the post's markup with <mark>. Tags are now stripped (and the
+-- whitespace collapsed) before highlighting; only <mark> remains markup.
+create or replace function search_content(
+  query text,
+  kinds text[] default array['projects', 'blog'],
+  max_results int default 20,
+  include_drafts boolean default false
+)
+returns table (kind text, id text, title text, slug text, snippet text, rank real)
+language sql
+stable
+as $$
+  with q as (select to_tsquery('english', query) as tsq),
+  hits as (
+    select 'projects'::text as kind, p.id::text as id, p.title, null::text as slug,
+           p.description as body, ts_rank(p.search_vector, q.tsq) as rank
+    from projects p, q
+    where 'projects' = any(kinds) and p.search_vector @@ q.tsq
+    union all
+    select 'blog'::text, b.id::text, b.title, b.slug,
+           coalesce(b.excerpt, '') || ' ' || coalesce(b.content, ''), ts_rank(b.search_vector, q.tsq)
+    from blog_posts b, q
+    where 'blog' = any(kinds) and b.search_vector @@ q.tsq
+      and (include_drafts or b.published)
+    order by rank desc
+    limit max_results
+  )
+  select h.kind, h.id, h.title, h.slug,
+         ts_headline('english',
+                     regexp_replace(regexp_replace(h.body, '<[^>]*>', ' ', 'g'), '\s+', ' ', 'g'),
+                     q.tsq,
+                     'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2'),
+         h.rank
+  from hits h, q
+  order by h.rank desc;
+$$;
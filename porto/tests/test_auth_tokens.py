@@ -0,0 +1,145 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from app import dependencies
+from app.config import get_settings
+from app.utils import auth_tokens
+from app.utils.auth_tokens import LocalVerificationUnavailable, decode_access_token
+
+SECRET = "test-secret-with-at-least-32-bytes!!"
+
+
+def claims(**overrides) -> dict:
+    return {"sub": "user-1", "email": "a@example.com", "aud": "authenticated", "exp": time.time() + 300, **overrides}
+
+
+def signing_key(kid: str):
+    private = ec.generate_private_key(ec.SECP256R1())
+    public = jwt.algorithms.ECAlgorithm.to_jwk(private.public_key(), as_dict=True)
+    return private, {**public, "kid": kid, "alg": "ES256"}
+
+
+@pytest.fixture
+def jwks(monkeypatch):
+    """Serves whatever keys the test puts in the returned list and counts fetches"""
+    served = SimpleNamespace(keys=[], fetches=0)
+
+    def handler(request):
+        served.fetches += 1
+        return httpx.Response(200, json={"keys": served.keys})
+
+    monkeypatch.setattr(auth_tokens, "metered_http_client", lambda **kwargs: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(auth_tokens, "_jwks", {})
+    monkeypatch.setattr(auth_tokens, "_jwks_fetched_at", 0.0)
+    return served
+
+
+@pytest.fixture
+def hs256_secret(monkeypatch):
+    monkeypatch.setattr(get_settings(), "supabase_jwt_secret", SECRET)
+
+
+def test_hs256_token(hs256_secret):
+    token = jwt.encode(claims(), SECRET, algorithm="HS256")
+    assert asyncio.run(decode_access_token(token))["sub"] == "user-1"
+
+
+@pytest.mark.parametrize("token, error", [
+    (jwt.encode(claims(exp=time.time() - 10), SECRET, algorithm="HS256"), jwt.ExpiredSignatureError),
+    (jwt.encode(claims(), "another-secret-with-at-least-32-bytes", algorithm="HS256"), jwt.InvalidSignatureError),
+    (jwt.encode(claims(aud="anon"), SECRET, algorithm="HS256"), jwt.InvalidAudienceError),
+    (jwt.encode({"sub": "user-1", "aud": "authenticated"}, SECRET, algorithm="HS256"), jwt.MissingRequiredClaimError),
+])
+def test_hs256_rejections(hs256_secret, token, error):
+    with pytest.raises(error):
+        asyncio.run(decode_access_token(token))
+
+
+def test_hs256_without_secret_is_not_verified_locally(monkeypatch):
+    monkeypatch.setattr(get_settings(), "supabase_jwt_secret", None)
+    with pytest.raises(LocalVerificationUnavailable):
+        asyncio.run(decode_access_token(jwt.encode(claims(), SECRET, algorithm="HS256")))
+
+
+def test_asymmetric_token_is_verified_with_jwks(jwks):
+    private, public = signing_key("k1")
+    jwks.keys = [public]
+    token = jwt.encode(claims(), private, algorithm="ES256", headers={"kid": "k1"})
+    assert asyncio.run(decode_access_token(token))["sub"] == "user-1"
+    assert asyncio.run(decode_access_token(token))["sub"] == "user-1"
+    assert jwks.fetches == 1
+
+    other, _ = signing_key("k1")
+    forged = jwt.encode(claims(), other, algorithm="ES256", headers={"kid": "k1"})
+    with pytest.raises(jwt.InvalidSignatureError):
+        asyncio.run(decode_access_token(forged))
+
+
+def test_unknown_kid_refreshes_at_most_once_per_interval(jwks):
+    private, public = signing_key("k1")
+    jwks.keys = [public]
+    asyncio.run(auth_tokens._refresh_jwks())
+    token = jwt.encode(claims(), private, algorithm="ES256", headers={"kid": "unknown"})
+    for _ in range(3):
+        with pytest.raises(LocalVerificationUnavailable):
+            asyncio.run(decode_access_token(token))
+    assert jwks.fetches == 1
+
+
+def test_rotated_key_is_picked_up_by_refresh(jwks, monkeypatch):
+    _, old = signing_key("old")
+    jwks.keys = [old]
+    asyncio.run(auth_tokens._refresh_jwks())
+    private, new = signing_key("new")
+    jwks.keys = [old, new]
+    monkeypatch.setattr(auth_tokens, "_jwks_fetched_at", time.time() - auth_tokens.JWKS_REFRESH_INTERVAL - 1)
+    token = jwt.encode(claims(), private, algorithm="ES256", headers={"kid": "new"})
+    assert asyncio.run(decode_access_token(token))["sub"] == "user-1"
+    assert jwks.fetches == 2
+
+
+def auth_server(user_id=None):
+    """A db whose auth.get_user knows one user, or nobody"""
+    calls = []
+
+    async def get_user(token):
+        calls.append(token)
+        return SimpleNamespace(user=SimpleNamespace(id=user_id, email="a@example.com") if user_id else None)
+
+    return SimpleNamespace(auth=SimpleNamespace(get_user=get_user)), calls
+
+
+def test_current_user_is_cached_until_token_expiry(hs256_secret):
+    token = jwt.encode(claims(sub="cached-user"), SECRET, algorithm="HS256")
+    db, calls = auth_server()
+    first = asyncio.run(dependencies.get_current_user(f"Bearer {token}", db))
+    assert first.id == "cached-user"
+    assert asyncio.run(dependencies.get_current_user(f"Bearer {token}", db)) is first
+    assert calls == []
+
+
+@pytest.mark.parametrize("token", [
+    jwt.encode(claims(exp=time.time() - 10), SECRET, algorithm="HS256"),
+    jwt.encode(claims(aud="anon"), SECRET, algorithm="HS256"),
+    "not-a-jwt",
+])
+def test_invalid_tokens_are_anonymous_without_auth_server(hs256_secret, token):
+    db, calls = auth_server("user-1")
+    assert asyncio.run(dependencies.get_current_user(f"Bearer {token}", db)) is None
+    assert calls == []
+
+
+def test_hs256_without_secret_falls_back_to_auth_server(monkeypatch):
+    monkeypatch.setattr(get_settings(), "supabase_jwt_secret", None)
+    token = jwt.encode(claims(sub="remote-user"), SECRET, algorithm="HS256")
+    db, calls = auth_server("remote-user")
+    assert asyncio.run(dependencies.get_current_user(f"Bearer {token}", db)).id == "remote-user"
+    assert calls == [token]
+
+    db, _ = auth_server()
+    other = jwt.encode(claims(sub="gone"), SECRET, algorithm="HS256")
+    assert asyncio.run(dependencies.get_current_user(f"Bearer {other}", db)) is None
@@ -0,0 +1,26 @@
+import asyncio
+import io
+import pytest
+from app.utils import backup
+
+
+def read_lines(data: bytes) -> list:
+    async def collect():
+        return [line async for line in backup._read_lines(io.BytesIO(data))]
+
+    return asyncio.run(collect())
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(backup, "UPLOAD_CHUNK_SIZE", 7)
+
+
+def test_lines_split_across_chunks():
+    long_line = b'{"table": "images", "data": "' + b"A" * 1000 + b'"}'
+    assert read_lines(b'{"a": 1}\n' + long_line + b"\n\n" + b'{"b": 2}') == [b'{"a": 1}', long_line, b'{"b": 2}']
+
+
+@pytest.mark.parametrize("data", [b"", b"\n", b"  \n\n"])
+def test_blank_input_yields_nothing(data):
+    assert read_lines(data) == []
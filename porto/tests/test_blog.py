@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from postgrest.exceptions import APIError
+from app.routers import blog
+from app.utils.bulk import BulkOutcome
+
+
+@pytest.fixture
+def discarded(monkeypatch):
+    rows = []
+
+    async def discard(db, images):
+        rows.extend(images)
+
+    monkeypatch.setattr(blog, "discard_new_images", discard)
+    return rows
+
+
+def write(data=None, error=None):
+    async def execute():
+        if error:
+            raise error
+        return SimpleNamespace(data=data)
+
+    return SimpleNamespace(execute=execute)
+
+
+def test_failed_write_discards_extracted_images(discarded):
+    created = [{"id": "a"}]
+    with pytest.raises(APIError):
+        asyncio.run(blog.write_post(None, write(error=APIError({"message": "duplicate", "code": "23505"})), created))
+    assert discarded == created
+
+
+def test_write_matching_nothing_discards_extracted_images(discarded):
+    asyncio.run(blog.write_post(None, write(data=[]), [{"id": "a"}]))
+    assert discarded == [{"id": "a"}]
+
+
+def test_successful_write_keeps_images(discarded):
+    asyncio.run(blog.write_post(None, write(data=[{"id": "p"}]), [{"id": "a"}]))
+    assert discarded == []
+
+
+def test_bulk_discards_only_failed_items(discarded):
+    outcome = BulkOutcome(3, atomic=False)
+    outcome.results = [{"status": "created"}, {"status": "failed"}, None]
+    created = {0: [{"id": "a"}], 1: [{"id": "b"}], 2: [{"id": "c"}]}
+    asyncio.run(blog.discard_failed_items(None, created, outcome))
+    assert discarded == [{"id": "b"}, {"id": "c"}]
+
+
+def test_bulk_update_stamps_one_updated_at(monkeypatch):
+    captured = []
+
+    async def bulk_update(db, table, updates, outcome):
+        captured.extend(changes for _, _, changes in updates)
+
+    monkeypatch.setattr(blog, "bulk_update", bulk_update)
+    items = [{"id": str(index), "published": True} for index in range(50)]
+    asyncio.run(blog.bulk_update_blog_posts(SimpleNamespace(items=items, atomic=False), user=None, db=None))
+    assert len(captured) == 50
+    assert len({changes["updated_at"] for changes in captured}) == 1
@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+from postgrest.exceptions import APIError
+from app.utils import bulk
+from app.utils.bulk import BulkOutcome, bulk_insert, bulk_update
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db, self.table, self.action = db, table, None
+
+    def select(self, columns):
+        self.action = ("select",)
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.action = ("insert", rows)
+        return self
+
+    def update(self, changes):
+        self.action = ("update", changes)
+        return self
+
+    def in_(self, column, ids):
+        self.ids = [str(item_id) for item_id in ids]
+        return self
+
+    async def execute(self):
+        return await self.db.run(self.table, self.action, getattr(self, "ids", None))
+
+
+class FakeDB:
+    """Just enough of the supabase client for bulk_insert and bulk_update"""
+
+    def __init__(self, rows):
+        self.rows = {str(row["id"]): row for row in rows}
+        self.calls = []
+        self.in_flight = self.peak = 0
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        self.calls.append(("rpc", name))
+        query = SimpleNamespace()
+
+        async def execute():
+            rows = [{**self.rows[str(item["id"])], **item["changes"]} for item in params["items"]]
+            return SimpleNamespace(data=rows)
+
+        query.execute = execute
+        return query
+
+    async def run(self, table, action, ids):
+        self.calls.append(action[0])
+        if action[0] == "select":
+            return SimpleNamespace(data=[self.rows[i] for i in ids if i in self.rows])
+        if action[0] == "update":
+            return SimpleNamespace(data=[{**self.rows[i], **action[1]} for i in ids if i in self.rows])
+        if isinstance(action[1], list):
+            raise APIError({"message": "null value in column title", "code": "23502"})
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        return SimpleNamespace(data=[{"id": len(self.calls), **action[1]}])
+
+
+def test_atomic_heterogeneous_update_is_one_rpc():
+    db = FakeDB([{"id": 1, "title": "a", "body": "x"}, {"id": 2, "title": "b", "body": "y"}])
+    outcome = BulkOutcome(2, atomic=True)
+    asyncio.run(bulk_update(db, "projects", [(0, 1, {"title": "A"}), (1, 2, {"body": "Y"})], outcome))
+    assert db.calls == ["select", ("rpc", "bulk_update_rows")]
+    assert [result["data"] for result in outcome.results] == [
+        {"id": 1, "title": "A", "body": "x"},
+        {"id": 2, "title": "b", "body": "Y"},
+    ]
+
+
+def test_atomic_uniform_update_is_one_statement():
+    db = FakeDB([{"id": 1, "read": False}, {"id": 2, "read": False}])
+    outcome = BulkOutcome(2, atomic=True)
+    asyncio.run(bulk_update(db, "messages", [(0, 1, {"read": True}), (1, 2, {"read": True})], outcome))
+    assert db.calls == ["select", "update"]
+    assert [result["status"] for result in outcome.results] == ["updated", "updated"]
+
+
+def test_insert_fallback_is_bounded(monkeypatch):
+    monkeypatch.setattr(bulk, "INSERT_FALLBACK_CONCURRENCY", 3)
+    db = FakeDB([])
+    outcome = BulkOutcome(20, atomic=False)
+    asyncio.run(bulk_insert(db, "projects", [(index, {"title": str(index)}) for index in range(20)], outcome))
+    assert db.peak == 3
+    assert all(result["status"] == "created" for result in outcome.results)
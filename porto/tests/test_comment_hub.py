@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.utils import comment_hub as hub_module
+from app.utils.comment_hub import CommentHub
+
+
+class FakeQuery:
+    def __init__(self, db):
+        self.db, self.after, self.desc, self.count = db, None, False, None
+
+    def select(self, columns):
+        return self
+
+    def gt(self, column, value):
+        self.after = value
+        return self
+
+    def order(self, column, desc=False):
+        self.desc = desc
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    async def execute(self):
+        self.db.queries.append(self.after)
+        rows = [row for row in self.db.rows if self.after is None or row["id"] > self.after]
+        rows.sort(key=lambda row: row["id"], reverse=self.desc)
+        return SimpleNamespace(data=rows[:self.count] if self.count else rows)
+
+
+class FakeDB:
+    def __init__(self, count):
+        self.rows = [{"id": i, "message": f"m{i}"} for i in range(1, count + 1)]
+        self.queries = []
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB(10)
+
+    async def get_supabase():
+        return fake
+
+    monkeypatch.setattr(hub_module, "get_supabase", get_supabase)
+    return fake
+
+
+def comment(comment_id):
+    return {"id": comment_id, "message": f"m{comment_id}"}
+
+
+def test_publish_reaches_every_subscriber_once(db):
+    hub = CommentHub(poll_interval=60, queue_size=10, replay_size=5)
+
+    async def run():
+        first, second = hub.subscribe(), hub.subscribe()
+        await asyncio.wait_for(hub._ready.wait(), 1)
+        hub.publish([comment(11)])
+        hub.publish([comment(11), comment(12)])
+        return [[q.queue.get_nowait()["id"] for _ in range(q.queue.qsize())] for q in (first, second)]
+
+    assert asyncio.run(run()) == [[11, 12], [11, 12]]
+
+
+def test_slow_subscriber_is_dropped(db):
+    hub = CommentHub(poll_interval=60, queue_size=1, replay_size=5)
+
+    async def run():
+        slow, fast = hub.subscribe(), hub.subscribe()
+        await asyncio.wait_for(hub._ready.wait(), 1)
+        hub.publish([comment(11)])
+        fast.queue.get_nowait()
+        hub.publish([comment(12)])
+        return slow, fast
+
+    slow, fast = asyncio.run(run())
+    assert slow.dropped and not fast.dropped
+    assert hub.subscribers == {fast} and hub.dropped == 1
+
+
+def test_replay_from_last_event_id(db):
+    hub = CommentHub(poll_interval=60, queue_size=10, replay_size=5)
+
+    async def run():
+        hub.subscribe()
+        await asyncio.wait_for(hub._ready.wait(), 1)
+        hub.publish([comment(11), comment(12)])
+        hub.remove(11)
+        from_buffer = await hub.replay(8)
+        from_table = await hub.replay(2)
+        return from_buffer, from_table
+
+    from_buffer, from_table = asyncio.run(run())
+    # The buffer holds ids 8-12; 11 was deleted
+    assert [c["id"] for c in from_buffer] == [9, 10, 12]
+    assert 8 not in db.queries
+    # An id below the buffer's floor is answered by a ranged query
+    assert [c["id"] for c in from_table] == list(range(3, 11))
+    assert hub.floor == 7
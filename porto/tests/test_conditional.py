@@ -0,0 +1,63 @@
+import pytest
+from starlette.requests import Request
+from app.utils.conditional import etag_matches, http_date, is_not_modified
+
+ETAG = '"abc"'
+LAST_MODIFIED = "Tue, 01 Oct 2024 10:00:00 GMT"
+EARLIER = "Mon, 30 Sep 2024 10:00:00 GMT"
+LATER = "Wed, 02 Oct 2024 10:00:00 GMT"
+
+
+def make_request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "query_string": b"",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+@pytest.mark.parametrize("header, matches", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+    ("", False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(header, ETAG) is matches
+
+
+@pytest.mark.parametrize("headers, not_modified", [
+    ({}, False),
+    ({"if_none_match": ETAG}, True),
+    ({"if_none_match": '"stale"'}, False),
+    ({"if_modified_since": LAST_MODIFIED}, True),
+    ({"if_modified_since": LATER}, True),
+    ({"if_modified_since": EARLIER}, False),
+    ({"if_modified_since": "not a date"}, False),
+    # If-None-Match wins whenever it is present
+    ({"if_none_match": '"stale"', "if_modified_since": LATER}, False),
+    ({"if_none_match": ETAG, "if_modified_since": EARLIER}, True),
+])
+def test_is_not_modified(headers, not_modified):
+    assert is_not_modified(make_request(**headers), ETAG, LAST_MODIFIED) is not_modified
+
+
+def test_if_modified_since_needs_a_last_modified():
+    assert is_not_modified(make_request(if_modified_since=LATER), ETAG) is False
+    assert is_not_modified(make_request(if_none_match=ETAG), None) is False
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-10-01T10:00:00+00:00", LAST_MODIFIED),
+    ("2024-10-01T12:00:00.123456+02:00", LAST_MODIFIED),
+    ("2024-10-01T10:00:00Z", LAST_MODIFIED),
+    ("2024-10-01T10:00:00", LAST_MODIFIED),
+    ("garbage", None),
+    (None, None),
+])
+def test_http_date(value, expected):
+    assert http_date(value) == expected
@@ -0,0 +1,43 @@
+import asyncio
+import os
+import pytest
+from app.utils.blob_store import LocalBlobStore
+from app.utils.image_cache import ImageCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ImageCache(memory_bytes=0, max_item_bytes=0, disk_path=str(tmp_path / "cache"), disk_bytes=1 << 20)
+
+
+def test_ids_never_share_or_escape_a_directory(cache):
+    dirs = {cache._image_dir(image_id) for image_id in ("a.b", "ab", "!!", "", "../..", "/")}
+    assert len(dirs) == 6
+    for directory in dirs:
+        assert os.path.dirname(os.path.dirname(directory)) == cache.disk_path
+
+
+def test_invalidate_only_removes_its_own_image(cache):
+    asyncio.run(cache.put("ab", b"kept", "image/png"))
+    asyncio.run(cache.invalidate("!!"))
+    asyncio.run(cache.invalidate("a.b"))
+    hit = asyncio.run(cache.get("ab"))
+    assert hit is not None and asyncio.run(hit.read()) == b"kept"
+    asyncio.run(cache.invalidate("ab"))
+    assert asyncio.run(cache.get("ab")) is None
+    assert os.path.isdir(cache.disk_path)
+
+
+def test_stream_from_store_into_disk_tier(cache, tmp_path):
+    store = LocalBlobStore(str(tmp_path / "blobs"))
+    data = bytes(range(256)) * 1000
+    asyncio.run(store.put("ab/abc", data, "image/png"))
+    assert asyncio.run(store.open_stream("ab/missing")) is None
+
+    async def fill():
+        return await cache.put_stream("img", await store.open_stream("ab/abc"), "image/png", etag='"h"')
+
+    path = asyncio.run(fill())
+    assert open(path, "rb").read() == data
+    hit = asyncio.run(cache.get("img"))
+    assert hit.path == path and hit.etag == '"h"' and hit.content_type == "image/png"
@@ -0,0 +1,51 @@
+import asyncio
+import io
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from app.utils import image_variants
+from app.utils.image_variants import VariantParams, render_variant
+
+PARAMS = VariantParams(8, 8, "png", 80)
+
+
+def png() -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (32, 16), "red").save(out, format="PNG")
+    return out.getvalue()
+
+
+class BrokenExecutor(Executor):
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+
+@pytest.fixture(autouse=True)
+def no_pool(monkeypatch):
+    monkeypatch.setattr(image_variants, "_get_executor", lambda: None)
+
+
+def test_renders_in_threads_without_a_pool():
+    with Image.open(io.BytesIO(asyncio.run(render_variant("a", png(), PARAMS)))) as image:
+        assert image.size == (8, 4)
+
+
+@pytest.mark.parametrize("data", [b"not an image", b"\x89PNG\r\n\x1a\n" + b"\0" * 30])
+def test_undecodable_image_is_415(data):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(render_variant("b", data, PARAMS))
+    assert error.value.status_code == 415
+
+
+def test_broken_pool_is_503_not_415(monkeypatch):
+    monkeypatch.setattr(image_variants, "_executor", BrokenExecutor())
+    monkeypatch.setattr(image_variants, "_get_executor", lambda: image_variants._executor)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(render_variant("c", png(), PARAMS))
+    assert error.value.status_code == 503
+    # A fresh pool is started for the next render
+    assert image_variants._executor is None
@@ -0,0 +1,63 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from app.routers.images import delete_image
+
+IMAGE_ID = "6f1c2a9e-0000-4000-8000-000000000001"
+
+
+class FakeQuery:
+    def __init__(self, db):
+        self.db = db
+
+    def delete(self):
+        return self
+
+    def eq(self, column, value):
+        self.db.deleted.append(value)
+        return self
+
+    async def execute(self):
+        return SimpleNamespace(data=[{"id": self.db.deleted[-1]}])
+
+
+class FakeDB:
+    """An images row shared by an admin upload and a blog post's inline image"""
+
+    def __init__(self, posts):
+        self.posts = posts
+        self.deleted = []
+
+    def rpc(self, name, params):
+        assert name == "image_references"
+        rows = [
+            {"image_id": image_id, "post_id": str(index), "slug": slug}
+            for image_id in params["image_ids"]
+            for index, (slug, content) in enumerate(self.posts.items())
+            if f"/porto/images/{image_id}" in content
+        ]
+
+        async def execute():
+            return SimpleNamespace(data=rows)
+
+        return SimpleNamespace(execute=execute)
+
+    def table(self, name):
+        assert name == "images"
+        return FakeQuery(self)
+
+
+def test_shared_image_is_not_deleted_under_a_post():
+    db = FakeDB({"launch": f'<img src="/porto/images/{IMAGE_ID}">'})
+    response = asyncio.run(delete_image(IMAGE_ID, force=False, user=None, db=db))
+    assert response.status_code == 409
+    assert json.loads(response.body) == {"detail": "image_in_use", "posts": ["launch"]}
+    assert db.deleted == []
+
+
+def test_force_and_unreferenced_deletes_go_through():
+    db = FakeDB({"launch": f'<img src="/porto/images/{IMAGE_ID}">'})
+    assert asyncio.run(delete_image(IMAGE_ID, force=True, user=None, db=db)) == {"ok": True}
+    db = FakeDB({"other": "<p>no images</p>"})
+    assert asyncio.run(delete_image(IMAGE_ID, force=False, user=None, db=db)) == {"ok": True}
+    assert db.deleted == [IMAGE_ID]
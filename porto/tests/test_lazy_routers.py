@@ -0,0 +1,63 @@
+import importlib
+import json
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from app.routers import ROUTER_PATHS, router_for
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COLD_START = """
+import asyncio, json, sys
+import httpx
+import app.main
+
+def loaded():
+    return sorted(name for name in sys.modules if name == "supabase" or name.startswith("app.routers."))
+
+after_import = loaded()
+
+async def run():
+    transport = httpx.ASGITransport(app.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        status = (await client.get("/health")).status_code
+    return status
+
+status = asyncio.run(run())
+print(json.dumps({"after_import": after_import, "status": status, "after_health": loaded()}))
+"""
+
+
+def test_cold_start_imports_only_the_router_it_serves():
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START],
+        cwd=ROOT,
+        env={"SUPABASE_URL": "http://localhost", "SUPABASE_SERVICE_ROLE": "key", "LAZY_ROUTERS": "true", "PATH": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report["after_import"] == []
+    assert report["status"] == 200
+    assert report["after_health"] == ["app.routers.health"]
+
+
+@pytest.mark.parametrize("name", list(ROUTER_PATHS))
+def test_every_route_is_claimed_by_its_module(name):
+    module = importlib.import_module(f"app.routers.{name}")
+    for route in module.router.routes:
+        assert router_for(route.path) == name, route.path
+
+
+@pytest.mark.parametrize("path, name", [
+    ("/blog", "blog"),
+    ("/blog/posts/bulk", "blog"),
+    ("/blogs", None),
+    ("/import", "backup"),
+    ("/docs", None),
+    ("/", None),
+])
+def test_router_for(path, name):
+    assert router_for(path) == name
@@ -0,0 +1,74 @@
+import asyncio
+import httpx
+from fastapi import FastAPI
+from app.middleware import MetricsMiddleware
+from app.utils import metrics
+from app.utils.metrics import Counter, MeteredTransport
+
+
+class Body(httpx.AsyncByteStream):
+    """A body that is read off the wire, as with a real transport"""
+
+    async def __aiter__(self):
+        yield b"[]"
+
+
+def upstream(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(503 if "broken" in request.url.path else 200, stream=Body())
+
+
+def get(app: FastAPI, *paths: str) -> list:
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://test") as client:
+            return [await client.get(path) for path in paths]
+
+    return asyncio.run(run())
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/metrics-test/{item_id}")
+    async def item(item_id: str):
+        async with httpx.AsyncClient(transport=MeteredTransport(httpx.MockTransport(upstream))) as client:
+            await client.get(f"http://supabase/rest/v1/{item_id}")
+            await client.get(f"http://supabase/storage/v1/{item_id}")
+        return {}
+
+    app.add_middleware(MetricsMiddleware, enabled=True, server_timing=True)
+    return app
+
+
+def test_requests_are_labelled_by_route_template():
+    before = dict(metrics.http_requests.values)
+    response, _, _ = get(make_app(), "/metrics-test/1", "/metrics-test/2", "/no-such-path")
+
+    def delta(labels):
+        return metrics.http_requests.values.get(labels, 0) - before.get(labels, 0)
+
+    assert delta(("GET", "/metrics-test/{item_id}", "200")) == 2
+    assert delta(("GET", "unmatched", "404")) == 1
+    assert not any("/metrics-test/1" in labels[1] for labels in metrics.http_requests.values)
+    assert response.headers["server-timing"].endswith('desc="2 calls"')
+    assert response.headers["timing-allow-origin"] == "*"
+
+
+def test_upstream_calls_are_labelled_by_service():
+    errors = metrics.upstream_errors.values.get(("rest",), 0)
+    route = ("GET", "/metrics-test/{item_id}")
+    # Sum of per-request call counts for the route so far
+    calls = metrics.upstream_calls.series[route][1][0] if route in metrics.upstream_calls.series else 0
+    get(make_app(), "/metrics-test/broken")
+    assert ("rest", "GET") in metrics.upstream_duration.series
+    assert ("storage", "GET") in metrics.upstream_duration.series
+    assert metrics.upstream_errors.values[("rest",)] == errors + 1
+    assert metrics.upstream_calls.series[route][1][0] == calls + 2
+
+
+def test_render_escapes_label_values():
+    counter = Counter("porto_test_total", "Test counter", ("route",))
+    counter.inc(('/a"b\\c',), 2)
+    assert counter.render()[-1] == 'porto_test_total{route="/a\\"b\\\\c"} 2'
+    text = metrics.render()
+    assert "# TYPE porto_http_request_duration_seconds histogram" in text
+    assert 'le="+Inf"' in text
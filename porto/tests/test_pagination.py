@@ -0,0 +1,86 @@
+import pytest
+from fastapi import HTTPException
+from app.utils.pagination import decode_cursor, encode_cursor, keyset, keyset_page
+
+
+class FakeQuery:
+    """Records the builder calls keyset() makes and applies them to rows like PostgREST would"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.filter = None
+        self.orders = []
+        self.limit_value = None
+
+    def or_(self, expression):
+        self.filter = expression
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, value):
+        self.limit_value = value
+        return self
+
+    def execute(self, after=None):
+        rows = sorted(self.rows, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+        if after:
+            rows = [r for r in rows if (r["created_at"], r["id"]) < after]
+        return rows[:self.limit_value]
+
+
+def test_cursor_round_trip():
+    row = {"id": "b7f3", "created_at": "2024-05-01T10:00:00+00:00", "title": "x"}
+    assert decode_cursor(encode_cursor(row, "created_at")) == ("2024-05-01T10:00:00+00:00", "b7f3")
+
+
+def test_cursor_round_trip_integer_ids():
+    assert decode_cursor(encode_cursor({"id": 42, "created_at": "2024-01-01"}, "created_at")) == ("2024-01-01", 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!!", "bm90IGpzb24", "WzFd", "W251bGwsMV0"])
+def test_invalid_cursor(cursor):
+    # garbage, non-JSON, a one-item list and [null, 1]
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+    assert error.value.detail == "invalid_cursor"
+
+
+def test_keyset_orders_by_column_then_id_and_fetches_one_extra():
+    query = keyset(FakeQuery([]), "created_at", None, 10)
+    assert query.orders == [("created_at", True), ("id", True)]
+    assert query.limit_value == 11
+    assert query.filter is None
+
+
+def test_keyset_breaks_ties_on_id():
+    row = {"id": 5, "created_at": "2024-01-01"}
+    query = keyset(FakeQuery([]), "created_at", encode_cursor(row, "created_at"), 2)
+    assert query.filter == 'created_at.lt."2024-01-01",and(created_at.eq."2024-01-01",id.lt."5")'
+
+
+def test_paging_through_equal_timestamps_visits_every_row_once():
+    rows = [{"id": i, "created_at": "2024-01-01" if i < 6 else "2024-02-01"} for i in range(1, 10)]
+    seen, cursor, after = [], None, None
+    while True:
+        query = keyset(FakeQuery(rows), "created_at", cursor, 2)
+        page = keyset_page(query.execute(after), "created_at", 2)
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+        after = decode_cursor(cursor)
+    assert seen == [9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+
+def test_last_page_has_no_cursor():
+    page = keyset_page([{"id": 1, "created_at": "a"}], "created_at", 2, total=1)
+    assert page == {"items": [{"id": 1, "created_at": "a"}], "next_cursor": None, "total": 1}
+
+
+def test_empty_items_do_not_crash():
+    assert keyset_page([{"id": 1, "created_at": "a"}], "created_at", 0)["next_cursor"] is None
+    assert keyset_page([], "created_at", 10)["items"] == []
@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from starlette.requests import Request
+from starlette.responses import FileResponse
+from app.routers.images import cached_image_response
+from app.utils.image_cache import CachedImage, ImageMeta
+from app.utils.ranges import RangeNotSatisfiable, bytes_response, parse_range
+
+BODY = bytes(range(256)) * 4
+ETAG = '"abc"'
+LAST_MODIFIED = "Tue, 01 Oct 2024 10:00:00 GMT"
+
+
+def make_request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/images/1",
+        "query_string": b"",
+        "asgi": {"spec_version": "2.4"},
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def read_body(response) -> bytes:
+    if not hasattr(response, "body_iterator"):
+        return response.body
+
+    async def collect():
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", [(0, 9)]),
+    ("bytes=10-", [(10, 1023)]),
+    ("bytes=-100", [(924, 1023)]),
+    ("bytes=-5000", [(0, 1023)]),
+    ("bytes=0-9,20-29", [(0, 9), (20, 29)]),
+    ("bytes=20-29, 0-9, 5-15", [(0, 15), (20, 29)]),
+    ("bytes=0-5000", [(0, 1023)]),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, len(BODY)) == expected
+
+
+@pytest.mark.parametrize("header", [None, "", "items=0-9", "bytes=9-0", "bytes=a-b", "bytes=10"])
+def test_malformed_range_means_whole_body(header):
+    assert parse_range(header, len(BODY)) == []
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=2000-3000", "bytes=-0"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, len(BODY))
+
+
+def test_single_range_is_206():
+    response = bytes_response(make_request(range="bytes=100-199"), BODY, "image/png", {}, ETAG, LAST_MODIFIED)
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 100-199/1024"
+    assert read_body(response) == BODY[100:200]
+
+
+def test_unsatisfiable_range_is_416():
+    response = bytes_response(make_request(range="bytes=5000-"), BODY, "image/png", {}, ETAG, LAST_MODIFIED)
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+
+def test_multiple_ranges_are_multipart():
+    response = bytes_response(make_request(range="bytes=0-9,-10"), BODY, "image/png", {}, ETAG, LAST_MODIFIED)
+    assert response.status_code == 206
+    boundary = response.media_type.split("boundary=")[1]
+    body = read_body(response)
+    assert len(body) == int(response.headers["content-length"])
+    assert body.count(f"--{boundary}".encode()) == 3
+    assert b"Content-Range: bytes 0-9/1024\r\n\r\n" + BODY[:10] in body
+    assert b"Content-Range: bytes 1014-1023/1024\r\n\r\n" + BODY[-10:] in body
+
+
+@pytest.mark.parametrize("if_range, status", [
+    (ETAG, 206),
+    ('"stale"', 200),
+    ('W/"abc"', 200),
+    (LAST_MODIFIED, 206),
+    ("Mon, 30 Sep 2024 10:00:00 GMT", 200),
+])
+def test_if_range(if_range, status):
+    request = make_request(range="bytes=0-9", if_range=if_range)
+    response = bytes_response(request, BODY, "image/png", {}, ETAG, LAST_MODIFIED)
+    assert response.status_code == status
+    assert read_body(response) == (BODY[:10] if status == 206 else BODY)
+
+
+def serve(response, request: Request):
+    """Run a response as ASGI and return (status, headers, body)"""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(response(request.scope, receive, send))
+    headers = {name.decode(): value.decode() for name, value in sent[0]["headers"]}
+    return sent[0]["status"], headers, b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_disk_hit_is_a_file_response_with_ranges(tmp_path):
+    path = tmp_path / "image"
+    path.write_bytes(BODY)
+    cached = CachedImage(ImageMeta("image/png", ETAG, LAST_MODIFIED), path=str(path))
+    request = make_request(range="bytes=100-199")
+    response = asyncio.run(cached_image_response(request, cached))
+    assert isinstance(response, FileResponse)
+    status, headers, body = serve(response, request)
+    assert status == 206 and body == BODY[100:200]
+    assert headers["etag"] == ETAG
+
+
+def test_vanished_disk_copy_falls_back(tmp_path):
+    missing = str(tmp_path / "gone")
+    meta = ImageMeta("image/png", ETAG, LAST_MODIFIED)
+    request = make_request()
+    assert asyncio.run(cached_image_response(request, CachedImage(meta, path=missing))) is None
+    response = asyncio.run(cached_image_response(request, CachedImage(meta, content=BODY, path=missing)))
+    assert response.status_code == 200 and read_body(response) == BODY
@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+from app.utils.rate_limit import MemoryBuckets, RateLimiter, RouteLimit
+
+ROUTE = "POST /comments"
+
+
+class FailingBuckets:
+    async def take(self, key, rate, burst):
+        raise ConnectionError("rpc unreachable")
+
+
+def test_failed_take_releases_the_slot():
+    limiter = RateLimiter({ROUTE: RouteLimit(1, 5, 1)}, FailingBuckets())
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            asyncio.run(limiter.admit(ROUTE, "client"))
+    assert limiter.in_flight[ROUTE] == 0
+
+
+def test_concurrency_cap_and_release():
+    limiter = RateLimiter({ROUTE: RouteLimit(100, 100, 1)}, MemoryBuckets(10))
+    assert asyncio.run(limiter.admit(ROUTE, "a")) is None
+    assert asyncio.run(limiter.admit(ROUTE, "b")) == (503, "server_busy", 1)
+    limiter.release(ROUTE)
+    assert asyncio.run(limiter.admit(ROUTE, "b")) is None
+
+
+def test_empty_bucket_is_429_with_retry_after():
+    limiter = RateLimiter({ROUTE: RouteLimit(0.5, 1, 0)}, MemoryBuckets(10))
+    assert asyncio.run(limiter.admit(ROUTE, "a")) is None
+    assert asyncio.run(limiter.admit(ROUTE, "a")) == (429, "rate_limited", 2)
+    assert limiter.in_flight[ROUTE] == 1
+
+
+@pytest.mark.parametrize("limit", [{"rate": 0, "burst": 5}, {"rate": 1, "burst": 0.5}])
+def test_invalid_route_limits_are_refused(monkeypatch, limit):
+    monkeypatch.setenv("SUPABASE_URL", "http://localhost")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE", "key")
+    monkeypatch.setenv("RATE_LIMIT_ROUTES", '{"POST /comments": %s}' % str(limit).replace("'", '"'))
+    from app.config import get_settings
+    get_settings.cache_clear()
+    try:
+        with pytest.raises(ValueError):
+            RateLimiter.from_settings()
+    finally:
+        get_settings.cache_clear()
@@ -0,0 +1,76 @@
+import asyncio
+from starlette.requests import Request
+from app.routers import blog
+from app.utils.response_cache import ResponseCache
+
+
+def make_request(path: str, query: str = "") -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query.encode(), "headers": []})
+
+
+def make_cache() -> ResponseCache:
+    return ResponseCache(ttl=60, max_items=100, max_bytes=1 << 20, gzip_min_bytes=1 << 20)
+
+
+class Loader:
+    """Counts loads and returns the current value"""
+
+    def __init__(self, value):
+        self.value, self.calls = value, 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_write_invalidates_tagged_entries():
+    cache, projects, posts = make_cache(), Loader(["p1"]), Loader(["b1"])
+
+    async def run():
+        await cache.serve(make_request("/projects"), projects, tags=("projects",))
+        await cache.serve(make_request("/blog"), posts, tags=("blog",))
+        hit = await cache.serve(make_request("/projects"), projects, tags=("projects",))
+        assert hit.headers["x-cache"] == "HIT"
+
+        projects.value = ["p1", "p2"]
+        cache.invalidate("projects")
+        fresh = await cache.serve(make_request("/projects"), projects, tags=("projects",))
+        kept = await cache.serve(make_request("/blog"), posts, tags=("blog",))
+        return fresh, kept
+
+    fresh, kept = asyncio.run(run())
+    assert fresh.headers["x-cache"] == "MISS" and fresh.body == b'["p1","p2"]'
+    assert kept.headers["x-cache"] == "HIT"
+    assert (projects.calls, posts.calls) == (2, 1)
+
+
+def test_write_during_load_is_not_cached():
+    cache = make_cache()
+
+    async def run():
+        async def load():
+            cache.invalidate("projects")
+            return ["stale"]
+
+        await cache.serve(make_request("/projects"), load, tags=("projects",))
+        return await cache.serve(make_request("/projects"), Loader(["fresh"]), tags=("projects",))
+
+    assert asyncio.run(run()).body == b'["fresh"]'
+
+
+def test_blog_writes_drop_lists_and_the_post(monkeypatch):
+    cache = make_cache()
+    monkeypatch.setattr(blog, "response_cache", cache)
+
+    async def fill():
+        await cache.serve(make_request("/blog", "page=1"), Loader([]), tags=("blog",))
+        for slug in ("a", "b"):
+            await cache.serve(make_request(f"/blog/{slug}"), Loader({}), tags=("blog_post", f"blog_post:{slug}"))
+
+    asyncio.run(fill())
+    blog.invalidate_blog_cache([{"slug": "a"}])
+    assert cache.snapshot()["entries"] == 1
+
+    asyncio.run(fill())
+    blog.invalidate_blog_cache([{"slug": "a"}], slug_changed=True)
+    assert cache.snapshot()["entries"] == 0
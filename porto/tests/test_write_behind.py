@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+import httpx
+import pytest
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+from app.utils import write_behind
+from app.utils.write_behind import WriteBehindQueue
+
+
+class FakeDB:
+    """Inserts rows unless told to fail; a row with bad=True fails any statement it is in"""
+
+    def __init__(self, outages: int = 0):
+        self.outages = outages
+        self.statements: list = []
+        self.rows: list = []
+
+    def table(self, name):
+        db = self
+
+        class Insert:
+            def insert(self, rows, **kwargs):
+                self.rows = rows if isinstance(rows, list) else [rows]
+                return self
+
+            async def execute(self):
+                db.statements.append(len(self.rows))
+                if db.outages:
+                    db.outages -= 1
+                    raise httpx.ConnectError("down")
+                if any(row.get("bad") for row in self.rows):
+                    raise APIError({"message": "bad row", "code": "23502"})
+                inserted = [{"id": len(db.rows) + i, **row} for i, row in enumerate(self.rows)]
+                db.rows += inserted
+                return SimpleNamespace(data=inserted)
+
+        return Insert()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB()
+
+    async def get_supabase():
+        return fake
+
+    monkeypatch.setattr(write_behind, "get_supabase", get_supabase)
+    monkeypatch.setattr(write_behind, "_queues", [])
+    monkeypatch.setattr(write_behind, "FLUSH_ATTEMPTS", 2)
+    return fake
+
+
+def make_queue(**overrides) -> WriteBehindQueue:
+    options = {"enabled": True, "max_batch": 100, "max_delay": 60, "max_pending": 100, "overflow": "sync", **overrides}
+    return WriteBehindQueue("comments", **options)
+
+
+def test_shutdown_flushes_pending_rows_in_one_batch(db):
+    flushed = []
+    queue = make_queue(on_flush=flushed.extend)
+
+    async def run():
+        assert all(queue.submit({"n": n}) for n in range(5))
+        await write_behind.close_all()
+        return queue.submit({"n": 5})
+
+    assert asyncio.run(run()) is False
+    assert db.statements == [5]
+    assert [row["n"] for row in flushed] == [0, 1, 2, 3, 4]
+    assert queue.snapshot()["pending"] == 0
+
+
+def test_full_batch_is_written_without_waiting(db):
+    queue = make_queue(max_batch=3)
+
+    async def run():
+        for n in range(3):
+            queue.submit({"n": n})
+        await asyncio.sleep(0.05)
+        return list(db.statements)
+
+    assert asyncio.run(run()) == [3]
+
+
+def test_rejected_batch_falls_back_to_row_by_row(db):
+    queue = make_queue()
+
+    async def run():
+        for row in ({"n": 0}, {"n": 1, "bad": True}, {"n": 2}):
+            queue.submit(row)
+        await queue.close()
+
+    asyncio.run(run())
+    assert [row["n"] for row in db.rows] == [0, 2]
+    assert queue.stats["flushed"] == 2 and queue.stats["failed"] == 1
+
+
+def test_outage_is_retried_then_rows_are_dropped(db):
+    db.outages = 1
+    queue = make_queue()
+
+    async def run():
+        queue.submit({"n": 0})
+        await queue.close()
+
+    asyncio.run(run())
+    assert db.statements == [1, 1] and queue.stats["flushed"] == 1
+
+    db.outages = 2
+    queue = make_queue()
+    asyncio.run(run())
+    assert queue.stats["failed"] == 1 and queue.stats["flushed"] == 0
+
+
+def test_overflow_policies(db):
+    async def fill(queue):
+        return [queue.submit({"n": n}) for n in range(2)]
+
+    assert asyncio.run(fill(make_queue(max_pending=1, overflow="sync"))) == [True, False]
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(fill(make_queue(max_pending=1, overflow="reject")))
+    assert error.value.status_code == 503